@@ -1,7 +1,24 @@
-from .errors import BackendError, BackendUnavailableError, BackendRequestError, ModelNotFoundError
-from .ollama_backend import OllamaBackend, OllamaBackendOptions, OllamaMode
+from .coalesce import SingleFlight
+from .concurrency import AdaptiveConcurrency, ConcurrencyOptions, get_concurrency_controller
+from .errors import (
+    BackendError, BackendUnavailableError, BackendRequestError, GenerationTimeoutError, ModelNotFoundError,
+)
+from .health import HealthProbe, HealthState, get_health_probe
+from .hedge import CancelScope, LatencyTracker, get_latency_tracker, guarded_stream
+from .stats import GenerationResult, GenerationStats, GenerationStream, sum_stats
+from .ollama_backend import KeepAliveHeartbeat, OllamaBackend, OllamaBackendOptions, OllamaMode
+from .replay import (
+    Cassette, CassetteMissError, Interaction, RecordingBackend, ReplayBackend, recording_factory, replay_factory,
+)
 
 __all__ = [
-    "BackendError", "BackendUnavailableError", "BackendRequestError", "ModelNotFoundError",
-    "OllamaBackend", "OllamaBackendOptions", "OllamaMode",
+    "BackendError", "BackendUnavailableError", "BackendRequestError", "GenerationTimeoutError", "ModelNotFoundError",
+    "OllamaBackend", "OllamaBackendOptions", "OllamaMode", "KeepAliveHeartbeat",
+    "HealthProbe", "HealthState", "get_health_probe",
+    "CancelScope", "LatencyTracker", "get_latency_tracker", "guarded_stream",
+    "SingleFlight",
+    "AdaptiveConcurrency", "ConcurrencyOptions", "get_concurrency_controller",
+    "GenerationResult", "GenerationStats", "GenerationStream", "sum_stats",
+    "Cassette", "CassetteMissError", "Interaction", "RecordingBackend", "ReplayBackend",
+    "recording_factory", "replay_factory",
 ]
\ No newline at end of file
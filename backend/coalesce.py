@@ -0,0 +1,153 @@
+# hy_translator/backend/coalesce.py
+
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+
+class _SharedStream:
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.abandoned = False  # 所有订阅者都走了，上游可以停了
+
+
+class _SharedCall:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests.
+
+    stream(): one upstream generator is pumped by a background thread and fanned
+    out to every subscriber (late joiners replay the buffered chunks first).
+    A subscriber that stops iterating detaches; the upstream is only closed when
+    nobody is left. Finished flights are forgotten — this is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self._calls: Dict[Hashable, _SharedCall] = {}
+        self.upstream_count = 0   # 实际发往后端的请求数
+        self.coalesced_count = 0  # 直接搭车的请求数
+
+    # ---------- streaming ----------
+
+    def stream(self, key: Hashable, factory: Callable[[], Iterator[str]]) -> Iterator[str]:
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = _SharedStream()
+                self._streams[key] = shared
+                self.upstream_count += 1
+                leader = True
+            else:
+                self.coalesced_count += 1
+                leader = False
+            with shared.cond:
+                shared.subscribers += 1
+
+        if leader:
+            threading.Thread(
+                target=self._pump,
+                args=(key, shared, factory),
+                name="ollama-singleflight",
+                daemon=True,
+            ).start()
+        return self._subscribe(key, shared)
+
+    def _pump(self, key: Hashable, shared: _SharedStream, factory: Callable[[], Iterator[str]]) -> None:
+        upstream = None
+        try:
+            upstream = factory()
+            for chunk in upstream:
+                with shared.cond:
+                    if shared.abandoned:
+                        break
+                    shared.chunks.append(chunk)
+                    shared.cond.notify_all()
+        except BaseException as e:  # noqa: BLE001 - re-raised in every subscriber
+            with shared.cond:
+                shared.error = e
+        finally:
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+            with self._lock:
+                if self._streams.get(key) is shared:
+                    del self._streams[key]
+            with shared.cond:
+                shared.done = True
+                shared.cond.notify_all()
+
+    def _subscribe(self, key: Hashable, shared: _SharedStream) -> Iterator[str]:
+        index = 0
+        try:
+            while True:
+                with shared.cond:
+                    while index >= len(shared.chunks) and not shared.done:
+                        shared.cond.wait()
+                    pending = shared.chunks[index:]
+                    index += len(pending)
+                    finished = shared.done and index >= len(shared.chunks)
+                    error = shared.error
+                for chunk in pending:
+                    yield chunk
+                if finished:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            with self._lock, shared.cond:
+                shared.subscribers -= 1
+                if shared.subscribers <= 0 and not shared.done:
+                    # 新请求不能再搭这条会被提前截断的流
+                    shared.abandoned = True
+                    if self._streams.get(key) is shared:
+                        del self._streams[key]
+
+    # ---------- non-streaming ----------
+
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            shared = self._calls.get(key)
+            leader = shared is None
+            if leader:
+                shared = _SharedCall()
+                self._calls[key] = shared
+                self.upstream_count += 1
+            else:
+                self.coalesced_count += 1
+
+        if not leader:
+            shared.event.wait()
+            if shared.error is not None:
+                raise shared.error
+            return shared.result
+
+        try:
+            shared.result = fn()
+            return shared.result
+        except BaseException as e:  # noqa: BLE001 - shared with followers
+            shared.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is shared:
+                    del self._calls[key]
+            shared.event.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._streams) + len(self._calls)
@@ -0,0 +1,200 @@
+# hy_translator/backend/concurrency.py
+
+from __future__ import annotations
+from dataclasses import dataclass
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from core.metrics import REGISTRY, TTFT_BUCKETS
+
+
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "ollama_concurrency_limit",
+    "Current adaptive limit on concurrent generations per Ollama host.",
+    ("host",),
+)
+CONCURRENCY_IN_FLIGHT = REGISTRY.gauge(
+    "ollama_concurrency_in_flight",
+    "Generations holding a concurrency slot per Ollama host.",
+    ("host",),
+)
+CONCURRENCY_DECISIONS = REGISTRY.counter(
+    "ollama_concurrency_decisions_total",
+    "Adaptive concurrency decisions per Ollama host.",
+    ("host", "decision"),  # seed / increase / hold / decrease_latency / decrease_error
+)
+CONCURRENCY_WAIT_SECONDS = REGISTRY.histogram(
+    "ollama_concurrency_wait_seconds",
+    "Time a generation waited for a concurrency slot.",
+    TTFT_BUCKETS,
+)
+
+
+@dataclass
+class ConcurrencyOptions:
+    min_limit: int = 1
+    max_limit: int = 8
+    initial_limit: int = 2        # /api/ps 给不出线索时的起点
+    gpu_seed_limit: int = 4       # 模型整个在显存里时的起点（Ollama 默认的并行数）
+    # 平滑后的 TTFT 超过基线 tolerance 倍（且至少多出 min_inflation_sec），
+    # 或 tokens/s 跌到基线的 1/tolerance，就认为后端过载
+    tolerance: float = 2.0
+    min_inflation_sec: float = 0.05
+    backoff: float = 0.9          # 延迟膨胀时乘性收缩
+    error_backoff: float = 0.5    # 出错时乘性收缩
+    smoothing: float = 0.3        # EWMA 系数
+    baseline_drift: float = 0.01  # 基线每个样本放宽的比例，避免永远停在历史最好值
+
+
+def seed_limit(entry: Optional[Dict[str, Any]], opt: ConcurrencyOptions) -> Optional[int]:
+    """
+    Starting limit from the model's /api/ps entry: fully in VRAM -> gpu_seed_limit,
+    partly or wholly on CPU -> min_limit. None when there is nothing to go on.
+    """
+    if not entry:
+        return None
+    size, vram = entry.get("size"), entry.get("size_vram")
+    if not isinstance(size, (int, float)) or not isinstance(vram, (int, float)) or size <= 0:
+        return None
+    return opt.gpu_seed_limit if vram >= size else opt.min_limit
+
+
+@dataclass
+class Ticket:
+    started: float
+    limited: bool  # 拿到槽位时已经顶到上限（或排过队），这时才值得加大并发
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on concurrent generations against one Ollama host.
+
+    Each finished generation reports its time to first token (minus model load),
+    tokens/s and whether it failed. The limit grows by ~1 per `limit` samples
+    while both stay within `tolerance` of their best recent values and the limit
+    was actually binding; it shrinks multiplicatively when either inflates or a
+    request fails.
+    """
+
+    def __init__(self, host: str, opt: Optional[ConcurrencyOptions] = None):
+        self.host = host.rstrip("/")
+        self.opt = opt or ConcurrencyOptions()
+        self._cond = threading.Condition()
+        self._limit = float(self._clamp(self.opt.initial_limit))
+        self._in_flight = 0
+        self.seeded = False
+        self.last_decision = ""
+        self._ttft_base: Optional[float] = None
+        self._ttft_avg: Optional[float] = None
+        self._tps_base: Optional[float] = None
+        self._tps_avg: Optional[float] = None
+        self._publish()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _clamp(self, value: float) -> float:
+        return float(min(self.opt.max_limit, max(self.opt.min_limit, value)))
+
+    def _publish(self) -> None:
+        CONCURRENCY_LIMIT.labels(self.host).set(self.limit)
+        CONCURRENCY_IN_FLIGHT.labels(self.host).set(self._in_flight)
+
+    def _decide(self, decision: str) -> None:
+        self.last_decision = decision
+        CONCURRENCY_DECISIONS.labels(self.host, decision).inc()
+
+    def seed(self, limit: Optional[int]) -> None:
+        """Apply the /api/ps based starting point once; later calls are ignored."""
+        with self._cond:
+            if self.seeded:
+                return
+            self.seeded = True
+            if limit is None:
+                return
+            self._limit = self._clamp(limit)
+            self._decide("seed")
+            self._publish()
+            self._cond.notify_all()
+
+    def acquire(self) -> Ticket:
+        started = time.perf_counter()
+        with self._cond:
+            waited = False
+            while self._in_flight >= self.limit:
+                waited = True
+                self._cond.wait()
+            self._in_flight += 1
+            limited = waited or self._in_flight >= self.limit
+            self._publish()
+        CONCURRENCY_WAIT_SECONDS.observe(time.perf_counter() - started)
+        return Ticket(started=time.perf_counter(), limited=limited)
+
+    def release(
+        self,
+        ticket: Ticket,
+        ttft_sec: Optional[float] = None,
+        tokens_per_sec: Optional[float] = None,
+        error: bool = False,
+    ) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._update(ticket, ttft_sec, tokens_per_sec, error)
+            self._publish()
+            self._cond.notify_all()
+
+    def _ewma(self, avg: Optional[float], value: float) -> float:
+        a = self.opt.smoothing
+        return value if avg is None else a * value + (1 - a) * avg
+
+    def _update(self, ticket: Ticket, ttft: Optional[float], tps: Optional[float], error: bool) -> None:
+        o = self.opt
+        if error:
+            self._limit = self._clamp(self._limit * o.error_backoff)
+            self._decide("decrease_error")
+            return
+
+        inflated = False
+        if ttft is not None and ttft >= 0:
+            self._ttft_avg = self._ewma(self._ttft_avg, ttft)
+            base = self._ttft_base
+            self._ttft_base = ttft if base is None else min(ttft, base * (1 + o.baseline_drift))
+            inflated |= (
+                self._ttft_avg > self._ttft_base * o.tolerance
+                and self._ttft_avg - self._ttft_base > o.min_inflation_sec
+            )
+        if tps:
+            self._tps_avg = self._ewma(self._tps_avg, tps)
+            base = self._tps_base
+            self._tps_base = tps if base is None else max(tps, base * (1 - o.baseline_drift))
+            inflated |= self._tps_avg < self._tps_base / o.tolerance
+
+        if inflated:
+            self._limit = self._clamp(self._limit * o.backoff)
+            self._decide("decrease_latency")
+        elif ticket.limited and self._limit < o.max_limit:
+            self._limit = self._clamp(self._limit + 1.0 / self._limit)
+            self._decide("increase")
+        else:
+            self._decide("hold")
+
+
+_controllers: Dict[str, AdaptiveConcurrency] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_concurrency_controller(host: str, opt: Optional[ConcurrencyOptions] = None) -> AdaptiveConcurrency:
+    """Shared controller per host: every backend instance (and every api_server thread) competes for the same slots."""
+    key = host.rstrip("/")
+    with _controllers_lock:
+        controller = _controllers.get(key)
+        if controller is None:
+            controller = AdaptiveConcurrency(key, opt)
+            _controllers[key] = controller
+        return controller
@@ -11,4 +11,8 @@ class BackendRequestError(BackendError):
 
 
 class ModelNotFoundError(BackendError):
-    """Model not found in backend."""
\ No newline at end of file
+    """Model not found in backend."""
+
+
+class GenerationTimeoutError(BackendRequestError):
+    """Generation stalled between chunks or ran past its deadline."""
@@ -0,0 +1,166 @@
+# hy_translator/backend/health.py
+
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass
+class HealthState:
+    reachable: bool
+    host: str
+    model: str
+    model_present: Optional[bool] = None  # None: 没查到（服务不可达）
+    version: Optional[str] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+    checked_at: float = 0.0  # time.time()
+
+    @property
+    def ok(self) -> bool:
+        return self.reachable and self.model_present is not False
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["ok"] = self.ok
+        return data
+
+
+def _request_json(url: str, payload: Optional[dict], timeout: float) -> dict:
+    import urllib.request
+
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    req = urllib.request.Request(
+        url,
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST" if payload is not None else "GET",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        body = resp.read().decode("utf-8")
+    return json.loads(body) if body else {}
+
+
+class HealthProbe:
+    """
+    Lightweight Ollama health check: /api/version for liveness, /api/show for
+    model presence. Neither endpoint loads the model.
+
+    Results are cached for `ttl_sec`; with the background refresher running,
+    get() never waits on the network after the first probe.
+    """
+
+    def __init__(self, host: str, model: str, ttl_sec: float = 10.0, timeout_sec: float = 2.0):
+        self.host = host.rstrip("/")
+        self.model = model
+        self.ttl_sec = ttl_sec
+        self.timeout_sec = timeout_sec
+
+        self._lock = threading.Lock()
+        self._state: Optional[HealthState] = None
+        self._checked_mono = 0.0
+        self._refresher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def check(self) -> HealthState:
+        import urllib.error
+
+        started = time.perf_counter()
+        state = HealthState(reachable=False, host=self.host, model=self.model)
+        try:
+            version = _request_json(f"{self.host}/api/version", None, self.timeout_sec)
+            state.reachable = True
+            state.version = version.get("version")
+            try:
+                _request_json(
+                    f"{self.host}/api/show",
+                    {"model": self.model, "name": self.model},
+                    self.timeout_sec,
+                )
+                state.model_present = True
+            except urllib.error.HTTPError as e:
+                if e.code != 404:
+                    raise
+                state.model_present = False
+                state.error = f"Model not found: {self.model}"
+        except urllib.error.HTTPError as e:
+            state.error = f"Ollama HTTP {e.code}"
+        except Exception as e:
+            state.error = f"Ollama not reachable: {self.host} ({e})"
+
+        state.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        state.checked_at = time.time()
+        with self._lock:
+            self._state = state
+            self._checked_mono = time.monotonic()
+        return state
+
+    def cached(self) -> Optional[HealthState]:
+        with self._lock:
+            return self._state
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._state is not None and time.monotonic() - self._checked_mono < self.ttl_sec
+
+    def get(self) -> HealthState:
+        with self._lock:
+            state = self._state
+            fresh = state is not None and time.monotonic() - self._checked_mono < self.ttl_sec
+            refreshing = self._refresher is not None and self._refresher.is_alive()
+        if state is not None and (fresh or refreshing):
+            return state
+        return self.check()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._checked_mono = 0.0
+
+    # ---------- background refresh ----------
+
+    def start_refresher(self, interval_sec: Optional[float] = None) -> None:
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            # 每个线程一个停止信号：旧线程还没退出时重启，不会把它的停止信号清掉
+            self._stop = threading.Event()
+            interval = interval_sec if interval_sec is not None else max(1.0, self.ttl_sec / 2)
+            self._refresher = threading.Thread(
+                target=self._refresh_loop,
+                args=(interval, self._stop),
+                name=f"ollama-health:{self.host}",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def stop_refresher(self, wait: bool = True) -> None:
+        """wait=False only signals the thread; it exits after the check in flight."""
+        with self._lock:
+            self._stop.set()
+            thread = self._refresher
+            self._refresher = None
+        if thread is not None and wait:
+            thread.join(timeout=self.timeout_sec * 2 + 1)
+
+    def _refresh_loop(self, interval: float, stop: threading.Event) -> None:
+        while not stop.is_set():
+            self.check()
+            stop.wait(interval)
+
+
+_probes: Dict[Tuple[str, str], HealthProbe] = {}
+_probes_lock = threading.Lock()
+
+
+def get_health_probe(host: str, model: str, ttl_sec: float = 10.0) -> HealthProbe:
+    """Shared probe per (host, model) so every backend instance reuses one cache."""
+    key = (host.rstrip("/"), model)
+    with _probes_lock:
+        probe = _probes.get(key)
+        if probe is None:
+            probe = HealthProbe(host, model, ttl_sec=ttl_sec)
+            _probes[key] = probe
+        return probe
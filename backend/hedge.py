@@ -0,0 +1,244 @@
+# hy_translator/backend/hedge.py
+
+from __future__ import annotations
+from collections import deque
+import queue
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from core.metrics import REGISTRY
+
+from .errors import GenerationTimeoutError
+from .stats import GenerationStats
+
+
+HEDGED_REQUESTS = REGISTRY.counter(
+    "ollama_hedged_requests_total",
+    "Duplicate generations sent to a backup host because the first one was slow or failed.",
+    ("host",),
+)
+HEDGE_WINS = REGISTRY.counter(
+    "ollama_hedge_wins_total",
+    "Which request of a hedged generation delivered first.",
+    ("winner",),  # primary / hedge
+)
+GENERATION_TIMEOUTS = REGISTRY.counter(
+    "ollama_generation_timeouts_total",
+    "Generations abandoned for stalling between chunks or running past their deadline.",
+    ("reason",),  # idle / deadline
+)
+
+# 样本少于这个数时分位数不可信，用固定的对冲延迟
+MIN_LATENCY_SAMPLES = 20
+
+
+
+class CancelScope:
+    """
+    Lets the consuming thread abort an upstream that is blocked on another
+    thread: callbacks registered by the upstream (closing its socket, releasing
+    its concurrency slot) run on cancel(). `reason` is "timeout" when the
+    generation was abandoned for stalling or running out of time, "cancelled"
+    when it simply lost a hedge or the consumer stopped reading.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def on_cancel(self, fn: Callable[[], None]) -> None:
+        with self._lock:
+            if self.reason is None:
+                self._callbacks.append(fn)
+                return
+        _run_quietly(fn)
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            _run_quietly(fn)
+
+
+def _run_quietly(fn: Callable[[], None]) -> None:
+    try:
+        fn()
+    except Exception:
+        pass
+
+
+Source = Tuple[str, Callable[[CancelScope], Iterable[Any]]]  # (host, 创建上游流的工厂)
+
+
+class LatencyTracker:
+    """Recent time-to-first-chunk samples for one host."""
+
+    def __init__(self, size: int = 256):
+        self._lock = threading.Lock()
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def observe(self, sec: float) -> None:
+        with self._lock:
+            self._samples.append(sec)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(host: str) -> LatencyTracker:
+    key = host.rstrip("/")
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = LatencyTracker()
+        return tracker
+
+
+class _Pump:
+    """Drains one upstream stream on a background thread into the shared queue."""
+
+    def __init__(self, host: str, factory: Callable[[CancelScope], Iterable[Any]], out: "queue.Queue[tuple]"):
+        self.host = host
+        self.started = time.perf_counter()
+        self.finished = False  # 消费方已收到 end / error
+        self.scope = CancelScope()
+        self._factory = factory
+        self._out = out
+        threading.Thread(target=self._run, name="ollama-hedge", daemon=True).start()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        # 上游注册的回调会断开连接，阻塞中的读取立刻返回，不用等 socket 超时
+        self.scope.cancel(reason)
+
+    def _run(self) -> None:
+        upstream = None
+        try:
+            upstream = self._factory(self.scope)
+            for item in upstream:
+                if self.scope.cancelled:
+                    return
+                self._out.put((self, "item", item))
+            self._out.put((self, "end", None))
+        except BaseException as e:  # noqa: BLE001 - re-raised by the consumer
+            self._out.put((self, "error", e))
+        finally:
+            close = getattr(upstream, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+
+
+def guarded_stream(
+    sources: List[Source],
+    idle_timeout_sec: Optional[float] = None,
+    deadline_sec: Optional[float] = None,
+    hedge_after_sec: float = 2.0,
+    hedge_percentile: float = 0.95,
+):
+    """
+    Streams from sources[0] with an inter-chunk idle timeout and an overall
+    deadline; both raise GenerationTimeoutError and drop the upstream.
+
+    Further sources are backups: if the primary has not produced anything after
+    its host's recent time-to-first-chunk percentile (hedge_after_sec until there
+    are enough samples), or fails before producing anything, the same request is
+    sent to the next one. Whichever delivers first wins, the others are cancelled,
+    and the final GenerationStats carries the winner's host.
+    """
+    out: "queue.Queue[tuple]" = queue.Queue()
+    started = time.perf_counter()
+    deadline = started + deadline_sec if deadline_sec else None
+    hedging = len(sources) > 1
+    primary_host = sources[0][0]
+    pending = list(sources[1:])
+    pumps = [_Pump(primary_host, sources[0][1], out)]
+    hedge_delay = get_latency_tracker(primary_host).percentile(hedge_percentile)
+    if hedge_delay is None:
+        hedge_delay = hedge_after_sec
+    hedge_at: Optional[float] = started + hedge_delay if pending else None
+    winner: Optional[_Pump] = None
+    last_item: Optional[float] = None  # 首个分片之前不算空闲（prompt eval 可能很长）
+
+    def launch_hedge() -> None:
+        nonlocal hedge_at
+        host, factory = pending.pop(0)
+        HEDGED_REQUESTS.labels(host.rstrip("/")).inc()
+        pumps.append(_Pump(host, factory, out))
+        hedge_at = time.perf_counter() + hedge_delay if pending else None
+
+    try:
+        while True:
+            now = time.perf_counter()
+            waits = []
+            if deadline is not None:
+                waits.append(deadline - now)
+            if idle_timeout_sec and last_item is not None:
+                waits.append(last_item + idle_timeout_sec - now)
+            if winner is None and hedge_at is not None:
+                waits.append(hedge_at - now)
+            try:
+                pump, kind, value = out.get(timeout=max(0.0, min(waits)) if waits else None)
+            except queue.Empty:
+                now = time.perf_counter()
+                if winner is None and hedge_at is not None and now >= hedge_at:
+                    launch_hedge()
+                    continue
+                if deadline is not None and now >= deadline:
+                    reason, message = "deadline", f"Generation exceeded its {deadline_sec:g}s deadline."
+                elif last_item is not None and now - last_item >= idle_timeout_sec:
+                    reason, message = "idle", f"No output from Ollama for {idle_timeout_sec:g}s."
+                else:
+                    continue
+                GENERATION_TIMEOUTS.labels(reason).inc()
+                for pump in pumps:
+                    pump.cancel("timeout")  # 并发槽按出错归还
+                raise GenerationTimeoutError(message)
+
+            if winner is not None and pump is not winner:
+                continue  # 输掉的请求在取消前送来的分片
+            if kind == "error":
+                pump.finished = True
+                if winner is None:
+                    # 还没出结果就失败：有别的请求在跑就等它，否则立刻换下一个 host
+                    if any(not p.finished for p in pumps):
+                        continue
+                    if pending:
+                        launch_hedge()
+                        continue
+                raise value
+            if winner is None:
+                winner = pump
+                get_latency_tracker(pump.host).observe(time.perf_counter() - pump.started)
+                for other in pumps:
+                    if other is not winner:
+                        other.cancel()
+                if len(pumps) > 1:
+                    HEDGE_WINS.labels("primary" if winner is pumps[0] else "hedge").inc()
+            if kind == "end":
+                return
+            last_item = time.perf_counter()
+            if hedging and isinstance(value, GenerationStats):
+                value.host = winner.host
+            yield value
+    finally:
+        for pump in pumps:
+            pump.cancel()
@@ -1,12 +1,136 @@
 # hy_translator/backend/ollama_backend.py
 
 from __future__ import annotations
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
+import socket
 import sys
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
 
+from core.metrics import REGISTRY, SEGMENT_BUCKETS, TTFT_BUCKETS
+
+from .coalesce import SingleFlight
+from .concurrency import AdaptiveConcurrency, ConcurrencyOptions, get_concurrency_controller, seed_limit
 from .errors import BackendUnavailableError, BackendRequestError, ModelNotFoundError
+from .health import HealthState, get_health_probe
+from .hedge import CancelScope, guarded_stream
+from .stats import GenerationResult, GenerationStats, GenerationStream
+
+
+OLLAMA_REQUESTS = REGISTRY.counter(
+    "ollama_requests_total",
+    "Generation requests sent to Ollama.",
+    ("kind", "outcome"),  # kind: chat / stream；outcome: ok / error / cancelled
+)
+OLLAMA_IN_FLIGHT = REGISTRY.gauge("ollama_generations_in_flight", "Generations currently running against Ollama.")
+OLLAMA_GENERATION_SECONDS = REGISTRY.histogram(
+    "ollama_generation_seconds", "Wall time of one Ollama generation.", SEGMENT_BUCKETS
+)
+OLLAMA_TTFT_SECONDS = REGISTRY.histogram(
+    "ollama_time_to_first_token_seconds", "Time until the first streamed chunk arrives.", TTFT_BUCKETS
+)
+OLLAMA_PROMPT_TOKENS = REGISTRY.counter("ollama_prompt_tokens_total", "Prompt tokens evaluated by Ollama.")
+OLLAMA_EVAL_TOKENS = REGISTRY.counter("ollama_eval_tokens_total", "Tokens generated by Ollama.")
+OLLAMA_EVAL_SECONDS = REGISTRY.counter("ollama_eval_seconds_total", "Time Ollama spent generating tokens.")
+OLLAMA_LOAD_SECONDS = REGISTRY.counter("ollama_load_seconds_total", "Time Ollama spent loading the model.")
+OLLAMA_TOKENS_PER_SEC = REGISTRY.histogram(
+    "ollama_eval_tokens_per_second",
+    "Generation speed per request.",
+    (5, 10, 20, 40, 80, 160, 320),
+)
+
+
+def _record_stats(stats: GenerationStats) -> None:
+    OLLAMA_PROMPT_TOKENS.inc(stats.prompt_eval_count)
+    OLLAMA_EVAL_TOKENS.inc(stats.eval_count)
+    OLLAMA_EVAL_SECONDS.inc(stats.eval_duration / 1e9)
+    OLLAMA_LOAD_SECONDS.inc(stats.load_duration / 1e9)
+    if stats.eval_duration:
+        OLLAMA_TOKENS_PER_SEC.observe(stats.tokens_per_sec)
+
+
+def _tracked_stream(source, scope: Optional[CancelScope] = None):
+    """Wraps one upstream stream (after coalescing) with metrics."""
+    started = time.perf_counter()
+    first = True
+    outcome = "error"
+    OLLAMA_IN_FLIGHT.inc()
+    try:
+        for item in source:
+            if isinstance(item, GenerationStats):
+                _record_stats(item)
+            elif first:
+                first = False
+                OLLAMA_TTFT_SECONDS.observe(time.perf_counter() - started)
+            yield item
+        outcome = "ok"
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        if scope is not None and scope.cancelled:
+            # 连接是被这边断开的，上游读到的 EOF 不算正常结束
+            outcome = "error" if scope.reason == "timeout" else "cancelled"
+        OLLAMA_IN_FLIGHT.dec()
+        OLLAMA_GENERATION_SECONDS.observe(time.perf_counter() - started)
+        OLLAMA_REQUESTS.labels("stream", outcome).inc()
+
+
+def _limited_stream(controller: AdaptiveConcurrency, source, scope: Optional[CancelScope] = None):
+    """Holds a concurrency slot for the life of one upstream stream and reports how it went."""
+    ticket = controller.acquire()
+    ttft: Optional[float] = None
+    stats: Optional[GenerationStats] = None
+    error = False
+    lock = threading.Lock()
+    released = False
+
+    def release(**kwargs: Any) -> None:
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        controller.release(ticket, **kwargs)
+
+    if scope is not None:
+        # 取消时立刻归还槽位，不等上游线程退出；超时算作出错，让并发上限降下来
+        scope.on_cancel(lambda: release(error=scope.reason == "timeout"))
+    try:
+        for item in source:
+            if isinstance(item, GenerationStats):
+                stats = item
+            elif ttft is None:
+                ttft = time.perf_counter() - ticket.started
+            yield item
+    except ModelNotFoundError:
+        raise
+    except Exception:
+        error = True
+        raise
+    finally:
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        if ttft is not None and stats is not None:
+            ttft = max(0.0, ttft - stats.load_duration / 1e9)  # 模型加载不算拥塞
+        release(
+            ttft_sec=ttft,
+            tokens_per_sec=stats.tokens_per_sec if stats is not None else None,
+            error=error or (scope is not None and scope.reason == "timeout"),
+        )
+
+
+def _abort_response(resp: Any) -> None:
+    # 读取线程正阻塞在 readline 上，直接 close 会等缓冲区的锁；shutdown socket 让读立刻返回 EOF
+    sock = getattr(getattr(getattr(resp, "fp", None), "raw", None), "_sock", None)
+    if sock is not None:
+        sock.shutdown(socket.SHUT_RDWR)
 
 
 class OllamaMode(str, Enum):
@@ -26,6 +150,29 @@ class OllamaBackendOptions:
     host: str = "http://127.0.0.1:11434"
     timeout_sec: int = 60
 
+    # 每个请求都带上 keep_alive，避免空闲后模型被卸载（None 表示用 Ollama 默认的 5m）
+    keep_alive: Optional[Union[str, int]] = "30m"
+    # 预加载模型最长等待时间（大模型冷启动可能很慢）
+    load_timeout_sec: int = 300
+
+    # 相同 (model, options, prompt) 的并发请求只发一次，结果分发给所有等待者
+    coalesce: bool = True
+
+    # 同一 host 上并发生成数的自适应上限（AIMD）；None 表示不限制
+    concurrency: Optional[ConcurrencyOptions] = field(default_factory=ConcurrencyOptions)
+
+    # 流式生成：两个分片之间最长等待，超过视为卡死并断开（None 表示不限）。
+    # timeout_sec 管的是单次 socket 读，卡住的生成会把整篇文档拖上一分钟
+    idle_timeout_sec: Optional[float] = 30.0
+    # 流式生成：单次生成（一个段落）的总时限；None 表示不限。设了时限的流不参与 coalesce
+    deadline_sec: Optional[float] = None
+    # 备用 host（走 HTTP）：主请求迟迟没有输出或直接失败时，向下一个 host 发同样的请求，
+    # 先出结果的胜出，其余取消。等待时间取主 host 近期首分片延迟的 hedge_percentile 分位，
+    # 样本不够时用 hedge_after_sec
+    hedge_hosts: List[str] = field(default_factory=list)
+    hedge_percentile: float = 0.95
+    hedge_after_sec: float = 2.0
+
 
 class OllamaBackend:
     """
@@ -35,38 +182,144 @@ class OllamaBackend:
     - HTTP mode uses Ollama REST API (supports remote host).
     """
 
+    # 进程内共享：api_server 的多个请求线程会命中同一个实例
+    single_flight = SingleFlight()
+
     def __init__(self, cfg: OllamaBackendOptions = OllamaBackendOptions()):
         self.cfg = cfg
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
         """
         For your pipeline: generate(prompt) -> raw model output text.
+
+        `options` are merged over cfg.options for this request only (num_predict, stop, ...).
         """
         messages = [{"role": "user", "content": prompt}]
-        return self.chat(messages)
+        merged = self._request_options(options)
+        if self.cfg.coalesce:
+            return self.single_flight.call(
+                self._flight_key("chat", prompt, merged), lambda: self.chat(messages, merged)
+            )
+        return self.chat(messages, merged)
 
-    def stream_generate(self, prompt: str):
+    def stream_generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> GenerationStream:
         """
-        Streaming generator: yields raw text chunks.
+        Streaming: iterate raw text chunks; `.stats` is set once the stream is exhausted.
         """
         messages = [{"role": "user", "content": prompt}]
-        return self.stream_chat(messages)
+        merged = self._request_options(options)
+        # 带时限的流不共享：搭车的请求会继承发起者的 deadline，被别人的预算提前断开
+        if self.cfg.coalesce and self.cfg.deadline_sec is None:
+            return GenerationStream(
+                self.single_flight.stream(
+                    self._flight_key("stream", prompt, merged), lambda: self._stream_source(messages, merged)
+                )
+            )
+        return GenerationStream(self._stream_source(messages, merged))
 
-    def chat(self, messages: list[dict]) -> str:
-        if self.cfg.mode == OllamaMode.LOCAL:
-            return self._chat_local(messages)
-        return self._chat_http(messages)
+    def _request_options(self, extra: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        merged = dict(self.cfg.options or {})
+        if extra:
+            merged.update(extra)
+        return merged
 
-    def stream_chat(self, messages: list[dict]):
+    def _flight_key(self, kind: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> tuple:
+        import json
+
+        if options is None:
+            options = self.cfg.options or {}
+        options_json = json.dumps(options, sort_keys=True, default=str)
+        return (kind, self.cfg.mode.value, self.cfg.host.rstrip("/"), self.cfg.model, options_json, prompt)
+
+    def chat(self, messages: list[dict], options: Optional[Dict[str, Any]] = None) -> GenerationResult:
+        if options is None:
+            options = self._request_options(None)
+        controller = self.concurrency_controller()
+        ticket = controller.acquire() if controller is not None else None
+        started = time.perf_counter()
+        outcome = "error"
+        result: Optional[GenerationResult] = None
+        congested = True
+        OLLAMA_IN_FLIGHT.inc()
+        try:
+            if self.cfg.mode == OllamaMode.LOCAL:
+                result = self._chat_local(messages, options)
+            else:
+                result = self._chat_http(messages, options)
+            outcome = "ok"
+        except ModelNotFoundError:
+            congested = False
+            raise
+        finally:
+            OLLAMA_IN_FLIGHT.dec()
+            OLLAMA_GENERATION_SECONDS.observe(time.perf_counter() - started)
+            OLLAMA_REQUESTS.labels("chat", outcome).inc()
+            if ticket is not None:
+                stats = result.stats if result is not None else None
+                controller.release(
+                    ticket,
+                    tokens_per_sec=stats.tokens_per_sec if stats is not None else None,
+                    error=outcome == "error" and congested,
+                )
+        if result.stats is not None:
+            _record_stats(result.stats)
+        return result
+
+    def stream_chat(self, messages: list[dict], options: Optional[Dict[str, Any]] = None) -> GenerationStream:
+        if options is None:
+            options = self._request_options(None)
+        return GenerationStream(self._stream_source(messages, options))
+
+    def _stream_source(self, messages: list[dict], options: Dict[str, Any]):
+        # 依次产出 str 分片，最后一个元素是 GenerationStats（如果有）
+        cfg = self.cfg
+        primary = cfg.host.rstrip("/")
+        backups = [h for h in dict.fromkeys(h.rstrip("/") for h in cfg.hedge_hosts if h) if h != primary]
+        if not backups and cfg.idle_timeout_sec is None and cfg.deadline_sec is None:
+            return self._host_stream(messages, options)
+        sources = [(cfg.host, lambda scope: self._host_stream(messages, options, scope))]
+        for host in backups:
+            backup = OllamaBackend(replace(cfg, mode=OllamaMode.HTTP, host=host, hedge_hosts=[]))
+            sources.append((host, lambda scope, backup=backup: backup._host_stream(messages, options, scope)))
+        return guarded_stream(
+            sources,
+            idle_timeout_sec=cfg.idle_timeout_sec,
+            deadline_sec=cfg.deadline_sec,
+            hedge_after_sec=cfg.hedge_after_sec,
+            hedge_percentile=cfg.hedge_percentile,
+        )
+
+    def _host_stream(self, messages: list[dict], options: Dict[str, Any], scope: Optional[CancelScope] = None):
         if self.cfg.mode == OllamaMode.LOCAL:
-            return self._chat_local_stream(messages)
-        return self._chat_http_stream(messages)
+            # ollama 客户端的流没法从别的线程打断，取消后要等下一个分片才退出（槽位照样立刻归还）
+            source = self._chat_local_stream(messages, options)
+        else:
+            source = self._chat_http_stream(messages, options, scope)
+        controller = self.concurrency_controller()
+        if controller is not None:
+            source = _limited_stream(controller, source, scope)
+        return _tracked_stream(source, scope)
+
+    def concurrency_controller(self) -> Optional[AdaptiveConcurrency]:
+        """The shared per-host controller, seeded from /api/ps on first use."""
+        if self.cfg.concurrency is None:
+            return None
+        controller = get_concurrency_controller(self.cfg.host, self.cfg.concurrency)
+        if not controller.seeded:
+            try:
+                running = self.running_models()
+            except Exception:
+                running = []
+            wanted = _model_key(self.cfg.model)
+            entry = next((m for m in running if _model_key(m.get("model") or m.get("name") or "") == wanted), None)
+            controller.seed(seed_limit(entry, controller.opt))
+        return controller
 
     # ---------- LOCAL (python package) ----------
 
-    def _chat_local(self, messages: list[dict]) -> str:
+    def _chat_local(self, messages: list[dict], options: Dict[str, Any]) -> GenerationResult:
         if sys.platform.startswith("win"):
-            return self._chat_http(messages)
+            return self._chat_http(messages, options)
         try:
             import ollama  # type: ignore
         except Exception as e:
@@ -78,22 +331,25 @@ class OllamaBackend:
             resp = ollama.chat(
                 model=self.cfg.model,
                 messages=messages,
-                options=dict(self.cfg.options) if self.cfg.options else None,
+                options=dict(options) if options else None,
+                keep_alive=self.cfg.keep_alive,
             )
             # resp["message"]["content"]
             msg = resp.get("message", {})
             content = msg.get("content")
             if content is None:
                 raise BackendRequestError(f"Unexpected ollama.chat response: {resp}")
-            return content
+            return GenerationResult(content, GenerationStats.from_response(resp))
 
         except Exception as e:
             # ollama python client errors are not super standardized; keep message
             raise BackendRequestError(f"ollama.chat failed: {e}") from e
 
-    def _chat_local_stream(self, messages: list[dict]):
+    def _chat_local_stream(self, messages: list[dict], options: Dict[str, Any]):
         if sys.platform.startswith("win"):
-            return self._chat_http_stream(messages)
+            # 这里是生成器函数，return 出去的生成器不会被迭代
+            yield from self._chat_http_stream(messages, options)
+            return
         try:
             import ollama  # type: ignore
         except Exception as e:
@@ -105,7 +361,8 @@ class OllamaBackend:
             resp = ollama.chat(
                 model=self.cfg.model,
                 messages=messages,
-                options=dict(self.cfg.options) if self.cfg.options else None,
+                options=dict(options) if options else None,
+                keep_alive=self.cfg.keep_alive,
                 stream=True,
             )
             for chunk in resp:
@@ -113,12 +370,16 @@ class OllamaBackend:
                 content = msg.get("content")
                 if content:
                     yield content
+                if chunk.get("done"):
+                    stats = GenerationStats.from_response(chunk)
+                    if stats is not None:
+                        yield stats
         except Exception as e:
             raise BackendRequestError(f"ollama.chat(stream) failed: {e}") from e
 
     # ---------- HTTP (remote host) ----------
 
-    def _chat_http(self, messages: list[dict]) -> str:
+    def _chat_http(self, messages: list[dict], options: Dict[str, Any]) -> GenerationResult:
         import json
         import urllib.request
         import urllib.error
@@ -130,8 +391,10 @@ class OllamaBackend:
             "model": self.cfg.model,
             "messages": messages,
             "stream": False,
-            "options": dict(self.cfg.options),
+            "options": dict(options),
         }
+        if self.cfg.keep_alive is not None:
+            payload["keep_alive"] = self.cfg.keep_alive
 
         body = json.dumps(payload).encode("utf-8")
         req = urllib.request.Request(
@@ -158,9 +421,9 @@ class OllamaBackend:
         content = msg.get("content")
         if content is None:
             raise BackendRequestError(f"Unexpected /api/chat response: {obj}")
-        return content
+        return GenerationResult(content, GenerationStats.from_response(obj))
 
-    def _chat_http_stream(self, messages: list[dict]):
+    def _chat_http_stream(self, messages: list[dict], options: Dict[str, Any], scope: Optional[CancelScope] = None):
         import json
         import urllib.request
         import urllib.error
@@ -172,8 +435,10 @@ class OllamaBackend:
             "model": self.cfg.model,
             "messages": messages,
             "stream": True,
-            "options": dict(self.cfg.options),
+            "options": dict(options),
         }
+        if self.cfg.keep_alive is not None:
+            payload["keep_alive"] = self.cfg.keep_alive
 
         body = json.dumps(payload).encode("utf-8")
         req = urllib.request.Request(
@@ -185,6 +450,8 @@ class OllamaBackend:
 
         try:
             with urllib.request.urlopen(req, timeout=self.cfg.timeout_sec) as resp:
+                if scope is not None:
+                    scope.on_cancel(lambda: _abort_response(resp))
                 for raw_line in resp:
                     if not raw_line:
                         continue
@@ -192,12 +459,16 @@ class OllamaBackend:
                     if not line:
                         continue
                     obj = json.loads(line)
-                    if obj.get("done"):
-                        break
                     msg = obj.get("message", {})
                     content = msg.get("content")
                     if content:
                         yield content
+                    if obj.get("done"):
+                        # 最后一帧带着 prompt_eval_count / eval_duration 等统计
+                        stats = GenerationStats.from_response(obj)
+                        if stats is not None:
+                            yield stats
+                        break
         except urllib.error.HTTPError as e:
             msg = e.read().decode("utf-8", errors="ignore")
             if e.code == 404:
@@ -205,34 +476,134 @@ class OllamaBackend:
             raise BackendRequestError(f"Ollama HTTP {e.code}: {msg}") from e
         except urllib.error.URLError as e:
             raise BackendUnavailableError(f"Ollama not reachable: {base}") from e
+        except Exception:
+            if scope is not None and scope.cancelled:
+                return  # 连接是取消时这边断开的，读到的残帧不用管
+            raise
 
-    # Optional helpers (nice for UI)
-    def is_available(self) -> bool:
-        if self.cfg.mode == OllamaMode.LOCAL:
-            # Local mode still needs the daemon; simplest is try a tiny call
-            try:
-                _ = self._chat_local([{"role": "user", "content": "ping"}])
-                return True
-            except Exception:
-                return False
+    # ---------- model residency (both modes talk to the daemon over HTTP) ----------
 
-        # HTTP mode: call /api/version
+    def _http_json(self, path: str, payload: Optional[dict] = None, timeout: Optional[float] = None) -> dict:
         import json
         import urllib.request
         import urllib.error
 
         base = self.cfg.host.rstrip("/")
-        url = f"{base}/api/version"
-        body = json.dumps({}).encode("utf-8")
         req = urllib.request.Request(
-            url,
-            data=body,
+            f"{base}{path}",
+            data=json.dumps(payload).encode("utf-8") if payload is not None else None,
             headers={"Content-Type": "application/json"},
-            method="POST",
+            method="POST" if payload is not None else "GET",
         )
         try:
-            with urllib.request.urlopen(req, timeout=5) as resp:
-                _ = resp.read()
-            return True
+            with urllib.request.urlopen(req, timeout=timeout or self.cfg.timeout_sec) as resp:
+                data = resp.read().decode("utf-8")
+                return json.loads(data) if data else {}
+        except urllib.error.HTTPError as e:
+            msg = e.read().decode("utf-8", errors="ignore")
+            if e.code == 404:
+                raise ModelNotFoundError(msg) from e
+            raise BackendRequestError(f"Ollama HTTP {e.code}: {msg}") from e
+        except urllib.error.URLError as e:
+            raise BackendUnavailableError(f"Ollama not reachable: {base}") from e
+
+    def running_models(self) -> list[dict]:
+        """Models currently resident in the daemon (/api/ps)."""
+        return list(self._http_json("/api/ps", timeout=5).get("models") or [])
+
+    def is_model_loaded(self) -> Optional[bool]:
+        """True/False from /api/ps; None when the daemon cannot be asked."""
+        try:
+            running = self.running_models()
         except Exception:
-            return False
+            return None
+        wanted = _model_key(self.cfg.model)
+        return any(_model_key(m.get("model") or m.get("name") or "") == wanted for m in running)
+
+    def warm_up(self) -> float:
+        """
+        Preload the model with an empty prompt and refresh its keep_alive.
+
+        Returns the model load time in seconds reported by Ollama (0.0 if it was resident).
+        """
+        payload: Dict[str, Any] = {"model": self.cfg.model, "prompt": "", "stream": False}
+        if self.cfg.keep_alive is not None:
+            payload["keep_alive"] = self.cfg.keep_alive
+        started = time.perf_counter()
+        obj = self._http_json("/api/generate", payload, timeout=self.cfg.load_timeout_sec)
+        load_ns = obj.get("load_duration")
+        if isinstance(load_ns, (int, float)):
+            return load_ns / 1e9
+        return time.perf_counter() - started
+
+    # Optional helpers (nice for UI)
+    def health(self) -> HealthState:
+        """
+        Cached, model-free health state (see backend.health.HealthProbe).
+
+        LOCAL mode talks to the same daemon over HTTP, so both modes share the probe.
+        """
+        return get_health_probe(self.cfg.host, self.cfg.model).get()
+
+    def is_available(self) -> bool:
+        return self.health().reachable
+
+
+# SingleFlight 自己维护计数，抓取时读出来即可
+REGISTRY.counter(
+    "ollama_coalesced_requests_total",
+    "Requests served by joining an identical in-flight generation.",
+    fn=lambda: OllamaBackend.single_flight.coalesced_count,
+)
+REGISTRY.gauge(
+    "ollama_singleflight_in_flight",
+    "Distinct generations currently shared through the coalescer.",
+    fn=lambda: OllamaBackend.single_flight.in_flight(),
+)
+
+
+def _model_key(name: str) -> str:
+    # Ollama 对不带 tag 的模型名默认补 :latest
+    name = name.strip()
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+class KeepAliveHeartbeat:
+    """
+    Periodically re-sends an empty warm-up request so the model stays resident
+    while the app is open.
+    """
+
+    def __init__(self, backend: OllamaBackend, interval_sec: float = 240.0):
+        self.backend = backend
+        self.interval_sec = interval_sec
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ollama-keepalive", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        self._thread = None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.backend.warm_up()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+            self._stop.wait(self.interval_sec)
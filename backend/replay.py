@@ -0,0 +1,229 @@
+# hy_translator/backend/replay.py
+
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .errors import BackendRequestError
+from .stats import GenerationResult, GenerationStats, GenerationStream
+
+
+class CassetteMissError(BackendRequestError):
+    """Replay asked for a (prompt, options) pair that was never recorded."""
+
+
+def _options_key(options: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(options or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+@dataclass
+class Interaction:
+    prompt: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    # (距离请求开始的秒数, 文本分片)；非流式的 generate 只有一个分片
+    chunks: List[Tuple[float, str]] = field(default_factory=list)
+    stats: Optional[GenerationStats] = None
+    model: str = ""
+    complete: bool = True  # False 表示调用方中途关闭了流（例如重复检测截断）
+
+    @property
+    def output(self) -> str:
+        return "".join(text for _, text in self.chunks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prompt": self.prompt,
+            "options": self.options,
+            "model": self.model,
+            "chunks": [[round(offset, 4), text] for offset, text in self.chunks],
+            "stats": None if self.stats is None else {
+                k: v for k, v in self.stats.to_dict().items() if k not in ("tokens_per_sec", "prompt_tokens_per_sec")
+            },
+            "complete": self.complete,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Interaction":
+        return cls(
+            prompt=data["prompt"],
+            options=data.get("options") or {},
+            chunks=[(float(offset), text) for offset, text in data.get("chunks") or []],
+            stats=GenerationStats.from_response(data.get("stats")),
+            model=data.get("model") or "",
+            complete=data.get("complete", True),
+        )
+
+
+class Cassette:
+    """
+    Recorded model interactions, one JSON object per line.
+
+    Lines are appended as they are recorded, so a crashed session keeps what it
+    already captured. A (prompt, options) pair recorded several times is
+    replayed in recording order; the last recording then repeats.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = os.fspath(path)
+        self._lock = threading.Lock()
+        self._exact: Dict[Tuple[str, str], List[Interaction]] = {}
+        self._by_prompt: Dict[str, List[Interaction]] = {}
+        self._cursor: Dict[Any, int] = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._index(Interaction.from_dict(json.loads(line)))
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._exact.values())
+
+    def _index(self, item: Interaction) -> None:
+        self._exact.setdefault((item.prompt, _options_key(item.options)), []).append(item)
+        self._by_prompt.setdefault(item.prompt, []).append(item)
+
+    def record(self, item: Interaction) -> None:
+        line = json.dumps(item.to_dict(), ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._index(item)
+
+    def lookup(self, prompt: str, options: Optional[Dict[str, Any]] = None, match_options: bool = True) -> Optional[Interaction]:
+        key: Any = (prompt, _options_key(options))
+        items = self._exact.get(key)
+        if items is None and not match_options:
+            key, items = prompt, self._by_prompt.get(prompt)
+        if not items:
+            return None
+        with self._lock:
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = i + 1
+        return items[min(i, len(items) - 1)]
+
+
+class RecordingBackend:
+    """
+    Wraps a real backend and writes every generation to a cassette.
+
+    Anything else (is_model_loaded, warm_up, cfg, ...) is passed through.
+    """
+
+    def __init__(self, inner: Any, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+    @property
+    def _model(self) -> str:
+        return getattr(getattr(self.inner, "cfg", None), "model", "") or ""
+
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        started = time.perf_counter()
+        result = self.inner.generate(prompt, options) if options is not None else self.inner.generate(prompt)
+        self.cassette.record(Interaction(
+            prompt=prompt,
+            options=dict(options or {}),
+            chunks=[(time.perf_counter() - started, str(result))],
+            stats=getattr(result, "stats", None),
+            model=self._model,
+        ))
+        return result
+
+    def stream_generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> GenerationStream:
+        inner = self.inner.stream_generate(prompt, options) if options is not None else self.inner.stream_generate(prompt)
+        return GenerationStream(self._record_stream(prompt, options, inner))
+
+    def _record_stream(self, prompt: str, options: Optional[Dict[str, Any]], inner: Any):
+        item = Interaction(prompt=prompt, options=dict(options or {}), model=self._model, complete=False)
+        started = time.perf_counter()
+        try:
+            for chunk in inner:
+                item.chunks.append((time.perf_counter() - started, chunk))
+                yield chunk
+            item.complete = True
+        finally:
+            # 调用方提前 close() 时也记下已经收到的部分，回放时会在同一位置结束
+            close = getattr(inner, "close", None)
+            if not item.complete and close is not None:
+                close()
+            item.stats = getattr(inner, "stats", None)
+            self.cassette.record(item)
+        if item.stats is not None:
+            yield item.stats
+
+
+class ReplayBackend:
+    """
+    Serves recorded generations without a model.
+
+    speed=1.0 replays chunks at their recorded offsets (time to first token
+    included); 2.0 twice as fast; 0 as fast as possible. With
+    match_options=False a prompt recorded with different options (or by the
+    service, which sends num_predict / stop) still matches.
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 0.0, match_options: bool = True, model: str = ""):
+        self.cassette = cassette
+        self.speed = speed
+        self.match_options = match_options
+        self.model = model
+
+    def _find(self, prompt: str, options: Optional[Dict[str, Any]]) -> Interaction:
+        item = self.cassette.lookup(prompt, options, self.match_options)
+        if item is None:
+            raise CassetteMissError(f"No recording for prompt ({len(prompt)} chars) in {self.cassette.path}")
+        return item
+
+    def _wait_until(self, started: float, offset: float) -> None:
+        if self.speed > 0:
+            delay = started + offset / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> GenerationResult:
+        item = self._find(prompt, options)
+        if item.chunks:
+            self._wait_until(time.perf_counter(), item.chunks[-1][0])
+        return GenerationResult(item.output, item.stats)
+
+    def stream_generate(self, prompt: str, options: Optional[Dict[str, Any]] = None) -> GenerationStream:
+        return GenerationStream(self._replay(self._find(prompt, options)))
+
+    def _replay(self, item: Interaction) -> Iterator[Union[str, GenerationStats]]:
+        started = time.perf_counter()
+        for offset, text in item.chunks:
+            self._wait_until(started, offset)
+            yield text
+        if item.stats is not None:
+            yield item.stats
+
+    # 服务层会顺带调用的接口：回放时模型总是“已加载”
+    def is_model_loaded(self) -> Optional[bool]:
+        return True
+
+    def warm_up(self) -> float:
+        return 0.0
+
+
+def recording_factory(path: Union[str, os.PathLike], make_backend: Callable[[Any], Any]) -> Callable[[Any], RecordingBackend]:
+    """For TranslationService.backend_factory: record through backends built by make_backend(cfg)."""
+    cassette = Cassette(path)
+    return lambda cfg: RecordingBackend(make_backend(cfg), cassette)
+
+
+def replay_factory(
+    path: Union[str, os.PathLike],
+    speed: float = 0.0,
+    match_options: bool = True,
+) -> Callable[[Any], ReplayBackend]:
+    """For TranslationService.backend_factory: replay a cassette regardless of the backend options."""
+    cassette = Cassette(path)
+    return lambda cfg: ReplayBackend(cassette, speed, match_options, getattr(cfg, "model", ""))
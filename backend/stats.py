@@ -0,0 +1,103 @@
+# hy_translator/backend/stats.py
+
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+
+@dataclass
+class GenerationStats:
+    """Timing counters from Ollama's final (`done`) frame. Durations are nanoseconds."""
+
+    prompt_eval_count: int = 0
+    prompt_eval_duration: int = 0
+    eval_count: int = 0
+    eval_duration: int = 0
+    load_duration: int = 0
+    total_duration: int = 0
+    done_reason: Optional[str] = None  # "stop" / "length"（被 num_predict 截断）/ ...
+    host: Optional[str] = None  # 配了对冲 host 时，实际给出结果的 host
+
+    @classmethod
+    def from_response(cls, obj: Any) -> Optional["GenerationStats"]:
+        get = getattr(obj, "get", None)
+        if get is None:
+            return None
+        fields = {}
+        for name in ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration",
+                     "load_duration", "total_duration"):
+            value = get(name)
+            if isinstance(value, (int, float)):
+                fields[name] = int(value)
+        if not fields:
+            return None
+        return cls(done_reason=get("done_reason"), **fields)
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.eval_count / (self.eval_duration / 1e9) if self.eval_duration else 0.0
+
+    @property
+    def prompt_tokens_per_sec(self) -> float:
+        return self.prompt_eval_count / (self.prompt_eval_duration / 1e9) if self.prompt_eval_duration else 0.0
+
+    def __add__(self, other: "GenerationStats") -> "GenerationStats":
+        return GenerationStats(
+            prompt_eval_count=self.prompt_eval_count + other.prompt_eval_count,
+            prompt_eval_duration=self.prompt_eval_duration + other.prompt_eval_duration,
+            eval_count=self.eval_count + other.eval_count,
+            eval_duration=self.eval_duration + other.eval_duration,
+            load_duration=self.load_duration + other.load_duration,
+            total_duration=self.total_duration + other.total_duration,
+            done_reason=other.done_reason or self.done_reason,
+            host=other.host or self.host,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["tokens_per_sec"] = round(self.tokens_per_sec, 2)
+        data["prompt_tokens_per_sec"] = round(self.prompt_tokens_per_sec, 2)
+        return data
+
+
+def sum_stats(items: Iterable[Optional[GenerationStats]]) -> Optional[GenerationStats]:
+    total: Optional[GenerationStats] = None
+    for item in items:
+        if item is not None:
+            total = item if total is None else total + item
+    return total
+
+
+class GenerationResult(str):
+    """The generated text; a str, so existing generate(prompt) -> str callers keep working."""
+
+    stats: Optional[GenerationStats]
+
+    def __new__(cls, text: str, stats: Optional[GenerationStats] = None) -> "GenerationResult":
+        obj = super().__new__(cls, text)
+        obj.stats = stats
+        return obj
+
+
+class GenerationStream:
+    """
+    Iterates text chunks; `stats` is filled in once the stream is exhausted.
+
+    The underlying chunk source yields str chunks and, last, one GenerationStats.
+    """
+
+    def __init__(self, source: Iterable[Union[str, GenerationStats]]):
+        self._source = source
+        self.stats: Optional[GenerationStats] = None
+
+    def __iter__(self) -> Iterator[str]:
+        for item in self._source:
+            if isinstance(item, GenerationStats):
+                self.stats = item
+                continue
+            yield item
+
+    def close(self) -> None:
+        close = getattr(self._source, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,105 @@
+"""
+Bridge protocol benchmark: ASCII-escaped JSON lines vs. length-prefixed UTF-8 frames.
+
+Replays the update events TranslationService emits while streaming a Chinese and
+a Japanese translation and reports bytes and host-side parse time per event.
+
+    python -m benchmarks.bench_bridge_protocol [--segments 40]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from python_backend.bridge import encode_frame, encode_json, iter_frames
+from python_backend.models import TranslationRequest
+from python_backend.services import translation_service
+from python_backend.services.translation_service import TranslationService
+
+DOCUMENTS = {
+    "zh": (
+        "The local model translates each line of the clipboard as it streams.",
+        "本地模型会在流式输出时逐行翻译剪贴板中的内容，并保持原有的段落结构。",
+    ),
+    "ja": (
+        "The local model translates each line of the clipboard as it streams.",
+        "ローカルモデルはクリップボードの各行をストリーミングしながら翻訳し、段落構造を保持します。",
+    ),
+}
+
+
+class _ChunkedBackend:
+    """Streams a fixed translation two characters at a time."""
+
+    translation = ""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+
+    def is_model_loaded(self):
+        return True
+
+    def stream_generate(self, prompt: str, options=None):
+        text = self.translation
+        for i in range(0, len(text), 2):
+            yield text[i:i + 2]
+
+
+def collect_events(target_lang: str, segments: int) -> list[dict]:
+    source, translation = DOCUMENTS[target_lang]
+    _ChunkedBackend.translation = translation
+    request = TranslationRequest(
+        text="\n".join(f"{source} ({i})" for i in range(segments)),
+        source_lang="en",
+        target_lang=target_lang,
+    )
+    with patch.object(translation_service, "OllamaBackend", _ChunkedBackend):
+        return list(TranslationService().stream_translate(request))
+
+
+def bench_jsonl(events: list[dict]) -> tuple[int, float]:
+    payload = "".join(encode_json(event) + "\n" for event in events).encode("ascii")
+    start = time.perf_counter()
+    for line in io.BytesIO(payload):
+        json.loads(line)
+    return len(payload), time.perf_counter() - start
+
+
+def bench_frames(events: list[dict]) -> tuple[int, float]:
+    payload = b"".join(encode_frame(event) for event in events)
+    start = time.perf_counter()
+    for _ in iter_frames(io.BytesIO(payload)):
+        pass
+    return len(payload), time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{'doc':<4} {'protocol':<8} {'events':>7} {'bytes/event':>12} {'parse us/event':>15}")
+    for lang in DOCUMENTS:
+        events = collect_events(lang, args.segments)
+        results = {"jsonl": bench_jsonl(events), "frames": bench_frames(events)}
+        for name, (size, seconds) in results.items():
+            print(
+                f"{lang:<4} {name:<8} {len(events):>7} {size / len(events):>12.0f} "
+                f"{seconds / len(events) * 1e6:>15.1f}"
+            )
+        ratio = results["jsonl"][0] / results["frames"][0]
+        print(f"{lang:<4} jsonl/frames size ratio: {ratio:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Micro-benchmark: extract_translation vs. the previous per-marker rfind + inline re.sub version.
+
+    python -m benchmarks.bench_postprocess [--number 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from core.postprocess import _MARKERS, PostProcessOptions, extract_translation
+
+CORPUS_PATH = os.path.join(ROOT_DIR, "tests", "data", "postprocess_corpus.json")
+
+
+def legacy_extract_translation(raw: str, opt: PostProcessOptions = PostProcessOptions()) -> str:
+    # 旧实现，仅用于对比
+    if raw is None:
+        return ""
+    text = raw.strip()
+    if not text:
+        return ""
+
+    positions = []
+    for mk in _MARKERS:
+        idx = text.rfind(mk) if opt.prefer_last_marker else text.find(mk)
+        if idx != -1:
+            positions.append((idx, mk))
+
+    if positions:
+        idx, mk = max(positions, key=lambda x: x[0])
+        text = text[idx + len(mk):].strip()
+
+    if opt.remove_leading_labels:
+        text = re.sub(r"^\s*(assistant|模型|翻译|译文)\s*[:：]\s*", "", text, flags=re.IGNORECASE).strip()
+
+    if opt.strip_quotes:
+        text = text.strip()
+        text = re.sub(r'^\s*[\"“”‘’\']\s*', "", text)
+        text = re.sub(r'\s*[\"“”‘’\']\s*$', "", text)
+        text = text.strip()
+
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    return text
+
+
+def load_corpus() -> list[str]:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [case["raw"] for case in json.load(f)]
+
+
+def bench(fn, corpus: list[str], number: int) -> float:
+    """Return mean microseconds per call."""
+    def run():
+        for raw in corpus:
+            fn(raw)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / (number * len(corpus)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    mismatches = sum(1 for raw in corpus if legacy_extract_translation(raw) != extract_translation(raw))
+
+    legacy_us = bench(legacy_extract_translation, corpus, args.number)
+    current_us = bench(extract_translation, corpus, args.number)
+    print(f"corpus: {len(corpus)} raw outputs, mismatches: {mismatches}")
+    print(f"legacy : {legacy_us:8.3f} us/call")
+    print(f"current: {current_us:8.3f} us/call")
+    print(f"speedup: {legacy_us / current_us:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
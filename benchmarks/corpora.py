@@ -0,0 +1,107 @@
+"""
+Reproducible synthetic documents for the benchmark suite.
+
+Every corpus is generated from a fixed seed, so two runs (or two machines)
+benchmark exactly the same text.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Callable, Dict, List
+
+SEED = 20240601
+
+_WORDS = {
+    "en": (
+        "the model translates each line of text quickly while keeping layout and meaning intact "
+        "local server clipboard paragraph sentence window shortcut result stream segment output"
+    ).split(),
+    "fr": (
+        "le modèle traduit chaque ligne du texte rapidement en gardant la mise en page et le sens "
+        "serveur local presse-papiers paragraphe phrase fenêtre raccourci résultat flux"
+    ).split(),
+    "de": (
+        "das Modell übersetzt jede Zeile des Textes schnell und behält Layout und Bedeutung bei "
+        "lokaler Server Zwischenablage Absatz Satz Fenster Tastenkürzel Ergebnis"
+    ).split(),
+}
+_CJK = {
+    "zh": "本地模型会逐行翻译剪贴板中的内容并保持原有的段落结构和格式结果实时显示在窗口里",
+    "ja": "ローカルモデルはクリップボードの各行を翻訳し段落構造と書式を保持します結果はすぐに表示されます",
+    "ko": "로컬 모델은 클립보드의 각 줄을 번역하고 단락 구조와 서식을 유지합니다 결과는 바로 표시됩니다",
+}
+_EXTRAS = (
+    "https://example.com/docs/setup?lang=en",
+    "`config.json`",
+    "v1.2.3",
+    "42%",
+    "2024-06-01",
+    "~/Library/Application Support/translator",
+)
+
+
+def _sentence(rng: random.Random, lang: str, min_len: int, max_len: int) -> str:
+    if lang in _CJK:
+        chars = _CJK[lang]
+        n = rng.randint(min_len * 2, max_len * 2)
+        start = rng.randrange(len(chars))
+        body = "".join(chars[(start + i) % len(chars)] for i in range(n)).strip()
+        return body + ("。" if lang != "ko" else ".")
+    words = [rng.choice(_WORDS[lang]) for _ in range(rng.randint(min_len, max_len))]
+    if rng.random() < 0.2:
+        words.insert(rng.randrange(len(words)), rng.choice(_EXTRAS))
+    text = " ".join(words)
+    return text[:1].upper() + text[1:] + "."
+
+
+def clipboard_lines(rng: random.Random, lines: int = 40) -> str:
+    """Short English lines as copied from a UI or chat, with some repeats and non-text lines."""
+    out: List[str] = []
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < 0.1 and out:
+            out.append(rng.choice(out))          # 重复行（去重路径）
+        elif roll < 0.18:
+            out.append(rng.choice(_EXTRAS))      # URL / 版本号之类，直接透传
+        else:
+            out.append(_sentence(rng, "en", 3, 9))
+    return "\n".join(out)
+
+
+def long_paragraphs(rng: random.Random, paragraphs: int = 12) -> str:
+    return "\n\n".join(
+        " ".join(_sentence(rng, "en", 8, 20) for _ in range(rng.randint(4, 8)))
+        for _ in range(paragraphs)
+    )
+
+
+def markdown_doc(rng: random.Random, sections: int = 6) -> str:
+    parts: List[str] = []
+    for i in range(sections):
+        parts.append(f"## {_sentence(rng, 'en', 2, 5).rstrip('.')}")
+        parts.append(" ".join(_sentence(rng, "en", 6, 14) for _ in range(3)))
+        parts.extend(f"- {_sentence(rng, 'en', 3, 8)}" for _ in range(3))
+        if i % 2 == 0:
+            parts.append("```python\nresult = translate(text, target_lang=\"zh\")\nprint(result)\n```")
+        parts.append(f"See [the docs]({_EXTRAS[0]}) for details.")
+    return "\n\n".join(parts)
+
+
+def mixed_language(rng: random.Random, lines: int = 60) -> str:
+    """Lines in several languages, including some already in the target language (zh)."""
+    langs = ("en", "fr", "de", "ja", "ko", "zh")
+    return "\n".join(_sentence(rng, rng.choice(langs), 4, 12) for _ in range(lines))
+
+
+CORPORA: Dict[str, Callable[[random.Random], str]] = {
+    "clipboard": clipboard_lines,
+    "paragraphs": long_paragraphs,
+    "markdown": markdown_doc,
+    "mixed": mixed_language,
+}
+
+
+def build_corpora(seed: int = SEED) -> Dict[str, str]:
+    # 每个语料各用一个 Random，增删语料不会影响其它语料的内容
+    return {name: make(random.Random(f"{seed}:{name}")) for name, make in CORPORA.items()}
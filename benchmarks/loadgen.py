@@ -0,0 +1,367 @@
+"""
+End-to-end load generator for the bridge and the API server.
+
+Sends a mix of synthetic documents (benchmarks/corpora.py) either as one-shot
+`bridge.py translate-stream` subprocesses (what the Tauri app does) or as HTTP
+POST /translate requests to api_server, both backed by the mock Ollama server
+unless --ollama-url points at a real daemon.
+
+    python -m benchmarks.loadgen --target both --concurrency 4 --requests 40
+    python -m benchmarks.loadgen --target api --rate 2 --duration 30 --mix clipboard=3,paragraphs=1
+    python -m benchmarks.loadgen --target bridge --tps 80 --parallel 2 --json out.json
+
+--concurrency N is closed-loop (N clients back to back); --rate R is open-loop
+(Poisson arrivals at R req/s, capped by --max-in-flight). Reports time to first
+token (bridge only: /translate answers in one piece), completion latency
+percentiles, throughput and error rate per target.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.corpora import SEED, build_corpora
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
+from core.timing import percentile
+from python_backend.bridge import iter_frames
+
+BRIDGE_PATH = os.path.join(ROOT_DIR, "python_backend", "bridge.py")
+TARGETS = ("bridge", "api")
+
+
+@dataclass
+class LoadOptions:
+    target: str = "bridge"
+    requests: int = 20
+    duration_sec: float = 0.0       # >0 时按时长结束，忽略 requests
+    concurrency: int = 1            # 闭环：并发客户端数
+    rate: float = 0.0               # >0 时开环：泊松到达，每秒请求数
+    max_in_flight: int = 64
+    mix: Dict[str, float] = field(default_factory=lambda: {"clipboard": 1.0})
+    target_lang: str = "zh"
+    timeout_sec: float = 300.0
+    seed: int = SEED
+
+
+@dataclass
+class RequestResult:
+    target: str
+    doc: str
+    chars: int
+    started_at: float               # 相对于压测开始的秒数
+    ok: bool = False
+    ttft_sec: Optional[float] = None
+    latency_sec: float = 0.0
+    segments: int = 0
+    error: str = ""
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'clipboard=3,paragraphs=1' -> weights; a bare name counts as weight 1."""
+    corpora = build_corpora()
+    mix: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in corpora:
+            raise ValueError(f"Unknown document '{name}', expected one of {sorted(corpora)}")
+        mix[name] = float(weight) if weight else 1.0
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Document mix needs at least one positive weight")
+    return mix
+
+
+def _payload(text: str, opt: LoadOptions, ollama_url: str, doc: str) -> dict:
+    return {
+        "text": text,
+        "source_lang": "auto",
+        "target_lang": opt.target_lang,
+        "translation_mode": "markdown" if doc == "markdown" else "normal",
+        "mode": "http",
+        "host": ollama_url,
+        "collect_timings": False,
+    }
+
+
+def run_bridge_request(payload: dict, result: RequestResult, timeout_sec: float) -> None:
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, BRIDGE_PATH, "translate-stream", "--protocol", "frames"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        cwd=ROOT_DIR,
+    )
+    # 卡死的子进程到点直接杀掉，读端随之结束
+    killer = threading.Timer(timeout_sec, proc.kill)
+    killer.start()
+    try:
+        proc.stdin.write(json.dumps(payload).encode("utf-8"))
+        proc.stdin.close()
+        for event in iter_frames(proc.stdout):
+            kind = event.get("event")
+            # 只算模型真正吐出的第一个分片：直通段、去重命中的更新不经过模型
+            streaming = event.get("segment_status") == "streaming"
+            if kind == "update" and result.ttft_sec is None and streaming and event.get("active_segment_target"):
+                result.ttft_sec = time.perf_counter() - started
+            elif kind == "completed":
+                result.ok = True
+                result.segments = len(event.get("response", {}).get("segments") or [])
+            elif kind == "error":
+                result.error = str(event.get("message") or "bridge error")
+        code = proc.wait()
+        if not result.ok and not result.error:
+            result.error = f"bridge exited with {code} before completing"
+    except Exception as exc:
+        result.ok = False
+        result.error = str(exc)
+        proc.kill()
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+        result.latency_sec = time.perf_counter() - started
+
+
+def run_api_request(api_url: str, payload: dict, result: RequestResult, timeout_sec: float) -> None:
+    started = time.perf_counter()
+    req = urllib.request.Request(
+        f"{api_url.rstrip('/')}/translate",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
+            body = json.loads(resp.read().decode("utf-8"))
+        result.ok = True
+        result.segments = len(body.get("segments") or [])
+    except urllib.error.HTTPError as exc:
+        result.error = f"HTTP {exc.code}: {exc.read().decode('utf-8', errors='ignore')[:200]}"
+    except Exception as exc:
+        result.error = str(exc)
+    finally:
+        result.latency_sec = time.perf_counter() - started
+
+
+def run_load(opt: LoadOptions, ollama_url: str, api_url: str = "") -> Tuple[List[RequestResult], float]:
+    """Runs one target; returns the per-request results and the wall time."""
+    if opt.target not in TARGETS:
+        raise ValueError(f"Unknown target '{opt.target}'")
+    corpora = build_corpora(opt.seed)
+    rng = random.Random(opt.seed)
+    names = list(opt.mix)
+    weights = [opt.mix[n] for n in names]
+    results: List[RequestResult] = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+    deadline = t0 + opt.duration_sec if opt.duration_sec > 0 else None
+
+    def next_request() -> Optional[RequestResult]:
+        with lock:
+            if deadline is None and len(results) >= opt.requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            doc = rng.choices(names, weights)[0]
+            result = RequestResult(opt.target, doc, len(corpora[doc]), round(time.perf_counter() - t0, 4))
+            results.append(result)
+            return result
+
+    def fire(result: RequestResult) -> None:
+        payload = _payload(corpora[result.doc], opt, ollama_url, result.doc)
+        if opt.target == "bridge":
+            run_bridge_request(payload, result, opt.timeout_sec)
+        else:
+            run_api_request(api_url, payload, result, opt.timeout_sec)
+
+    threads: List[threading.Thread] = []
+    if opt.rate > 0:
+        slots = threading.BoundedSemaphore(max(1, opt.max_in_flight))
+
+        def open_loop_fire(result: RequestResult) -> None:
+            try:
+                fire(result)
+            finally:
+                slots.release()
+
+        while True:
+            slots.acquire()  # 在途请求到上限时，到达时间顺延
+            result = next_request()
+            if result is None:
+                slots.release()
+                break
+            t = threading.Thread(target=open_loop_fire, args=(result,), daemon=True)
+            t.start()
+            threads.append(t)
+            time.sleep(rng.expovariate(opt.rate))
+    else:
+        def closed_loop_client() -> None:
+            while True:
+                result = next_request()
+                if result is None:
+                    return
+                fire(result)
+
+        threads = [threading.Thread(target=closed_loop_client, daemon=True) for _ in range(max(1, opt.concurrency))]
+        for t in threads:
+            t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - t0
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ms = sorted(v * 1000 for v in values)
+    return {
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p95_ms": round(percentile(ms, 95), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "max_ms": round(ms[-1], 1),
+        "mean_ms": round(sum(ms) / len(ms), 1),
+    }
+
+
+def summarize(results: List[RequestResult], wall_sec: float) -> Dict[str, object]:
+    ok = [r for r in results if r.ok]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error[:120]] = errors.get(r.error[:120], 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "wall_sec": round(wall_sec, 3),
+        "throughput_rps": round(len(ok) / wall_sec, 3) if wall_sec else 0.0,
+        "throughput_chars_per_sec": round(sum(r.chars for r in ok) / wall_sec, 1) if wall_sec else 0.0,
+        "ttft": _distribution([r.ttft_sec for r in ok if r.ttft_sec is not None]),
+        "latency": _distribution([r.latency_sec for r in ok]),
+        "by_doc": {
+            doc: _distribution([r.latency_sec for r in ok if r.doc == doc])
+            for doc in sorted({r.doc for r in ok})
+        },
+        "error_messages": errors,
+    }
+
+
+def print_table(summaries: Dict[str, Dict[str, object]]) -> None:
+    header = f"{'target':<8}{'reqs':>6}{'err%':>7}{'req/s':>8}{'ttft p50':>10}{'p95':>8}{'p99':>8}" \
+             f"{'lat p50':>10}{'p95':>8}{'p99':>8}{'max':>8}"
+    print(header)
+    for target, s in summaries.items():
+        ttft, lat = s["ttft"], s["latency"]
+
+        def cell(d: Dict[str, float], key: str, width: int) -> str:
+            return f"{d[key]:>{width}.0f}" if key in d else f"{'-':>{width}}"
+
+        print(
+            f"{target:<8}{s['requests']:>6}{s['error_rate'] * 100:>6.1f}%{s['throughput_rps']:>8.2f}"
+            f"{cell(ttft, 'p50_ms', 10)}{cell(ttft, 'p95_ms', 8)}{cell(ttft, 'p99_ms', 8)}"
+            f"{cell(lat, 'p50_ms', 10)}{cell(lat, 'p95_ms', 8)}{cell(lat, 'p99_ms', 8)}{cell(lat, 'max_ms', 8)}"
+        )
+    print("(latencies in ms; api has no ttft because /translate answers in one piece)")
+
+
+def start_api_server() -> Tuple[object, str]:
+    from python_backend.api_server import build_server
+
+    server = build_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load generator for bridge.py and api_server")
+    parser.add_argument("--target", choices=TARGETS + ("both",), default="both")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per target")
+    parser.add_argument("--duration", type=float, default=0.0, help="Run each target for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=1, help="Closed-loop clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop Poisson arrivals per second")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--mix", default="clipboard", help="Document weights, e.g. clipboard=3,paragraphs=1,mixed=1")
+    parser.add_argument("--target-lang", default="zh")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--api-url", default="", help="Use a running api_server instead of an in-process one")
+    parser.add_argument("--ollama-url", default="", help="Use a real Ollama instead of the mock")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Mock: seconds before the first token")
+    parser.add_argument("--tps", type=float, default=200.0, help="Mock: tokens per second")
+    parser.add_argument("--parallel", type=int, default=1, help="Mock: concurrent generations")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Mock: share of requests failing with 500")
+    parser.add_argument("--json", dest="json_path", help="Write the full report here")
+    args = parser.parse_args()
+
+    mock = None
+    ollama_url = args.ollama_url
+    if not ollama_url:
+        mock = MockOllama(MockOllamaConfig(
+            ttft_sec=args.ttft,
+            tokens_per_sec=args.tps,
+            parallel=args.parallel,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )).start()
+        ollama_url = mock.url
+    api_server = None
+    api_url = args.api_url
+    targets = TARGETS if args.target == "both" else (args.target,)
+    if "api" in targets and not api_url:
+        api_server, api_url = start_api_server()
+
+    summaries: Dict[str, Dict[str, object]] = {}
+    raw: Dict[str, List[dict]] = {}
+    try:
+        for target in targets:
+            opt = LoadOptions(
+                target=target,
+                requests=args.requests,
+                duration_sec=args.duration,
+                concurrency=args.concurrency,
+                rate=args.rate,
+                max_in_flight=args.max_in_flight,
+                mix=parse_mix(args.mix),
+                target_lang=args.target_lang,
+                timeout_sec=args.timeout,
+                seed=args.seed,
+            )
+            results, wall = run_load(opt, ollama_url, api_url)
+            summaries[target] = summarize(results, wall)
+            raw[target] = [asdict(r) for r in results]
+    finally:
+        if api_server is not None:
+            api_server.shutdown()
+            api_server.server_close()
+        if mock is not None:
+            mock.stop()
+
+    print_table(summaries)
+    if args.json_path:
+        report = {
+            "options": {k: v for k, v in vars(args).items() if k != "json_path"},
+            "summary": summaries,
+            "requests": raw,
+        }
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
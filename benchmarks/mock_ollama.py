@@ -0,0 +1,361 @@
+"""
+Stdlib stand-in for an Ollama daemon, for offline load and latency testing.
+
+Serves /api/chat, /api/generate, /api/version, /api/tags, /api/ps and /api/show
+with Ollama's wire format (streaming NDJSON and the final stats frame), and
+simulates time to first token, generation speed, a limited number of parallel
+slots, model load time and injected faults.
+
+    python -m benchmarks.mock_ollama --port 11435 --ttft 0.2 --tps 60 --parallel 2
+
+or in-process:
+
+    with MockOllama(MockOllamaConfig(tokens_per_sec=500)) as mock:
+        OllamaBackend(OllamaBackendOptions(mode=OllamaMode.HTTP, host=mock.url))
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_MODEL = "demonbyron/HY-MT1.5-1.8B"
+
+# prompt 模板里原文前面的那句指令（见 core/prompt.py）
+_INSTRUCTION_ENDINGS = (
+    "不要额外解释：\n\n",
+    "不要额外解释：\n",
+    "without additional explanation.\n\n",
+    "return Markdown only.\n\n",
+)
+_SOURCE_TAG_RE = re.compile(r"<source>(.*?)</source>", re.S)
+_TOKEN_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯]|\s*[^\s぀-ヿ㐀-鿿가-힯]{1,4}")
+
+
+def echo_source(prompt: str) -> str:
+    """Default responder: 'translates' by echoing the source text out of the prompt."""
+    tagged = _SOURCE_TAG_RE.search(prompt)
+    if tagged:
+        return f"<target>{tagged.group(1)}</target>"
+    cut = max((prompt.rfind(end) + len(end) if end in prompt else -1) for end in _INSTRUCTION_ENDINGS)
+    body = prompt[cut:] if cut >= 0 else prompt
+    return body.strip("\n")
+
+
+def tokenize(text: str) -> List[str]:
+    """Rough token pieces: one per CJK char, up to 4 chars otherwise."""
+    pieces = _TOKEN_RE.findall(text)
+    rest = len(text) - sum(len(p) for p in pieces)
+    if rest > 0:  # 末尾的空白
+        pieces.append(text[len(text) - rest:])
+    return pieces
+
+
+def _model_key(name: str) -> str:
+    name = name.strip()
+    return name if ":" in name.rsplit("/", 1)[-1] else f"{name}:latest"
+
+
+@dataclass
+class MockOllamaConfig:
+    models: List[str] = field(default_factory=lambda: [DEFAULT_MODEL])
+    ttft_sec: float = 0.05          # 首 token 延迟（prompt eval）
+    tokens_per_sec: float = 200.0   # 0 表示不限速
+    parallel: int = 1               # 同时生成的请求数（OLLAMA_NUM_PARALLEL），多出的排队
+    load_delay_sec: float = 0.0     # 模型未加载时，第一次请求的加载时间
+    preloaded: bool = True
+    # /api/ps 里报告的模型大小和显存占比（1.0 = 全部在 GPU，0 = 纯 CPU）
+    model_size: int = 1_100_000_000
+    vram_ratio: float = 1.0
+    # 故障注入（按请求随机，seed 固定后可复现）
+    error_rate: float = 0.0         # 直接返回 HTTP 500
+    drop_rate: float = 0.0          # 流到一半断开连接
+    stall_rate: float = 0.0         # 流到一半卡住 stall_sec
+    stall_sec: float = 5.0
+    seed: int = 0
+    responder: Callable[[str], str] = echo_source
+
+
+class _MockState:
+    def __init__(self, cfg: MockOllamaConfig):
+        self.cfg = cfg
+        self.slots = threading.BoundedSemaphore(max(1, cfg.parallel))
+        self.lock = threading.Lock()
+        self.rng = random.Random(cfg.seed)
+        self.loaded: Dict[str, float] = {}  # model key -> loaded_at
+        self.load_locks: Dict[str, threading.Lock] = {}
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self.faults = 0
+        if cfg.preloaded:
+            for model in cfg.models:
+                self.loaded[_model_key(model)] = time.time()
+
+    def known(self, model: str) -> bool:
+        return _model_key(model) in {_model_key(m) for m in self.cfg.models}
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+    def ensure_loaded(self, model: str) -> float:
+        """Returns the load time spent for this request (0 if already resident)."""
+        key = _model_key(model)
+        with self.lock:
+            if key in self.loaded:
+                return 0.0
+            load_lock = self.load_locks.setdefault(key, threading.Lock())
+        with load_lock:  # 并发的冷启动请求只加载一次，其余的等着
+            with self.lock:
+                if key in self.loaded:
+                    return 0.0
+            time.sleep(self.cfg.load_delay_sec)
+            with self.lock:
+                self.loaded[key] = time.time()
+            return self.cfg.load_delay_sec
+
+    def unload(self, model: str) -> None:
+        with self.lock:
+            self.loaded.pop(_model_key(model), None)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    state: _MockState  # 由 MockOllama 注入到子类上
+
+    # ---------- GET ----------
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/api/version":
+            self._json(200, {"version": "0.0.0-mock"})
+        elif self.path == "/api/tags":
+            self._json(200, {"models": [{"name": _model_key(m), "model": _model_key(m)} for m in self.state.cfg.models]})
+        elif self.path == "/api/ps":
+            with self.state.lock:
+                loaded = list(self.state.loaded)
+            size = self.state.cfg.model_size
+            vram = int(size * self.state.cfg.vram_ratio)
+            self._json(200, {"models": [{"name": m, "model": m, "size": size, "size_vram": vram} for m in loaded]})
+        else:
+            self._json(404, {"error": "not found"})
+
+    # ---------- POST ----------
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        model = body.get("model") or body.get("name") or ""
+        if self.path == "/api/show":
+            if self.state.known(model):
+                self._json(200, {"modelfile": "", "details": {"family": "mock"}})
+            else:
+                self._json(404, {"error": f"model '{model}' not found"})
+            return
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._json(404, {"error": "not found"})
+            return
+        if not self.state.known(model):
+            self._json(404, {"error": f"model '{model}' not found"})
+            return
+
+        with self.state.lock:
+            self.state.requests += 1
+        if self.state.roll(self.state.cfg.error_rate):
+            with self.state.lock:
+                self.state.faults += 1
+            self._json(500, {"error": "injected failure"})
+            return
+
+        if self.path == "/api/chat":
+            messages = body.get("messages") or []
+            prompt = messages[-1].get("content", "") if messages else ""
+        else:
+            prompt = body.get("prompt") or ""
+        keep_alive = body.get("keep_alive")
+
+        with self.state.slots:
+            with self.state.lock:
+                self.state.active += 1
+                self.state.max_active = max(self.state.max_active, self.state.active)
+            try:
+                self._generate(model, prompt, body, keep_alive)
+            finally:
+                with self.state.lock:
+                    self.state.active -= 1
+
+    def _generate(self, model: str, prompt: str, body: dict, keep_alive) -> None:
+        cfg = self.state.cfg
+        started = time.perf_counter()
+        load_sec = self.state.ensure_loaded(model)
+        if self.path == "/api/generate" and not prompt:
+            # 空 prompt 只加载模型（warm_up）
+            if keep_alive in (0, "0", "0s"):
+                self.state.unload(model)
+            self._json(200, {"model": model, "response": "", "done": True, "done_reason": "load",
+                             "load_duration": int(load_sec * 1e9), "total_duration": int(load_sec * 1e9)})
+            return
+
+        options = body.get("options") or {}
+        pieces = tokenize(cfg.responder(prompt))
+        num_predict = options.get("num_predict")
+        done_reason = "stop"
+        if isinstance(num_predict, int) and 0 < num_predict < len(pieces):
+            pieces = pieces[:num_predict]
+            done_reason = "length"
+
+        time.sleep(cfg.ttft_sec)
+        prompt_eval_sec = cfg.ttft_sec
+        stream = body.get("stream", True)
+        interval = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec > 0 else 0.0
+        eval_started = time.perf_counter()
+
+        def frame(content: str, done: bool) -> dict:
+            key = "message" if self.path == "/api/chat" else "response"
+            value = {"role": "assistant", "content": content} if key == "message" else content
+            return {"model": model, key: value, "done": done}
+
+        drop_at = self.state.rng.randrange(len(pieces)) if pieces and self.state.roll(cfg.drop_rate) else -1
+        stall_at = self.state.rng.randrange(len(pieces)) if pieces and self.state.roll(cfg.stall_rate) else -1
+
+        if stream:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+        for i, piece in enumerate(pieces):
+            if i == stall_at:
+                time.sleep(cfg.stall_sec)
+            if i == drop_at:
+                with self.state.lock:
+                    self.state.faults += 1
+                self.close_connection = True
+                return
+            if i and interval:
+                time.sleep(interval)
+            if stream:
+                self._line(frame(piece, False))
+
+        eval_sec = time.perf_counter() - eval_started
+        done = frame("" if stream else "".join(pieces), True)
+        done.update({
+            "done_reason": done_reason,
+            "prompt_eval_count": max(1, len(tokenize(prompt))),
+            "prompt_eval_duration": int(prompt_eval_sec * 1e9),
+            "eval_count": len(pieces),
+            "eval_duration": int(eval_sec * 1e9),
+            "load_duration": int(load_sec * 1e9),
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+        })
+        if stream:
+            self._line(done)
+        else:
+            self._json(200, done)
+        if keep_alive in (0, "0", "0s"):
+            self.state.unload(model)
+
+    # ---------- helpers ----------
+
+    def _line(self, payload: dict) -> None:
+        try:
+            self.wfile.write((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        return
+
+
+class MockOllama:
+    def __init__(self, cfg: Optional[MockOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.cfg = cfg or MockOllamaConfig()
+        self.state = _MockState(self.cfg)
+        handler = type("MockOllamaHandler", (_Handler,), {"state": self.state})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllama":
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name="mock-ollama",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mock Ollama server for offline load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", action="append", help="Model name to serve (repeatable)")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--tps", type=float, default=200.0, help="Tokens per second (0 = unthrottled)")
+    parser.add_argument("--parallel", type=int, default=1, help="Concurrent generations; the rest queue")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="Cold model load time in seconds")
+    parser.add_argument("--cold", action="store_true", help="Start with no model loaded")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0)
+    parser.add_argument("--stall-sec", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cfg = MockOllamaConfig(
+        models=args.model or [DEFAULT_MODEL],
+        ttft_sec=args.ttft,
+        tokens_per_sec=args.tps,
+        parallel=args.parallel,
+        load_delay_sec=args.load_delay,
+        preloaded=not args.cold,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        stall_rate=args.stall_rate,
+        stall_sec=args.stall_sec,
+        seed=args.seed,
+    )
+    mock = MockOllama(cfg, host=args.host, port=args.port)
+    print(f"Mock Ollama listening on {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
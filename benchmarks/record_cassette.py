@@ -0,0 +1,66 @@
+"""
+Record a replay cassette by translating documents through the real service.
+
+    python -m benchmarks.record_cassette --out cassettes/clipboard-zh.jsonl --corpus clipboard
+    python -m benchmarks.record_cassette --out doc.jsonl --file notes.md --markdown --host http://gpu-box:11434
+
+Replay it later without Ollama:
+
+    TranslationService(backend_factory=replay_factory("doc.jsonl", speed=1.0))
+    python -m benchmarks.suite --cassette doc.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend import OllamaBackend, OllamaBackendOptions, recording_factory
+from benchmarks.corpora import build_corpora
+from python_backend.models import TranslationRequest
+from python_backend.services.translation_service import TranslationService
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record model outputs into a replay cassette")
+    parser.add_argument("--out", required=True, help="Cassette file (JSON lines, appended to)")
+    parser.add_argument("--corpus", action="append", default=[], help="Synthetic corpus name (repeatable)")
+    parser.add_argument("--file", action="append", default=[], help="Text file to translate (repeatable)")
+    parser.add_argument("--markdown", action="store_true", help="Translate --file inputs in markdown mode")
+    parser.add_argument("--source-lang", default="auto")
+    parser.add_argument("--target-lang", default="zh")
+    parser.add_argument("--host", default=OllamaBackendOptions().host)
+    parser.add_argument("--model", default=OllamaBackendOptions().model)
+    args = parser.parse_args()
+
+    corpora = build_corpora()
+    documents = [(name, corpora[name], name == "markdown") for name in args.corpus]
+    for path in args.file:
+        with open(path, encoding="utf-8") as f:
+            documents.append((path, f.read(), args.markdown))
+    if not documents:
+        parser.error("nothing to record: pass --corpus and/or --file")
+
+    service = TranslationService(backend_factory=recording_factory(args.out, OllamaBackend))
+    for name, text, markdown in documents:
+        response = service.translate(TranslationRequest(
+            text=text,
+            source_lang=args.source_lang,
+            target_lang=args.target_lang,
+            translation_mode="markdown" if markdown else "normal",
+            model=args.model,
+            mode="http",
+            host=args.host,
+            collect_timings=False,
+        ))
+        print(f"{name}: {len(response.segments)} segments recorded")
+    print(f"cassette: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Benchmark suite for the core pipeline and the service hot paths.
+
+Runs every stage over the synthetic corpora (benchmarks/corpora.py) against a
+zero-latency fake model and reports median time per op, throughput (source chars/s)
+and peak traced allocation per op. Results are JSON; pass --baseline to compare
+against a stored run and exit non-zero when a case regresses past --threshold.
+
+    python -m benchmarks.suite [--quick] [--only run_pipeline] [--output out.json]
+    python -m benchmarks.suite --baseline benchmarks/baseline.json [--threshold 0.25] [--confirm 2]
+    python -m benchmarks.suite --update-baseline
+    python -m benchmarks.suite --cassette recorded.jsonl --only clipboard
+
+--cassette replays outputs recorded with benchmarks.record_cassette; it must
+cover every corpus that runs (narrow with --only).
+
+Baselines are machine-specific: refresh with --update-baseline on the machine
+that does the comparing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend import Cassette, ReplayBackend
+from benchmarks.corpora import SEED, build_corpora
+from benchmarks.mock_ollama import echo_source
+from core.pipeline import (
+    OutputMode,
+    PipelineOptions,
+    make_segments,
+    render_output,
+    run_pipeline,
+    segment_prompt_options,
+)
+from core.postprocess import extract_translation
+from core.prompt import build_prompt
+from core.splitter import split_plain, split_with_limited_context
+from python_backend.models import TranslationRequest
+from python_backend.services.translation_service import TranslationService
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# 超阈值的用例重测几轮再判定回归（共享 / 单核机器上单次测量常有 1.5x 的抖动）
+DEFAULT_CONFIRM_ROUNDS = 2
+CHUNK_CHARS = 4  # 假流式输出每个分片的字符数，接近真实 token 粒度
+CASE_STAGES = (
+    "split_plain", "split_with_limited_context", "build_prompt", "extract_translation",
+    "render_output", "run_pipeline", "stream_translate",
+)
+
+
+def fake_generate(prompt: str, options: Optional[dict] = None) -> str:
+    """Zero-latency model: answers with the source text behind a label, like HY-MT often does."""
+    return "译文：" + echo_source(prompt)
+
+
+class _ZeroLatencyBackend:
+    """Stands in for OllamaBackend inside TranslationService."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+
+    def is_model_loaded(self):
+        return True
+
+    def stream_generate(self, prompt: str, options=None):
+        text = fake_generate(prompt)
+        return iter([text[i:i + CHUNK_CHARS] for i in range(0, len(text), CHUNK_CHARS)])
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], Any]
+    chars: int  # 每次调用处理的源文本字符数，用来算吞吐
+
+
+def build_cases(corpora: Dict[str, str], cassette: Optional[str] = None) -> List[Case]:
+    """With a cassette, model outputs and stream chunking come from the recording (replayed without delays)."""
+    cases: List[Case] = []
+    opt = PipelineOptions()
+    generate: Callable[..., str] = fake_generate
+    backend_factory: Callable[[Any], Any] = _ZeroLatencyBackend
+    if cassette:
+        replay = ReplayBackend(Cassette(cassette), speed=0.0, match_options=False)
+        generate, backend_factory = replay.generate, lambda cfg: replay
+    for corpus, text in corpora.items():
+        segments = make_segments(text, opt)
+        prompts = [(seg.text, segment_prompt_options(seg, opt)) for seg in segments]
+        raws = [generate(build_prompt(src, p_opt)) for src, p_opt in prompts]
+        pairs = run_pipeline(text, generate, opt)
+        seg_chars = sum(len(seg.text) for seg in segments)
+        mode = "markdown" if corpus == "markdown" else "normal"
+        request = TranslationRequest(text=text, source_lang="auto", target_lang="zh", translation_mode=mode)
+
+        def stream(request=request) -> list:
+            return list(TranslationService(backend_factory=backend_factory).stream_translate(request))
+
+        cases += [
+            Case(f"{corpus}/split_plain", lambda text=text: split_plain(text), len(text)),
+            Case(f"{corpus}/split_with_limited_context", lambda text=text: split_with_limited_context(text), len(text)),
+            Case(
+                f"{corpus}/build_prompt",
+                lambda prompts=prompts: [build_prompt(src, p_opt) for src, p_opt in prompts],
+                seg_chars,
+            ),
+            Case(f"{corpus}/extract_translation", lambda raws=raws: [extract_translation(r) for r in raws], seg_chars),
+            Case(
+                f"{corpus}/render_output",
+                lambda pairs=pairs: render_output(pairs, OutputMode.INTERLEAVED),
+                seg_chars,
+            ),
+            Case(f"{corpus}/run_pipeline", lambda text=text: run_pipeline(text, generate, opt), len(text)),
+            Case(f"{corpus}/stream_translate", stream, len(text)),
+        ]
+    return cases
+
+
+def _calibrate(timer: timeit.Timer, min_time: float) -> int:
+    number = 1
+    while True:  # 同 Timer.autorange，但目标时长可调
+        if timer.timeit(number) >= min_time:
+            return number
+        number *= 2
+
+
+def measure(cases: List[Case], repeat: int, min_time: float) -> Dict[str, Dict[str, float]]:
+    """
+    Median time per op for every case. Repeats are interleaved across cases
+    (one round runs each case once), so a stretch of load on the machine is
+    spread over all cases instead of skewing whichever case happened to be running.
+    """
+    timers = [(case, timeit.Timer(case.fn)) for case in cases]
+    numbers = [_calibrate(timer, min_time) for _, timer in timers]
+    samples: List[List[float]] = [[] for _ in cases]
+    for _ in range(repeat):
+        for (case, timer), number, times in zip(timers, numbers, samples):
+            times.append(timer.timeit(number) / number)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for case, times in zip(cases, samples):
+        best = statistics.median(times)
+        # 分配单独测一次：tracemalloc 本身会拖慢计时
+        tracemalloc.start()
+        try:
+            case.fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results[case.name] = {
+            "us_per_op": round(best * 1e6, 3),
+            "ops_per_sec": round(1.0 / best, 1) if best else 0.0,
+            "chars_per_sec": round(case.chars / best, 1) if best else 0.0,
+            "peak_kib": round(peak / 1024, 2),
+        }
+    return results
+
+
+def run_suite(only: Optional[List[str]] = None, quick: bool = False, cassette: Optional[str] = None) -> Dict[str, Any]:
+    corpora = build_corpora()
+    if only:
+        # 先按语料筛一遍：回放时没录到的语料连准备阶段都不能跑
+        corpora = {
+            name: text for name, text in corpora.items()
+            if any(key in f"{name}/{stage}" for key in only for stage in CASE_STAGES)
+        }
+    cases = [case for case in build_cases(corpora, cassette) if not only or any(key in case.name for key in only)]
+    results = measure(cases, repeat=5 if quick else 11, min_time=0.02 if quick else 0.1)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": SEED,
+            "corpus_chars": {name: len(text) for name, text in corpora.items()},
+            "quick": quick,
+            "cassette": cassette,
+        },
+        "results": results,
+    }
+
+
+# 越小越好的指标；吞吐量由耗时推出，不重复比较
+COMPARED_METRICS = ("us_per_op", "peak_kib")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """One row per (case, metric) present in both runs; `regressed` when current > baseline * (1 + threshold)."""
+    rows: List[dict] = []
+    base_results = baseline.get("results", {})
+    for name, metrics in current.get("results", {}).items():
+        base = base_results.get(name)
+        if not base:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = base.get(metric), metrics.get(metric)
+            if not before or after is None:
+                continue
+            ratio = after / before
+            rows.append({
+                "case": name,
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "ratio": round(ratio, 3),
+                "regressed": ratio > 1.0 + threshold,
+            })
+    return rows
+
+
+def confirm_regressions(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+    rounds: int = DEFAULT_CONFIRM_ROUNDS,
+    quick: bool = False,
+    cassette: Optional[str] = None,
+) -> List[dict]:
+    """
+    Re-measure the cases compare() flags, keeping each case's fastest run, and
+    return the final comparison: a real regression survives every round, a burst
+    of load on the machine during one case does not.
+    """
+    rows = compare(report, baseline, threshold)
+    for _ in range(rounds):
+        flagged = sorted({r["case"] for r in rows if r["regressed"]})
+        if not flagged:
+            break
+        rerun = run_suite(only=flagged, quick=quick, cassette=cassette)["results"]
+        for name in flagged:
+            again = rerun.get(name)
+            if again is not None and again["us_per_op"] < report["results"][name]["us_per_op"]:
+                report["results"][name] = again
+        rows = compare(report, baseline, threshold)
+    return rows
+
+
+def _print_results(report: Dict[str, Any]) -> None:
+    print(f"{'case':<42}{'us/op':>12}{'chars/s':>14}{'peak KiB':>11}")
+    for name, m in report["results"].items():
+        print(f"{name:<42}{m['us_per_op']:>12.1f}{m['chars_per_sec']:>14.0f}{m['peak_kib']:>11.1f}")
+
+
+def _print_comparison(rows: List[dict], threshold: float) -> None:
+    regressed = [r for r in rows if r["regressed"]]
+    print(f"\nvs baseline (threshold +{threshold:.0%}): {len(regressed)} regression(s) in {len(rows)} comparisons")
+    for r in regressed:
+        print(f"  REGRESSED {r['case']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['ratio']:.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Translator benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Fewer, shorter repeats (noisier)")
+    parser.add_argument("--only", action="append", help="Run only cases whose name contains this (repeatable)")
+    parser.add_argument("--cassette", help="Replay recorded model outputs instead of the fake model")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Compare against this JSON report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown ratio (0.25 = +25%%)")
+    parser.add_argument(
+        "--confirm", type=int, default=DEFAULT_CONFIRM_ROUNDS,
+        help="Re-measure flagged cases this many times before reporting a regression",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help=f"Write the report to {BASELINE_PATH}")
+    args = parser.parse_args()
+
+    report = run_suite(only=args.only, quick=args.quick, cassette=args.cassette)
+    _print_results(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nbaseline written to {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = confirm_regressions(report, baseline, args.threshold, args.confirm, args.quick, args.cassette)
+        _print_comparison(rows, args.threshold)
+        if any(r["regressed"] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
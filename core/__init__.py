@@ -1,12 +1,18 @@
 from .splitter import Segment, SplitOptions, ContextOptions, split_plain, split_with_limited_context
 from .prompt import PromptOptions, PromptPreset, TerminologyHint, build_prompt
-from .postprocess import PostProcessOptions, extract_translation
+from .postprocess import PostProcessOptions, StreamingExtractor, extract_translation
+from .classify import SegmentKind, classify_segment, is_passthrough
+from .mask import MaskOptions, MaskedText, mask_spans, unmask_spans
+from .guard import GenerationLimits, LengthGuardOptions, RepetitionGuard, generation_limits, trim_repetition
 from .pipeline import SplitMode, PipelineOptions, AlignedPair, run_pipeline, iter_pipeline, join_translations, join_interleaved, OutputMode, render_output
 
 __all__ = [
     "Segment", "SplitOptions", "ContextOptions", "split_plain", "split_with_limited_context",
     "PromptOptions", "PromptPreset", "TerminologyHint", "build_prompt",
-    "PostProcessOptions", "extract_translation",
+    "PostProcessOptions", "StreamingExtractor", "extract_translation",
+    "SegmentKind", "classify_segment", "is_passthrough",
+    "MaskOptions", "MaskedText", "mask_spans", "unmask_spans",
+    "GenerationLimits", "LengthGuardOptions", "RepetitionGuard", "generation_limits", "trim_repetition",
     "SplitMode", "PipelineOptions", "AlignedPair", "run_pipeline", "iter_pipeline",
     "join_translations", "join_interleaved",
     "OutputMode","render_output",
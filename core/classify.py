@@ -0,0 +1,117 @@
+import re
+from enum import Enum
+
+
+class SegmentKind(str, Enum):
+    TEXT = "text"
+    EMPTY = "empty"
+    NUMBER = "number"
+    URL = "url"
+    EMAIL = "email"
+    PATH = "path"
+    HASH = "hash"
+    TIMESTAMP = "timestamp"
+    CODE = "code"
+    SYMBOLS = "symbols"
+
+
+# 整行匹配才算，避免把 “见 https://... 的说明” 这种正文也跳过
+_NUMBER_RE = re.compile(r"^[+\-−]?[\d\s.,'%‰+\-−×x*/:()#$€£¥]*\d[\d\s.,'%‰+\-−×x*/:()#$€£¥]*$")
+_URL_RE = re.compile(r"^(?:[a-z][a-z0-9+.\-]*://|www\.)\S+$", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"^(?:mailto:)?[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+$")
+_PATH_RE = re.compile(
+    r"^(?:"
+    r"(?:~|\.{1,2})?/[^\s/]+(?:/[^\s/]*)*"      # /usr/bin, ~/x, ./a/b
+    r"|[A-Za-z]:\\[^\s]*"                        # C:\Windows\...
+    r"|\\\\[^\s\\]+\\[^\s]*"                     # \\server\share
+    r"|[\w.\-]+(?:/[\w.\-]+)+\.[A-Za-z0-9]{1,8}"  # src/app/main.py
+    r")$"
+)
+_HASH_RE = re.compile(
+    r"^(?:"
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"  # uuid
+    r"|(?:sha\d*[:\-])?[0-9a-f]{7,128}"
+    r")$",
+    re.IGNORECASE,
+)
+_TIMESTAMP_RE = re.compile(
+    r"^(?:"
+    r"\d{4}[-/.]\d{1,2}[-/.]\d{1,2}(?:[T\s]\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?)?(?:\s*(?:Z|[+\-]\d{2}:?\d{2}|UTC|GMT))?"
+    r"|\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:\s*-->\s*\d{1,2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?)?"
+    r")$",
+    re.IGNORECASE,
+)
+_CODE_PREFIX_RE = re.compile(
+    r"^(?:#include\s*[<\"]|import\s+[\w.]+(?:\s+as\s+\w+)?$|from\s+[\w.]+\s+import\s"
+    r"|(?:\$|>>>|PS>)\s|#!/|</?[a-zA-Z][\w\-]*(?:\s[^>]*)?>$)"
+)
+_CODE_SUFFIX_RE = re.compile(r"[;{}]$|\)\s*(?:->\s*[\w\[\], .]+)?:$|=>\s*\{?$")
+# 调用 / 定义、赋值、下标、代码块；正文里的 “(see below)” 前面有空格，不算调用
+_CODE_SYNTAX_RE = re.compile(r"\w\(|[=\[\]{}]")
+# 连续四个普通单词：这是一句话，不是代码
+_PROSE_RUN_RE = re.compile(r"[A-Za-z][a-z']+(?: [A-Za-z][a-z']+){3}")
+_TABLE_ROW_RE = re.compile(r"^\|.*\|$")
+_HTML_TAG_RE = re.compile(r"</?[a-zA-Z][\w\-]*(?:\s[^<>]*)?/?>")
+_CODE_SYMBOLS = frozenset("{}[]()<>=;:$&|\\_`\"'")
+_CODE_STRONG_SYMBOLS = frozenset("{}=;<>$\\`|&")
+_HAS_WORD_CHAR_RE = re.compile(r"[^\W\d_]")
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+
+
+def _looks_like_code(text: str) -> bool:
+    if _CJK_RE.search(text):
+        return False
+    if _CODE_PREFIX_RE.match(text):
+        return True
+    if " " not in text and len(text) <= 2:
+        return False
+    # Markdown 表格行、标签包着的正文（<b>Hello</b>）要翻译
+    if _TABLE_ROW_RE.match(text):
+        return False
+    if _HTML_TAG_RE.search(text) and _HAS_WORD_CHAR_RE.search(_HTML_TAG_RE.sub("", text)):
+        return False
+    non_space = [ch for ch in text if not ch.isspace()]
+    symbols = sum(1 for ch in non_space if ch in _CODE_SYMBOLS)
+    ratio = symbols / len(non_space)
+    # 句末是 ; { } 这类，且有调用/赋值/代码块，基本可以认定是代码；
+    # 但一串普通单词组成的句子只有以 { 结尾才算
+    if _CODE_SUFFIX_RE.search(text) and ratio >= 0.08 and _CODE_SYNTAX_RE.search(text):
+        if text.endswith("{") or not _PROSE_RUN_RE.search(text):
+            return True
+    strong = sum(1 for ch in non_space if ch in _CODE_STRONG_SYMBOLS)
+    return ratio >= 0.3 and strong >= 2
+
+
+def classify_segment(text: str) -> SegmentKind:
+    """
+    Cheap whole-line classifier used to skip segments that carry nothing to translate.
+    """
+    s = text.strip() if text else ""
+    if not s:
+        return SegmentKind.EMPTY
+    # 最常见的情况：含 CJK 或普通单词的句子，直接判定为正文
+    if _CJK_RE.search(s):
+        return SegmentKind.TEXT
+    if not _HAS_WORD_CHAR_RE.search(s):
+        if _TIMESTAMP_RE.match(s):
+            return SegmentKind.TIMESTAMP
+        if _NUMBER_RE.match(s):
+            return SegmentKind.NUMBER
+        return SegmentKind.CODE if _looks_like_code(s) else SegmentKind.SYMBOLS
+    if _URL_RE.match(s):
+        return SegmentKind.URL
+    if _EMAIL_RE.match(s):
+        return SegmentKind.EMAIL
+    if _TIMESTAMP_RE.match(s):
+        return SegmentKind.TIMESTAMP
+    if _HASH_RE.match(s) and any(ch.isdigit() for ch in s):
+        return SegmentKind.HASH
+    if _PATH_RE.match(s):
+        return SegmentKind.PATH
+    if _looks_like_code(s):
+        return SegmentKind.CODE
+    return SegmentKind.TEXT
+
+
+def is_passthrough(kind: SegmentKind) -> bool:
+    return kind != SegmentKind.TEXT
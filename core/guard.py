@@ -0,0 +1,175 @@
+# hy_translator/core/guard.py
+
+from __future__ import annotations
+import math
+import string
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from .lang import normalize_lang
+from .mask import approx_tokens
+from .prompt import PromptOptions, PromptPreset, resolve_preset
+
+
+# 译文 token 数 / 原文 token 数 的经验值（按 approx_tokens 估算）
+_EXPANSION: Dict[Tuple[str, str], float] = {
+    ("zh", "en"): 1.6,
+    ("zh", "ja"): 1.3,
+    ("zh", "ko"): 1.3,
+    ("ja", "en"): 1.5,
+    ("ko", "en"): 1.5,
+    ("en", "zh"): 1.0,
+    ("en", "ja"): 1.2,
+    ("en", "ko"): 1.2,
+    ("ja", "zh"): 0.9,
+}
+DEFAULT_EXPANSION = 1.5
+
+# 翻译模型偶尔会在译文后面追加解释，遇到这些直接停
+_EXPLANATION_STOPS = ["\n\n注：", "\n\n注:", "\n\n说明：", "\n\n解释：", "\n\nNote:", "\n\nExplanation:"]
+_PRESET_STOPS: Dict[PromptPreset, List[str]] = {
+    PromptPreset.ZH_XX: _EXPLANATION_STOPS,
+    PromptPreset.XX_XX: _EXPLANATION_STOPS,
+    PromptPreset.TERMINOLOGY: _EXPLANATION_STOPS,
+    PromptPreset.CONTEXTUAL: _EXPLANATION_STOPS,
+    PromptPreset.FORMATTED_ZH: _EXPLANATION_STOPS,
+    PromptPreset.MARKDOWN: [],  # Markdown 正文里什么都可能出现
+}
+
+
+@dataclass
+class LengthGuardOptions:
+    slack: float = 2.0        # 在期望长度上再放宽的倍数
+    min_tokens: int = 48      # 很短的段落也给足余量（标签、引号、标点）
+    max_tokens: int = 0       # 0 表示不设上限
+
+
+@dataclass
+class GenerationLimits:
+    num_predict: int
+    stop: List[str] = field(default_factory=list)
+
+    def to_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"num_predict": self.num_predict}
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+
+def expansion_ratio(source_lang: str, target_lang: str) -> float:
+    src, tgt = normalize_lang(source_lang), normalize_lang(target_lang)
+    if src == tgt:
+        return 1.0
+    return _EXPANSION.get((src, tgt), DEFAULT_EXPANSION)
+
+
+def generation_limits(
+    source_text: str,
+    opt: PromptOptions,
+    source_lang: str | None = None,
+    guard: LengthGuardOptions | None = None,
+) -> GenerationLimits:
+    """
+    Per-segment num_predict cap and stop sequences. `source_lang` overrides
+    opt.source_lang (useful when it is "auto" and the segment was identified).
+    """
+    if guard is None:
+        guard = LengthGuardOptions()
+    ratio = expansion_ratio(source_lang or opt.source_lang, opt.target_lang)
+    num_predict = max(guard.min_tokens, math.ceil(approx_tokens(source_text) * ratio * guard.slack))
+    if guard.max_tokens:
+        num_predict = min(num_predict, guard.max_tokens)
+    stop = _PRESET_STOPS.get(resolve_preset(opt, source_text), _EXPLANATION_STOPS)
+    return GenerationLimits(num_predict=num_predict, stop=list(stop))
+
+
+class RepetitionGuard:
+    """
+    Detects a generation stuck in a loop: the output ends with the same unit
+    (1..max_period chars) repeated back to back, covering at least min_chars.
+    Units made only of ASCII punctuation and whitespace (Markdown rules, Setext
+    underlines, table separators) are not loops.
+
+    feed() returns True once a loop is seen; `prefix` is then the output up to
+    the end of the first copy of the repeated unit.
+    """
+
+    def __init__(self, min_chars: int = 48, min_repeats: int = 3, max_period: int = 200, check_every: int = 16):
+        self.min_chars = min_chars
+        self.min_repeats = min_repeats
+        self.max_period = max_period
+        self.check_every = check_every
+        self._parts: List[str] = []
+        self._text = ""
+        self._unchecked = 0
+        self.tripped = False
+        self.prefix = ""
+
+    @property
+    def text(self) -> str:
+        if self._parts:
+            self._text += "".join(self._parts)
+            self._parts.clear()
+        return self._text
+
+    def feed(self, chunk: str) -> bool:
+        if self.tripped or not chunk:
+            return self.tripped
+        self._parts.append(chunk)
+        self._unchecked += len(chunk)
+        if self._unchecked >= self.check_every:
+            self._unchecked = 0
+            self._check(self.text)
+        return self.tripped
+
+    def _check(self, text: str) -> None:
+        n = len(text)
+        if n < self.min_chars:
+            return
+        last = text[-1]
+        for p in range(1, min(self.max_period, n // self.min_repeats) + 1):
+            if text[-1 - p] != last:  # 绝大多数周期在这里就排除了
+                continue
+            span = max(p * self.min_repeats, self.min_chars)
+            if span > n:
+                continue
+            # 周期为 p 等价于 text[i] == text[i - p] 在整个区间成立
+            start = n - span
+            if text[start:n - p] != text[start + p:n]:
+                continue
+            if _is_layout(text[n - p:n]):
+                continue  # Markdown 分隔线、Setext 下划线、表格分隔行这类整行符号不是循环
+            while start > 0 and text[start - 1] == text[start - 1 + p]:
+                start -= 1
+            self.tripped = True
+            self.prefix = text[:_unit_end(text, start, p)].rstrip()
+            return
+
+
+_SENTENCE_END = frozenset(".!?。！？…;；")
+_LAYOUT_CHARS = frozenset(string.punctuation + string.whitespace)
+
+
+def _is_layout(unit: str) -> bool:
+    # 只由 ASCII 标点和空白组成的重复单元（----、====、| --- |）
+    return all(ch in _LAYOUT_CHARS for ch in unit)
+
+
+def _unit_end(text: str, start: int, period: int) -> int:
+    # 循环区间起点不一定对齐句子，挑一个落在句末标点（其次是空白）上的切点
+    base = start + period
+    for marks in (_SENTENCE_END, None):
+        for k in range(period):
+            ch = text[base + k - 1]
+            if (ch in marks) if marks is not None else ch.isspace():
+                return base + k
+    return base
+
+
+def trim_repetition(text: str, **kwargs: Any) -> Tuple[str, bool]:
+    """Non-streaming variant: (text cut after the first copy of a trailing loop, looped?)."""
+    guard = RepetitionGuard(check_every=1, **kwargs)
+    guard._check(text)
+    if guard.tripped:
+        return guard.prefix, True
+    return text, False
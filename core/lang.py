@@ -1,3 +1,10 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import Counter, OrderedDict
 from dataclasses import dataclass
 
 # 你可以按需扩充
@@ -53,4 +60,288 @@ def display_lang(lang: str) -> str:
     x = normalize_lang(lang)
     if x == "auto":
         return "auto"
-    return _LANG_DISPLAY.get(x, x)
\ No newline at end of file
+    return _LANG_DISPLAY.get(x, x)
+
+# ---------- 分段语种识别 ----------
+
+@dataclass
+class LangGuess:
+    lang: str            # 'zh'/'ja'/'ko'/'ru'/'en'/'fr'/'de'/'es'，无法判断时为 'und'
+    confidence: float    # 0.0 ~ 1.0
+
+
+# 拉丁字母语言靠高频词 + 特征字符区分，足够应付剪贴板里的一行文字
+_LATIN_STOPWORDS = {
+    "en": frozenset(
+        "the of and to in is are was were be this that it for on with as by at from "
+        "not or an have has will can you we they he she i".split()
+    ),
+    "fr": frozenset(
+        "le la les des du de un une et est sont pas pour dans que qui sur avec ce "
+        "cette il elle nous vous je au aux".split()
+    ),
+    "de": frozenset(
+        "der die das und ist sind nicht ein eine mit für auf den dem des zu von "
+        "ich sie wir es auch im".split()
+    ),
+    "es": frozenset(
+        "el la los las de del y es son no un una para con por que en se lo al "
+        "como yo su está".split()
+    ),
+}
+_LATIN_MARKS = {
+    "fr": frozenset("àâçèéêëîïôœùûÿ"),
+    "de": frozenset("äöüß"),
+    "es": frozenset("áíñóú¿¡"),
+}
+# 各语言正常会出现的重音字母；出现别的（葡语的 ã/õ、意语的 ò/ì）说明是没收录的近亲语言
+_LATIN_ALPHABETS = {
+    "fr": frozenset("àâæçéèêëîïôœùûüÿ"),
+    "de": frozenset("äöüßé"),
+    "es": frozenset("áéíñóúü¿¡"),
+}
+# 至少命中这么多个不同的高频词，置信度才可能高到把段落当成“已是目标语言”跳过
+_MIN_STOPWORD_HITS = 2
+_WEAK_CONFIDENCE = 0.5
+_WORD_RE = re.compile(r"[^\W\d_]+")
+
+# 一个 CJK 字大致相当于一个词，拉丁/西里尔字母按 4 个字母一个词折算
+_ALPHA_WEIGHT = 0.25
+
+
+def _script_counts(text: str) -> tuple[int, int, int, int, int]:
+    han = kana = hangul = cyrillic = latin = 0
+    for ch in text:
+        code = ord(ch)
+        if code < 0x80:
+            if ("a" <= ch <= "z") or ("A" <= ch <= "Z"):
+                latin += 1
+        elif 0x4E00 <= code <= 0x9FFF or 0x3400 <= code <= 0x4DBF or 0xF900 <= code <= 0xFAFF:
+            han += 1
+        elif 0x3040 <= code <= 0x30FF or 0x31F0 <= code <= 0x31FF or 0xFF66 <= code <= 0xFF9D:
+            kana += 1
+        elif 0xAC00 <= code <= 0xD7AF or 0x1100 <= code <= 0x11FF or 0x3130 <= code <= 0x318F:
+            hangul += 1
+        elif 0x0400 <= code <= 0x04FF:
+            cyrillic += 1
+        elif 0x00C0 <= code <= 0x024F:
+            latin += 1
+    return han, kana, hangul, cyrillic, latin
+
+
+def _guess_latin(text: str) -> LangGuess:
+    lowered = text.lower()
+    words = _WORD_RE.findall(lowered)
+    if not words:
+        return LangGuess("und", 0.0)
+
+    scores = {lang: 0.0 for lang in _LATIN_STOPWORDS}
+    hits: dict[str, set[str]] = {lang: set() for lang in _LATIN_STOPWORDS}
+    for w in words:
+        for lang, stop in _LATIN_STOPWORDS.items():
+            if w in stop:
+                scores[lang] += 1.0
+                hits[lang].add(w)
+    for ch in lowered:
+        if ch > "\x7f":
+            for lang, marks in _LATIN_MARKS.items():
+                if ch in marks:
+                    scores[lang] += 0.5
+
+    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    best_lang, best = ranked[0]
+    second = ranked[1][1]
+    if best <= 0:
+        # 没有任何证据时默认英文，但置信度很低，不会被当作“已是目标语言”
+        return LangGuess("en", 0.3)
+
+    # 证据越多、和第二名拉得越开越可信；短句天然不太可信
+    coverage = min(1.0, best / max(1.0, len(words) * 0.25))
+    margin = (best - second) / best
+    confidence = coverage * (0.5 + 0.5 * margin)
+    # 一个词、一个重音符号不够：葡语 "O gato está na mesa" 只靠 está 就会被认成西语
+    alphabet = _LATIN_ALPHABETS.get(best_lang)
+    foreign = alphabet is not None and any(ch > "\x7f" and ch.isalpha() and ch not in alphabet for ch in lowered)
+    if len(hits[best_lang]) < _MIN_STOPWORD_HITS or foreign:
+        confidence = min(confidence, _WEAK_CONFIDENCE)
+    return LangGuess(best_lang, round(confidence, 3))
+
+
+def identify_lang(text: str) -> LangGuess:
+    """
+    Linear-time script + stopword language guess for a single segment.
+    """
+    if not text or not text.strip():
+        return LangGuess("und", 0.0)
+
+    han, kana, hangul, cyrillic, latin = _script_counts(text)
+    weighted = {
+        "cjk": float(han + kana),
+        "ko": float(hangul),
+        "ru": cyrillic * _ALPHA_WEIGHT,
+        "latin": latin * _ALPHA_WEIGHT,
+    }
+    total = sum(weighted.values())
+    if total <= 0:
+        return LangGuess("und", 0.0)
+
+    script, amount = max(weighted.items(), key=lambda x: x[1])
+    share = amount / total
+
+    if script == "cjk":
+        # 只要有一定比例的假名就是日文；纯汉字按中文处理
+        if kana and kana >= 0.1 * (han + kana):
+            return LangGuess("ja", round(share, 3))
+        if han < 2:
+            return LangGuess("zh", round(share * 0.5, 3))
+        return LangGuess("zh", round(share, 3))
+    if script == "ko":
+        return LangGuess("ko", round(share, 3))
+    if script == "ru":
+        return LangGuess("ru", round(share, 3))
+
+    guess = _guess_latin(text)
+    return LangGuess(guess.lang, round(guess.confidence * share, 3))
+
+
+# ---------- 整篇文档的语种分布（大文本） ----------
+
+# (起始码位, 结束码位(含), 脚本)；按起始码位排序，供 searchsorted / bisect 使用
+_SCRIPT_BLOCKS = [
+    (0x0041, 0x005A, "latin"),
+    (0x0061, 0x007A, "latin"),
+    (0x00C0, 0x024F, "latin"),
+    (0x0400, 0x04FF, "cyrillic"),
+    (0x1100, 0x11FF, "hangul"),
+    (0x3040, 0x30FF, "kana"),
+    (0x3130, 0x318F, "hangul"),
+    (0x31F0, 0x31FF, "kana"),
+    (0x3400, 0x4DBF, "han"),
+    (0x4E00, 0x9FFF, "han"),
+    (0xAC00, 0xD7AF, "hangul"),
+    (0xF900, 0xFAFF, "han"),
+    (0xFF66, 0xFF9D, "kana"),
+]
+_SCRIPTS = ("latin", "cyrillic", "hangul", "kana", "han")
+_SCRIPT_WEIGHTS = {"latin": _ALPHA_WEIGHT, "cyrillic": _ALPHA_WEIGHT, "hangul": 1.0, "kana": 1.0, "han": 1.0}
+
+# 采样上限：超过这个长度时按等距分层抽样，保证耗时与文档大小无关
+DETECT_SAMPLE_CHARS = 64 * 1024
+DETECT_SAMPLE_STRATA = 16
+_DETECT_CACHE_SIZE = 64
+_detect_cache: OrderedDict[bytes, list[tuple[str, float]]] = OrderedDict()
+_detect_cache_lock = threading.Lock()
+
+
+def _stratified_sample(text: str, limit: int, strata: int) -> str:
+    n = len(text)
+    if n <= limit:
+        return text
+    window = limit // strata
+    step = n // strata
+    return "".join(text[i * step:i * step + window] for i in range(strata))
+
+
+def _script_histogram_numpy(np, sample: str) -> dict[str, int]:
+    # 剪贴板 / PDF 里常有孤立代理项，严格编码会直接抛 UnicodeEncodeError
+    codes = np.frombuffer(sample.encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    starts = np.array([b[0] for b in _SCRIPT_BLOCKS], dtype=np.uint32)
+    ends = np.array([b[1] for b in _SCRIPT_BLOCKS], dtype=np.uint32)
+    idx = np.searchsorted(starts, codes, side="right") - 1
+    valid = idx >= 0
+    idx_valid = idx[valid]
+    in_block = codes[valid] <= ends[idx_valid]
+    counts = np.bincount(idx_valid[in_block], minlength=len(_SCRIPT_BLOCKS))
+    hist = dict.fromkeys(_SCRIPTS, 0)
+    for (_, _, script), c in zip(_SCRIPT_BLOCKS, counts.tolist()):
+        hist[script] += c
+    return hist
+
+
+def _script_histogram_counter(sample: str) -> dict[str, int]:
+    # 没有 numpy 时：Counter 在 C 里完成逐字符计数，Python 层只遍历不同字符
+    starts = [b[0] for b in _SCRIPT_BLOCKS]
+    hist = dict.fromkeys(_SCRIPTS, 0)
+    for ch, c in Counter(sample).items():
+        code = ord(ch)
+        i = bisect_right(starts, code) - 1
+        if i >= 0 and code <= _SCRIPT_BLOCKS[i][1]:
+            hist[_SCRIPT_BLOCKS[i][2]] += c
+    return hist
+
+
+def script_histogram(sample: str) -> dict[str, int]:
+    try:
+        import numpy as np  # type: ignore
+    except Exception:
+        return _script_histogram_counter(sample)
+    return _script_histogram_numpy(np, sample)
+
+
+def _distribution_from_histogram(hist: dict[str, int], sample: str) -> list[tuple[str, float]]:
+    weighted: dict[str, float] = {}
+    cjk = hist["han"] + hist["kana"]
+    if cjk:
+        # 假名占比足够才算日文，否则汉字归中文
+        if hist["kana"] >= 0.1 * cjk:
+            weighted["ja"] = float(cjk)
+        else:
+            weighted["zh"] = float(cjk)
+    if hist["hangul"]:
+        weighted["ko"] = hist["hangul"] * _SCRIPT_WEIGHTS["hangul"]
+    if hist["cyrillic"]:
+        weighted["ru"] = hist["cyrillic"] * _SCRIPT_WEIGHTS["cyrillic"]
+    if hist["latin"]:
+        # 停用词打分只需要少量文本
+        latin_lang = _guess_latin(_stratified_sample(sample, 8192, DETECT_SAMPLE_STRATA)).lang
+        if latin_lang == "und":
+            latin_lang = "en"
+        weighted[latin_lang] = weighted.get(latin_lang, 0.0) + hist["latin"] * _SCRIPT_WEIGHTS["latin"]
+
+    total = sum(weighted.values())
+    if total <= 0:
+        return []
+    ranked = sorted(weighted.items(), key=lambda x: x[1], reverse=True)
+    return [(lang, round(w / total, 4)) for lang, w in ranked]
+
+
+def detect_lang_distribution(
+    text: str,
+    sample_chars: int = DETECT_SAMPLE_CHARS,
+    strata: int = DETECT_SAMPLE_STRATA,
+) -> list[tuple[str, float]]:
+    """
+    Ranked (lang, share) distribution for a whole document.
+
+    Uses a bounded stratified sample and a vectorized Unicode-block histogram
+    (numpy when available), cached by content hash.
+    """
+    if not text or not text.strip():
+        return []
+
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    key += f":{sample_chars}:{strata}".encode("ascii")
+    with _detect_cache_lock:
+        cached = _detect_cache.get(key)
+        if cached is not None:
+            _detect_cache.move_to_end(key)
+            return list(cached)
+
+    sample = _stratified_sample(text, sample_chars, max(1, strata))
+    result = _distribution_from_histogram(script_histogram(sample), sample)
+
+    with _detect_cache_lock:
+        _detect_cache[key] = result
+        while len(_detect_cache) > _DETECT_CACHE_SIZE:
+            _detect_cache.popitem(last=False)
+    return list(result)
+
+
+def detect_source_lang(text: str, default: str = "en") -> str | None:
+    """
+    Most likely source language of a document; None for blank input.
+    """
+    if not text or not text.strip():
+        return None
+    ranked = detect_lang_distribution(text)
+    return ranked[0][0] if ranked else default
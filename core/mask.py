@@ -0,0 +1,151 @@
+# hy_translator/core/mask.py
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class MaskOptions:
+    code: bool = True      # ```fenced``` 和 `inline code`
+    urls: bool = True
+    emails: bool = True
+    tags: bool = True      # <sn>、</b>、<br/> 之类的标记
+    paths: bool = True
+    numbers: bool = True
+
+
+# 顺序即优先级：先吃掉代码块，里面的 URL / 数字不再单独处理
+_SPAN_PATTERNS = (
+    ("code", r"```[\s\S]*?```|`[^`\n]+`"),
+    ("urls", r"(?:[a-z][a-z0-9+.\-]*://|www\.)[^\s<>\"'`，。、；：！？（）【】《》]+"),
+    ("emails", r"[\w.+\-]+@[\w\-]+(?:\.[\w\-]+)+"),
+    ("tags", r"</?[A-Za-z][\w\-]*(?:\s[^<>\n]*)?/?>"),
+    ("paths", r"(?<![\w/])(?:~|\.{1,2})?/[\w.\-]+(?:/[\w.\-]*)+|(?<!\w)[A-Za-z]:\\[\w.\\\-]+"),
+    ("numbers", r"(?<![A-Za-z0-9_.])[+\-]?\d(?:[\d,.:]*\d)?(?![A-Za-z0-9_])"),
+)
+_SPAN_RES = {name: re.compile(pattern, re.IGNORECASE if name == "urls" else 0) for name, pattern in _SPAN_PATTERNS}
+# URL 末尾的标点一般属于句子，不属于链接
+_URL_TRAILING = ".,;:!?)]}'\""
+
+# 模型偶尔会在花括号里加空格，还原时一并容忍
+_PLACEHOLDER_RE = re.compile(r"\{\s*(\d+)\s*\}")
+_CJK_RE = re.compile(r"[぀-ヿ㐀-鿿가-힯]")
+
+
+def placeholder(index: int) -> str:
+    return "{" + str(index) + "}"
+
+
+def has_placeholders(text: str) -> bool:
+    return bool(_PLACEHOLDER_RE.search(text))
+
+
+def approx_tokens(text: str) -> int:
+    """Rough tokenizer-free estimate: one token per CJK char, ~4 chars per token otherwise."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+@dataclass
+class MaskedText:
+    source: str
+    text: str                                       # 送进 prompt 的文本
+    spans: List[str] = field(default_factory=list)  # spans[i] 对应 placeholder(i + 1)
+    overhead_tokens: int = 0                        # 遮挡带来的额外 prompt 开销（占位符说明）
+
+    @property
+    def masked(self) -> bool:
+        return bool(self.spans)
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, approx_tokens(self.source) - approx_tokens(self.text) - self.overhead_tokens)
+
+
+def _find_spans(text: str, opt: MaskOptions) -> List[tuple]:
+    found: List[tuple] = []
+    taken = [False] * len(text)
+    for name, _ in _SPAN_PATTERNS:
+        if not getattr(opt, name):
+            continue
+        for m in _SPAN_RES[name].finditer(text):
+            start, end = m.span()
+            if name == "urls":
+                while end > start and text[end - 1] in _URL_TRAILING:
+                    end -= 1
+            if end <= start or any(taken[start:end]):
+                continue
+            found.append((start, end))
+            for i in range(start, end):
+                taken[i] = True
+    found.sort()
+    return found
+
+
+def mask_spans(text: str, opt: MaskOptions | None = None) -> MaskedText:
+    """
+    Replace spans the model should copy verbatim with short {n} placeholders.
+    A span is only masked when the placeholder is shorter than it.
+    """
+    if opt is None:
+        opt = MaskOptions()
+    # 原文里本来就有 {1} 这种写法时不做遮挡，否则没法区分
+    if not text or _PLACEHOLDER_RE.search(text):
+        return MaskedText(source=text, text=text)
+
+    parts: List[str] = []
+    spans: List[str] = []
+    pos = 0
+    for start, end in _find_spans(text, opt):
+        span = text[start:end]
+        ph = placeholder(len(spans) + 1)
+        if len(span) <= len(ph):
+            continue
+        parts.append(text[pos:start])
+        parts.append(ph)
+        spans.append(span)
+        pos = end
+    if not spans:
+        return MaskedText(source=text, text=text)
+    parts.append(text[pos:])
+    return MaskedText(source=text, text="".join(parts), spans=spans)
+
+
+def unmask_spans(text: str, masked: MaskedText) -> Optional[str]:
+    """
+    Put the original spans back. Returns None unless every placeholder came
+    back exactly once and no unknown placeholder appeared.
+    """
+    if not masked.spans:
+        return text
+    seen = [0] * len(masked.spans)
+
+    def _restore(m: re.Match) -> str:
+        idx = int(m.group(1)) - 1
+        if 0 <= idx < len(seen):
+            seen[idx] += 1
+            return masked.spans[idx]
+        seen.append(2)  # 未知编号：让校验失败
+        return m.group(0)
+
+    restored = _PLACEHOLDER_RE.sub(_restore, text)
+    if any(n != 1 for n in seen):
+        return None
+    return restored
+
+
+_TRAILING_PARTIAL_RE = re.compile(r"\{\s*\d*\s*$")
+
+
+def unmask_partial(text: str, masked: MaskedText) -> str:
+    """Best-effort restore for streaming display; hides a half-received placeholder."""
+    if not masked.spans:
+        return text
+
+    def _restore(m: re.Match) -> str:
+        idx = int(m.group(1)) - 1
+        return masked.spans[idx] if 0 <= idx < len(masked.spans) else m.group(0)
+
+    return _PLACEHOLDER_RE.sub(_restore, _TRAILING_PARTIAL_RE.sub("", text))
@@ -0,0 +1,284 @@
+# hy_translator/core/metrics.py
+
+from __future__ import annotations
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 单个分段（一次生成）和整篇请求的耗时分桶，单位秒
+SEGMENT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+REQUEST_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+TTFT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._child(())
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _child(self, key: LabelValues):
+        # 热路径只做一次 dict 查找；新标签组合才加锁
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def labels(self, *values: str, **kwargs: str):
+        if kwargs:
+            values = tuple(str(kwargs[n]) for n in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return self._child(values)
+
+    def _samples(self) -> Iterable[Tuple[str, LabelValues, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        self._fn = fn  # 计数已经在别处维护时（SingleFlight），抓取时读出来
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def value(self, *values: str) -> float:
+        if self._fn is not None and not values:
+            return float(self._fn())
+        child = self._children.get(tuple(values))
+        return child.value if child is not None else 0.0
+
+    def _samples(self):
+        suffix = "" if self.name.endswith("_total") else "_total"
+        if self._fn is not None:
+            yield suffix, (), "", float(self._fn())
+            return
+        for values, child in list(self._children.items()):
+            yield suffix, values, "", child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable[[], float]] = None):
+        self._fn = fn  # 抓取时才计算的值（例如 SingleFlight.in_flight）
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def value(self, *values: str) -> float:
+        if self._fn is not None and not values:
+            return float(self._fn())
+        child = self._children.get(tuple(values))
+        return child.value if child is not None else 0.0
+
+    def _samples(self):
+        if self._fn is not None:
+            yield "", (), "", float(self._fn())
+            return
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个是 +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                yield "_bucket", values, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", values, "", total
+            yield "_count", values, "", cumulative
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics in the Prometheus text format.
+
+    Registering an existing name returns the existing metric, so modules can
+    declare their metrics at import time without coordinating.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, name: str, factory: Callable[[], _Metric]) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = factory()
+                self._metrics[name] = metric
+            return metric
+
+    def counter(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Counter:
+        return self._register(name, lambda: Counter(name, help, labelnames, fn))  # type: ignore[return-value]
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        fn: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self._register(name, lambda: Gauge(name, help, labelnames, fn))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, buckets, labelnames))  # type: ignore[return-value]
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------- 各层共用的指标 ----------
+
+SEGMENTS = REGISTRY.counter(
+    "translator_segments_total",
+    "Segments processed, by how they were resolved.",
+    ("status",),  # translated / passthrough / deduplicated / untranslated
+)
+SEGMENT_SECONDS = REGISTRY.histogram(
+    "translator_segment_seconds",
+    "Wall time to translate one segment (prompt to final text).",
+    SEGMENT_BUCKETS,
+)
+ABORTED_GENERATIONS = REGISTRY.counter(
+    "translator_aborted_generations_total",
+    "Generations cut short because the output started repeating.",
+)
+TRUNCATED_GENERATIONS = REGISTRY.counter(
+    "translator_truncated_generations_total",
+    "Generations stopped by the num_predict cap (done_reason=length) before finishing.",
+)
+MASK_FALLBACKS = REGISTRY.counter(
+    "translator_mask_fallbacks_total",
+    "Segments re-translated unmasked because a placeholder was lost.",
+)
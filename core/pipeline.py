@@ -1,9 +1,11 @@
 # hy_translator/core/pipeline.py
 
 from __future__ import annotations
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Callable, List
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
 
 from .splitter import (
     SplitOptions,
@@ -12,8 +14,20 @@ from .splitter import (
     split_plain,
     split_with_limited_context,
 )
-from .prompt import PromptOptions, build_prompt
+from .prompt import PromptOptions, build_prompt, placeholder_note
 from .postprocess import PostProcessOptions, extract_translation
+from .classify import SegmentKind, classify_segment, is_passthrough
+from .lang import LangGuess, identify_lang, normalize_lang
+from .mask import MaskOptions, MaskedText, approx_tokens, mask_spans, unmask_spans
+from .guard import trim_repetition
+from .timing import NULL_TIMER, Deadline, StageTimer
+from .metrics import ABORTED_GENERATIONS, MASK_FALLBACKS, SEGMENT_SECONDS, SEGMENTS, TRUNCATED_GENERATIONS
+
+
+_TRANSLATED = SEGMENTS.labels("translated")
+_PASSTHROUGH = SEGMENTS.labels("passthrough")
+_DEDUPLICATED = SEGMENTS.labels("deduplicated")
+_UNTRANSLATED = SEGMENTS.labels("untranslated")
 
 
 class SplitMode(str, Enum):
@@ -32,6 +46,10 @@ class AlignedPair:
     context: str = ""   # 仅 debug 或 UI 需要时用
     prompt: str = ""    # debug
     raw: str = ""       # debug
+    lang: str = ""      # 分段识别出的源语种
+    stats: Any = None   # 后端返回的生成统计（backend.GenerationStats），没有则为 None
+    model: str = ""     # 生成这段译文的模型（按段路由时各段可能不同）
+    untranslated: bool = False  # 时间预算用完没来得及翻译，target 是原文
 
 @dataclass
 class SegmentReport:
@@ -45,6 +63,18 @@ class SegmentReport:
     prompt_contains_context: bool
     used_contextual_template: bool  # 参考上面的信息... 这句是否出现
 
+    kind: SegmentKind = SegmentKind.TEXT
+    passthrough: bool = False  # True 表示没有调用模型，原样输出
+    lang: str = ""             # 分段识别出的语种
+    deduplicated: bool = False # True 表示复用了前面相同 (text, context) 段落的结果
+    masked_spans: int = 0      # 用占位符替换掉的片段数
+    mask_fallback: bool = False  # 占位符没有完整还原，改用原文重新翻译
+    aborted: bool = False      # 输出陷入重复，只保留了前面的有效部分
+    truncated: bool = False    # 生成被 num_predict 上限截断（done_reason == "length"），译文可能不完整
+    untranslated: bool = False # 时间预算用完，原样输出
+    stats: Any = None          # 同 AlignedPair.stats
+    timings: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（ms）
+
 @dataclass
 class PipelineOptions:
     split_mode: SplitMode = SplitMode.PLAIN
@@ -58,6 +88,27 @@ class PipelineOptions:
     keep_debug: bool = False
     join_with: str = "\n"
     skip_empty_segments: bool = True
+    # 纯数字 / URL / 路径 / 代码等不需要翻译的段落直接原样输出，不调用模型
+    passthrough_non_linguistic: bool = True
+    # 已经是目标语言（且足够确定）的段落也原样输出
+    skip_target_lang_segments: bool = True
+    target_lang_min_confidence: float = 0.8
+    # 相同 (text, context) 的段落只生成一次，结果复用到所有位置
+    dedup_segments: bool = True
+    # URL / 代码 / 数字 / 标签等片段先换成 {n} 占位符，译完再还原
+    mask_placeholders: bool = True
+    mask_opt: MaskOptions = field(default_factory=MaskOptions)
+    # 输出陷入循环（同一段文字反复出现）时截掉重复部分
+    trim_repetition: bool = True
+    # return_report=True 时记录每个阶段的耗时
+    collect_timings: bool = True
+    # >1 时用线程池提前并发生成后面的段落（输出顺序不变）；实际并发还受后端
+    # 的自适应上限约束（OllamaBackendOptions.concurrency）。并发时没有分段计时
+    max_workers: int = 1
+    # 整篇文档的时间预算（秒）；用完后还要调用模型的段落原样输出并标记 untranslated，
+    # 直通 / 去重 / 已经预取完成的段落照常输出。
+    # 只在段落之间检查，单次 generate 不会被打断
+    deadline_sec: Optional[float] = None
 
 
 GenerateFn = Callable[[str], str]
@@ -68,10 +119,276 @@ def make_segments(text: str, opt: PipelineOptions) -> List[Segment]:
         return split_with_limited_context(text, split_opt=opt.split_opt, ctx_opt=opt.ctx_opt)
     return split_plain(text, opt=opt.split_opt)
 
+def segment_kind(seg: Segment, opt: PipelineOptions) -> SegmentKind:
+    if not seg.text.strip():
+        return SegmentKind.EMPTY
+    if not opt.passthrough_non_linguistic:
+        return SegmentKind.TEXT
+    return classify_segment(seg.text)
+
+
+TARGET_LANG_SKIP = "target_lang"
+
+
+@dataclass
+class SegmentTriage:
+    kind: SegmentKind
+    lang: LangGuess
+    skip_reason: str | None = None  # None 表示需要调用模型
+
+    @property
+    def passthrough(self) -> bool:
+        return self.skip_reason is not None
+
+
+def triage_segment(seg: Segment, opt: PipelineOptions) -> SegmentTriage:
+    """
+    Decide whether a segment needs the model at all, before any prompt is built.
+    """
+    kind = segment_kind(seg, opt)
+    if is_passthrough(kind):
+        return SegmentTriage(kind=kind, lang=LangGuess("und", 0.0), skip_reason=kind.value)
+
+    guess = identify_lang(seg.text)
+    target = normalize_lang(opt.prompt_opt.target_lang)
+    if (
+        opt.skip_target_lang_segments
+        and guess.lang == target
+        and guess.confidence >= opt.target_lang_min_confidence
+    ):
+        return SegmentTriage(kind=kind, lang=guess, skip_reason=TARGET_LANG_SKIP)
+    return SegmentTriage(kind=kind, lang=guess)
+
+
+SegmentKey = Tuple[str, str]
+
+
+def segment_key(seg: Segment) -> SegmentKey:
+    return (seg.text, seg.context)
+
+
+def dedup_stats(keys: Iterable[Hashable]) -> Tuple[int, int]:
+    """(segments sent to the model, distinct dedup-cache keys among them)"""
+    keys = list(keys)
+    return len(keys), len(set(keys))
+
+
+def dedup_ratio(total: int, unique: int) -> float:
+    return 1.0 - unique / total if total else 0.0
+
+
+def segment_prompt_options(seg: Segment, opt: PipelineOptions) -> PromptOptions:
+    return PromptOptions(
+        source_lang=opt.prompt_opt.source_lang,
+        target_lang=opt.prompt_opt.target_lang,
+        preset=opt.prompt_opt.preset,
+        terminology=opt.prompt_opt.terminology,
+        context=seg.context,
+        src_text_with_format=opt.prompt_opt.src_text_with_format,
+    )
+
+
+def mask_segment(seg: Segment, opt: PipelineOptions) -> MaskedText:
+    # 格式翻译的 prompt 用的是 src_text_with_format，遮挡后的文本根本不会发给模型
+    if not opt.mask_placeholders or opt.prompt_opt.src_text_with_format:
+        return MaskedText(source=seg.text, text=seg.text)
+    masked = mask_spans(seg.text, opt.mask_opt)
+    if masked.masked:
+        # 遮挡后 prompt 要多带一段占位符说明；省下的不够抵这段开销就不遮挡
+        masked.overhead_tokens = approx_tokens(placeholder_note(masked.text, segment_prompt_options(seg, opt)))
+        if masked.tokens_saved <= 0:
+            return MaskedText(source=seg.text, text=seg.text)
+    return masked
+
+
+@dataclass
+class SegmentOutcome:
+    prompt: str
+    raw: str
+    target: str
+    masked_spans: int = 0
+    tokens_saved: int = 0
+    mask_fallback: bool = False
+    aborted: bool = False
+    stats: Any = None
+
+    @property
+    def truncated(self) -> bool:
+        # 回退重翻时合并后的 done_reason 取第二次生成的
+        return getattr(self.stats, "done_reason", None) == "length"
+
+
+def _generate_and_extract(
+    prompt: str,
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    timer: StageTimer,
+) -> Tuple[str, str, bool, Any]:
+    t0 = timer.clock()
+    raw = generate(prompt)
+    timer.add("generate", t0)
+    # OllamaBackend.generate 返回带 .stats 的 str；普通函数没有
+    stats = getattr(raw, "stats", None)
+    t0 = timer.clock()
+    looped = False
+    if opt.trim_repetition:
+        raw, looped = trim_repetition(raw)
+    target = extract_translation(raw, opt.post_opt)
+    timer.add("extract", t0)
+    return raw, target, looped, stats
+
+
+def _add_stats(a: Any, b: Any) -> Any:
+    if a is None or b is None:
+        return b if a is None else a
+    return a + b
+
+
+def translate_segment(
+    seg: Segment,
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    timer: StageTimer = NULL_TIMER,
+) -> SegmentOutcome:
+    """
+    build_prompt -> generate -> extract for one segment, with placeholder
+    masking. If a placeholder does not survive, the segment is translated
+    again unmasked.
+    """
+    started = time.perf_counter()
+    outcome = _translate_segment(seg, opt, generate, timer)
+    SEGMENT_SECONDS.observe(time.perf_counter() - started)
+    _TRANSLATED.inc()
+    if outcome.aborted:
+        ABORTED_GENERATIONS.inc()
+    if outcome.truncated:
+        TRUNCATED_GENERATIONS.inc()
+    if outcome.mask_fallback:
+        MASK_FALLBACKS.inc()
+    return outcome
+
+
+def _translate_segment(
+    seg: Segment,
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    timer: StageTimer,
+) -> SegmentOutcome:
+    t0 = timer.clock()
+    masked = mask_segment(seg, opt)
+    p_opt = segment_prompt_options(seg, opt)
+    prompt = build_prompt(masked.text, p_opt)
+    timer.add("prompt", t0)
+    raw, target, looped, stats = _generate_and_extract(prompt, opt, generate, timer)
+    if not masked.masked:
+        return SegmentOutcome(prompt=prompt, raw=raw, target=target, aborted=looped, stats=stats)
+
+    restored = unmask_spans(target, masked)
+    if restored is not None:
+        return SegmentOutcome(
+            prompt=prompt,
+            raw=raw,
+            target=restored,
+            masked_spans=len(masked.spans),
+            tokens_saved=masked.tokens_saved,
+            aborted=looped,
+            stats=stats,
+        )
+
+    # 第一次生成的开销也要算进去
+    first_stats = stats
+    t0 = timer.clock()
+    prompt = build_prompt(seg.text, p_opt)
+    timer.add("prompt", t0)
+    raw, target, looped, stats = _generate_and_extract(prompt, opt, generate, timer)
+    return SegmentOutcome(
+        prompt=prompt,
+        raw=raw,
+        target=target,
+        mask_fallback=True,
+        aborted=looped,
+        stats=_add_stats(first_stats, stats),
+    )
+
+
+def _prefetch(
+    segments: List[Segment],
+    opt: PipelineOptions,
+    generate: GenerateFn,
+) -> Tuple[Optional[ThreadPoolExecutor], Dict[int, "Future[SegmentOutcome]"]]:
+    """Submit every segment that will reach the model (first occurrence only with dedup)."""
+    if opt.max_workers <= 1:
+        return None, {}
+    pool = ThreadPoolExecutor(max_workers=opt.max_workers, thread_name_prefix="pipeline")
+    futures: Dict[int, Future] = {}
+    seen = set()
+    for i, seg in enumerate(segments):
+        if opt.skip_empty_segments and not seg.text.strip():
+            continue
+        if triage_segment(seg, opt).passthrough:
+            continue
+        if opt.dedup_segments:
+            key = segment_key(seg)
+            if key in seen:
+                continue
+            seen.add(key)
+        futures[i] = pool.submit(translate_segment, seg, opt, generate)
+    return pool, futures
+
+
+def _budgeted_outcome(
+    i: int,
+    seg: Segment,
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    futures: Dict[int, "Future[SegmentOutcome]"],
+    deadline: Deadline,
+    timer: StageTimer = NULL_TIMER,
+) -> Optional[SegmentOutcome]:
+    """The segment's translation, or None when the deadline runs out first."""
+    future = futures.get(i)
+    if future is not None:
+        remaining = deadline.remaining()
+        if remaining is None or future.done():
+            return future.result()
+        try:
+            return future.result(timeout=max(0.0, remaining))
+        except FutureTimeoutError:
+            future.cancel()
+            return None
+    if deadline.expired:
+        return None
+    return translate_segment(seg, opt, generate, timer)
+
+
 @dataclass
 class PipelineReport:
     split_mode: SplitMode
     reports: List[SegmentReport] = field(default_factory=list)
+    # kind -> 跳过模型调用的段落数
+    passthrough_counts: Dict[str, int] = field(default_factory=dict)
+    translated_count: int = 0
+    # 去重：要调用模型的段落数（直通的不算）/ 其中不同 (text, context) 数 / 实际复用次数
+    dedup_total: int = 0
+    dedup_unique: int = 0
+    dedup_hits: int = 0
+    # 占位符：估算省下的源文 token 数 / 回退到原文重翻的段落数
+    mask_tokens_saved: int = 0
+    mask_fallbacks: int = 0
+    aborted_generations: int = 0  # 因为重复被截断的生成次数
+    truncated_generations: int = 0  # 被 num_predict 上限截断的生成次数
+    # 时间预算用完没有翻译的段落下标（同 SegmentReport.index）
+    untranslated_segments: List[int] = field(default_factory=list)
+    # 阶段 -> count / total_ms / mean_ms / p50_ms / p90_ms / p99_ms / max_ms
+    timings: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+    @property
+    def passthrough_total(self) -> int:
+        return sum(self.passthrough_counts.values())
+
+    @property
+    def dedup_ratio(self) -> float:
+        return dedup_ratio(self.dedup_total, self.dedup_unique)
 
     def context_success_rate(self) -> float:
         candidates = [r for r in self.reports if r.expected_context.strip()]
@@ -92,7 +409,11 @@ def run_pipeline(
     if opt is None:
         opt = PipelineOptions()
 
+    deadline = Deadline(opt.deadline_sec)
+    timer = StageTimer() if return_report and opt.collect_timings else NULL_TIMER
+    t0 = timer.clock()
     segments = make_segments(text, opt)
+    timer.add("split", t0)
     pairs: List[AlignedPair] = []
 
     report: PipelineReport | None = (
@@ -100,23 +421,96 @@ def run_pipeline(
         if return_report
         else None
     )
+    done: Dict[SegmentKey, SegmentOutcome] = {}
+    pool, futures = _prefetch(segments, opt, generate)
+    try:
+        _run_segments(segments, opt, generate, timer, report, pairs, done, futures, deadline)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    if return_report:
+        report.timings = timer.summary()
+        return pairs, report
+    return pairs
+
 
+def _run_segments(
+    segments: List[Segment],
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    timer: StageTimer,
+    report: Optional[PipelineReport],
+    pairs: List[AlignedPair],
+    done: Dict[SegmentKey, SegmentOutcome],
+    futures: Dict[int, "Future[SegmentOutcome]"],
+    deadline: Deadline,
+) -> None:
+    # 去重统计只算要调用模型的段落，直通的不算
+    seen_keys: Set[SegmentKey] = set()
     for i, seg in enumerate(segments):
         if opt.skip_empty_segments and not seg.text.strip():
             continue
 
-        p_opt = PromptOptions(
-            source_lang=opt.prompt_opt.source_lang,
-            target_lang=opt.prompt_opt.target_lang,
-            preset=opt.prompt_opt.preset,
-            terminology=opt.prompt_opt.terminology,
-            context=seg.context,
-            src_text_with_format=opt.prompt_opt.src_text_with_format,
-        )
+        triage = triage_segment(seg, opt)
+        if triage.passthrough:
+            _PASSTHROUGH.inc()
+            pairs.append(AlignedPair(source=seg.text, target=seg.text, lang=triage.lang.lang))
+            if report is not None:
+                reason = triage.skip_reason
+                report.passthrough_counts[reason] = report.passthrough_counts.get(reason, 0) + 1
+                report.reports.append(
+                    SegmentReport(
+                        index=i,
+                        source=seg.text,
+                        expected_context=seg.context or "",
+                        prompt="",
+                        raw="",
+                        extracted=seg.text,
+                        prompt_contains_context=True,
+                        used_contextual_template=True,
+                        kind=triage.kind,
+                        passthrough=True,
+                        lang=triage.lang.lang,
+                    )
+                )
+            continue
 
-        prompt = build_prompt(seg.text, p_opt)
-        raw = generate(prompt)
-        target = extract_translation(raw, opt.post_opt)
+        key = segment_key(seg)
+        if report is not None and seg.text.strip():
+            seen_keys.add(key)
+            report.dedup_total += 1
+            report.dedup_unique = len(seen_keys)
+        reused = done.get(key) if opt.dedup_segments else None
+        if reused is not None:
+            _DEDUPLICATED.inc()
+        timer.begin_segment()
+        outcome = reused if reused is not None else _budgeted_outcome(i, seg, opt, generate, futures, deadline, timer)
+        seg_timings = timer.end_segment()
+        if outcome is None:
+            _UNTRANSLATED.inc()
+            pairs.append(AlignedPair(source=seg.text, target=seg.text, lang=triage.lang.lang, untranslated=True))
+            if report is not None:
+                report.untranslated_segments.append(i)
+                report.reports.append(
+                    SegmentReport(
+                        index=i,
+                        source=seg.text,
+                        expected_context=seg.context or "",
+                        prompt="",
+                        raw="",
+                        extracted=seg.text,
+                        prompt_contains_context=True,
+                        used_contextual_template=True,
+                        kind=triage.kind,
+                        lang=triage.lang.lang,
+                        untranslated=True,
+                    )
+                )
+            continue
+        if reused is None and opt.dedup_segments:
+            done[key] = outcome
+        prompt, raw, target = outcome.prompt, outcome.raw, outcome.target
 
         pairs.append(
             AlignedPair(
@@ -125,10 +519,20 @@ def run_pipeline(
                 context=seg.context if opt.keep_debug else "",
                 prompt=prompt if opt.keep_debug else "",
                 raw=raw if opt.keep_debug else "",
+                lang=triage.lang.lang,
+                stats=outcome.stats if reused is None else None,
             )
         )
 
         if report is not None:
+            if reused is not None:
+                report.dedup_hits += 1
+            else:
+                report.translated_count += 1
+                report.mask_tokens_saved += outcome.tokens_saved
+                report.mask_fallbacks += int(outcome.mask_fallback)
+                report.aborted_generations += int(outcome.aborted)
+                report.truncated_generations += int(outcome.truncated)
             expected_ctx = seg.context or ""
             prompt_contains = (
                 True if not expected_ctx.strip()
@@ -149,13 +553,18 @@ def run_pipeline(
                     extracted=target,
                     prompt_contains_context=prompt_contains,
                     used_contextual_template=used_contextual,
+                    kind=triage.kind,
+                    lang=triage.lang.lang,
+                    deduplicated=reused is not None,
+                    masked_spans=outcome.masked_spans,
+                    mask_fallback=outcome.mask_fallback,
+                    aborted=outcome.aborted,
+                    truncated=outcome.truncated,
+                    stats=outcome.stats if reused is None else None,
+                    timings=seg_timings,
                 )
             )
 
-    if return_report:
-        return pairs, report
-    return pairs
-
 
 def iter_pipeline(
     text: str,
@@ -165,24 +574,49 @@ def iter_pipeline(
     if opt is None:
         opt = PipelineOptions()
 
+    deadline = Deadline(opt.deadline_sec)
     segments = make_segments(text, opt)
-
-    for seg in segments:
+    done: Dict[SegmentKey, SegmentOutcome] = {}
+    pool, futures = _prefetch(segments, opt, generate)
+    try:
+        yield from _iter_segments(segments, opt, generate, done, futures, deadline)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_segments(
+    segments: List[Segment],
+    opt: PipelineOptions,
+    generate: GenerateFn,
+    done: Dict[SegmentKey, SegmentOutcome],
+    futures: Dict[int, "Future[SegmentOutcome]"],
+    deadline: Deadline,
+):
+    for i, seg in enumerate(segments):
         if opt.skip_empty_segments and not seg.text.strip():
             continue
 
-        p_opt = PromptOptions(
-            source_lang=opt.prompt_opt.source_lang,
-            target_lang=opt.prompt_opt.target_lang,
-            preset=opt.prompt_opt.preset,
-            terminology=opt.prompt_opt.terminology,
-            context=seg.context,
-            src_text_with_format=opt.prompt_opt.src_text_with_format,
-        )
+        triage = triage_segment(seg, opt)
+        if triage.passthrough:
+            _PASSTHROUGH.inc()
+            yield AlignedPair(source=seg.text, target=seg.text, lang=triage.lang.lang)
+            continue
 
-        prompt = build_prompt(seg.text, p_opt)
-        raw = generate(prompt)
-        target = extract_translation(raw, opt.post_opt)
+        key = segment_key(seg)
+        reused = done.get(key) if opt.dedup_segments else None
+        if reused is not None:
+            _DEDUPLICATED.inc()
+            outcome = reused
+        else:
+            outcome = _budgeted_outcome(i, seg, opt, generate, futures, deadline)
+        if outcome is None:
+            _UNTRANSLATED.inc()
+            yield AlignedPair(source=seg.text, target=seg.text, lang=triage.lang.lang, untranslated=True)
+            continue
+        if reused is None and opt.dedup_segments:
+            done[key] = outcome
+        prompt, raw, target = outcome.prompt, outcome.raw, outcome.target
 
         yield AlignedPair(
             source=seg.text,
@@ -190,6 +624,8 @@ def iter_pipeline(
             context=seg.context if opt.keep_debug else "",
             prompt=prompt if opt.keep_debug else "",
             raw=raw if opt.keep_debug else "",
+            lang=triage.lang.lang,
+            stats=outcome.stats if reused is None else None,
         )
 
 
@@ -16,6 +16,39 @@ _MARKERS = [
 ]
 
 
+_MARKER_RE = re.compile("|".join(re.escape(mk) for mk in _MARKERS))
+
+_LEADING_LABEL_RE = re.compile(r"^\s*(assistant|模型|翻译|译文)\s*[:：]\s*", flags=re.IGNORECASE)
+_QUOTE_CHARS = "\"“”‘’'"
+_EDGE_QUOTES_RE = re.compile(r'^\s*[\"“”‘’\']\s*|\s*[\"“”‘’\']\s*$')
+_TRAILING_BLANKS_RE = re.compile(r"[ \t]+\n")
+_EXTRA_NEWLINES_RE = re.compile(r"\n{3,}")
+
+
+def _marker_cut(text: str, prefer_last: bool) -> int:
+    """
+    Return the index right after the chosen marker, or -1 if there is none.
+    """
+    if prefer_last:
+        # 标记之间不会互相嵌套起始位置，所以非重叠扫描的最后一个匹配就是最靠后的 marker；
+        # 同一位置有多个候选时，交替式按 _MARKERS 顺序取第一个，与逐个 rfind 的结果一致
+        last = None
+        for last in _MARKER_RE.finditer(text):
+            pass
+        return last.end() if last is not None else -1
+
+    # 非默认模式：每个 marker 取第一次出现，再取其中最靠后的
+    positions = []
+    for mk in _MARKERS:
+        idx = text.find(mk)
+        if idx != -1:
+            positions.append((idx, mk))
+    if not positions:
+        return -1
+    idx, mk = max(positions, key=lambda x: x[0])
+    return idx + len(mk)
+
+
 def extract_translation(raw: str, opt: PostProcessOptions = PostProcessOptions()) -> str:
     if raw is None:
         return ""
@@ -24,32 +57,168 @@ def extract_translation(raw: str, opt: PostProcessOptions = PostProcessOptions()
         return ""
 
     # 1) 尝试按 marker 抽取（取最后一个 marker 后面的内容更安全）
-    lowered = text  # 保持原样，不强制 lower（避免影响内容）
-    positions = []
-    for mk in _MARKERS:
-        idx = lowered.rfind(mk) if opt.prefer_last_marker else lowered.find(mk)
-        if idx != -1:
-            positions.append((idx, mk))
-
-    if positions:
-        idx, mk = max(positions, key=lambda x: x[0])  # 取最靠后的 marker
-        text = text[idx + len(mk):].strip()
+    cut = _marker_cut(text, opt.prefer_last_marker)
+    if cut != -1:
+        text = text[cut:].strip()
 
     # 2) 如果模型把“原文：...”也吐出来了，尝试截断掉原文块（保守策略）
     # 仅当出现明显标签时截断，避免误删正文
     if opt.remove_leading_labels:
         # 去掉开头一些常见标签
-        text = re.sub(r"^\s*(assistant|模型|翻译|译文)\s*[:：]\s*", "", text, flags=re.IGNORECASE).strip()
+        text = _LEADING_LABEL_RE.sub("", text, count=1).strip()
 
-    # 3) 去掉成对引号包裹
-    if opt.strip_quotes:
-        text = text.strip()
-        text = re.sub(r'^\s*[\"“”‘’\']\s*', "", text)
-        text = re.sub(r'\s*[\"“”‘’\']\s*$', "", text)
-        text = text.strip()
+    # 3) 去掉成对引号包裹（text 已经 strip 过，只有首尾是引号时才需要替换）
+    if opt.strip_quotes and text and (text[0] in _QUOTE_CHARS or text[-1] in _QUOTE_CHARS):
+        text = _EDGE_QUOTES_RE.sub("", text).strip()
 
     # 4) 最后清理多余空白
-    text = re.sub(r"[ \t]+\n", "\n", text)
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+    if "\n" in text:
+        text = _TRAILING_BLANKS_RE.sub("\n", text)
+        text = _EXTRA_NEWLINES_RE.sub("\n\n", text).strip()
+
+    return text
+
+
+_MAX_MARKER_LEN = max(len(mk) for mk in _MARKERS)
+_MARKER_PREFIXES = frozenset(mk[:i] for mk in _MARKERS for i in range(1, len(mk)))
+_LABEL_WORDS = ("assistant", "模型", "翻译", "译文")
+_LEADING_QUOTE_RE = re.compile(r'^\s*[\"“”‘’\']\s*')
+_TRAILING_QUOTE_RE = re.compile(r'\s*[\"“”‘’\']\s*$')
+# partial 只重新清理末尾这么多字符；更早的部分清理结果不会再变，定下来后不再处理
+_TAIL_WINDOW = 256
+# 开头的标签 / 引号要等正文有这么长才算定下来
+_HEAD_CHARS = 64
+
+
+def _normalize_newlines(text: str) -> str:
+    if "\n" in text:
+        text = _TRAILING_BLANKS_RE.sub("\n", text)
+        text = _EXTRA_NEWLINES_RE.sub("\n\n", text)
+    return text
+
+
+class StreamingExtractor:
+    """
+    Incremental counterpart of extract_translation for streamed model output.
+
+    feed() only scans the new chunk (plus a marker-sized overlap) for markers.
+    The text after the chosen marker is split into a cleaned head, which no
+    later chunk can change, and a raw tail of at most ~_TAIL_WINDOW chars that
+    `partial` re-cleans, so each update costs O(chunk + window) rather than
+    O(text). Cuts between head and tail fall between two non-space chars, where
+    none of the clean-up rules can reach across. finish() returns exactly
+    extract_translation(raw).
+    """
+
+    def __init__(self, opt: PostProcessOptions = PostProcessOptions()):
+        self.opt = opt
+        self._raw_parts: list[str] = []
+        self._window = ""      # 末尾 _MAX_MARKER_LEN-1 个字符，用于跨 chunk 的 marker
+        self._seen: set[str] = set()  # prefer_last_marker=False 时已出现过的 marker
+        self._reset("")
+
+    def _reset(self, body: str) -> None:
+        # 选中的 marker 变了：之前的内容都是回显/说明，丢弃
+        self._head = ""         # 已定下来的清理结果
+        self._head_fixed = False
+        self._tail = body       # 还没定下来的原文
+        self._partial: str | None = None
+
+    def feed(self, chunk: str) -> str:
+        if not chunk:
+            return self.partial
+        self._raw_parts.append(chunk)
+
+        scan = self._window + chunk
+        cut = -1
+        for m in _MARKER_RE.finditer(scan):
+            if m.end() <= len(self._window):
+                continue
+            if self.opt.prefer_last_marker:
+                cut = m.end()
+                continue
+            # 非默认模式与 _marker_cut 一致：每种 marker 只认第一次出现（“译文：” 同时算作 “译文”）
+            kinds = {mk for mk in _MARKERS if m.group().startswith(mk)}
+            if not kinds <= self._seen:
+                self._seen |= kinds
+                cut = m.end()
+        if cut != -1:
+            self._reset(scan[cut:])
+        else:
+            self._tail += chunk
+            if len(self._tail) > _TAIL_WINDOW:
+                self._commit()
+
+        self._window = scan[-(_MAX_MARKER_LEN - 1):]
+        self._partial = None
+        return self.partial
+
+    def _commit(self) -> None:
+        # 在两个非空白字符之间切：换行/空白的合并和首尾的 strip 都跨不过这里；
+        # 末尾留出半个 marker 的长度
+        tail = self._tail
+        low = _HEAD_CHARS if not self._head_fixed else 1
+        i = len(tail) - _MAX_MARKER_LEN
+        while i >= low and (tail[i - 1].isspace() or tail[i].isspace()):
+            i -= 1
+        if i < low:
+            return
+        piece, self._tail = tail[:i], tail[i:]
+        if not self._head_fixed:
+            piece = self._clean_head(piece)
+            self._head_fixed = True
+        self._head += _normalize_newlines(piece)
+
+    def _clean_head(self, text: str) -> str:
+        text = text.lstrip()
+        if self.opt.remove_leading_labels:
+            text = _LEADING_LABEL_RE.sub("", text, count=1).lstrip()
+        if self.opt.strip_quotes and text and text[0] in _QUOTE_CHARS:
+            text = _LEADING_QUOTE_RE.sub("", text, count=1).lstrip()
+        return text
+
+    @property
+    def raw(self) -> str:
+        return "".join(self._raw_parts)
+
+    @property
+    def partial(self) -> str:
+        if self._partial is None:
+            self._partial = self._clean_partial(self._tail)
+        return self._partial
+
+    def finish(self) -> str:
+        return extract_translation(self.raw, self.opt)
+
+    def _clean_partial(self, body: str) -> str:
+        # 末尾可能是半个 marker（例如 “译” 后面还没来 “文：”），先不显示
+        for n in range(min(_MAX_MARKER_LEN - 1, len(body)), 0, -1):
+            if body[-n:] in _MARKER_PREFIXES:
+                body = body[:-n]
+                break
+
+        if self._head_fixed:
+            # 开头已经处理过；body 以非空白字符开头，只需要处理结尾
+            text = body.rstrip()
+            if self.opt.strip_quotes and text and text[-1] in _QUOTE_CHARS:
+                text = _TRAILING_QUOTE_RE.sub("", text).rstrip()
+            return self._head + _normalize_newlines(text).rstrip()
+
+        text = body.strip()
+        if not text:
+            return ""
+
+        if self.opt.remove_leading_labels:
+            lowered = text.lower()
+            # 标签还没写完整（例如 "assis"）时不显示
+            if any(word.startswith(lowered) for word in _LABEL_WORDS):
+                return ""
+            text = _LEADING_LABEL_RE.sub("", text, count=1).strip()
+
+        if self.opt.strip_quotes and text and (text[0] in _QUOTE_CHARS or text[-1] in _QUOTE_CHARS):
+            text = _EDGE_QUOTES_RE.sub("", text).strip()
 
-    return text
\ No newline at end of file
+        if "\n" in text:
+            text = _TRAILING_BLANKS_RE.sub("\n", text)
+            text = _EXTRA_NEWLINES_RE.sub("\n\n", text).strip()
+        return text
@@ -3,6 +3,7 @@ from enum import Enum
 from typing import Optional
 
 from .lang import normalize_lang, is_zh, display_lang
+from .mask import has_placeholders
 
 
 class PromptPreset(str, Enum):
@@ -48,11 +49,50 @@ def _auto_preset(opt: PromptOptions, source_text: str) -> PromptPreset:
     return PromptPreset.XX_XX
 
 
+def resolve_preset(opt: PromptOptions, source_text: str) -> PromptPreset:
+    if opt.preset == PromptPreset.AUTO:
+        return _auto_preset(opt, source_text)
+    return opt.preset
+
+
+# 官方模板都没提占位符，模型常把 {1} 当成正文改写或丢掉，遮挡后只能回退重翻
+_PLACEHOLDER_NOTE_ZH = "文本中的 {1}、{2} 等占位符代表不需要翻译的内容，请原样保留在译文的对应位置。\n"
+_PLACEHOLDER_NOTE_EN = (
+    "Placeholders such as {1} and {2} stand for text that must not be translated; "
+    "keep them unchanged in the translation.\n"
+)
+_ZH_PRESETS = frozenset({
+    PromptPreset.ZH_XX, PromptPreset.TERMINOLOGY, PromptPreset.CONTEXTUAL, PromptPreset.FORMATTED_ZH,
+})
+
+
+def _resolve(source_text: str, opt: PromptOptions) -> tuple[PromptOptions, PromptPreset]:
+    preset = resolve_preset(opt, source_text)
+    if preset == PromptPreset.TERMINOLOGY and opt.terminology is None:
+        # 兜底
+        opt = PromptOptions(source_lang=opt.source_lang, target_lang=opt.target_lang, preset=PromptPreset.AUTO)
+        preset = resolve_preset(opt, source_text)
+    return opt, preset
+
+
+def placeholder_note(source_text: str, opt: PromptOptions) -> str:
+    """The instruction build_prompt prepends when the text carries {n} placeholders."""
+    _, preset = _resolve(source_text, opt)
+    return _PLACEHOLDER_NOTE_ZH if preset in _ZH_PRESETS else _PLACEHOLDER_NOTE_EN
+
+
 def build_prompt(source_text: str, opt: PromptOptions) -> str:
-    preset = opt.preset
-    if preset == PromptPreset.AUTO:
-        preset = _auto_preset(opt, source_text)
+    opt, preset = _resolve(source_text, opt)
+    prompt = _template(source_text, opt, preset)
+    shown = source_text
+    if preset == PromptPreset.FORMATTED_ZH and opt.src_text_with_format:
+        shown = opt.src_text_with_format
+    if has_placeholders(shown):
+        prompt = (_PLACEHOLDER_NOTE_ZH if preset in _ZH_PRESETS else _PLACEHOLDER_NOTE_EN) + prompt
+    return prompt
+
 
+def _template(source_text: str, opt: PromptOptions, preset: PromptPreset) -> str:
     tgt_disp = display_lang(opt.target_lang)
 
     # 官方模板：ZH<=>XX
@@ -71,13 +111,6 @@ def build_prompt(source_text: str, opt: PromptOptions) -> str:
 
     # 官方模板：术语干预
     if preset == PromptPreset.TERMINOLOGY:
-        if opt.terminology is None:
-            # 兜底
-            return build_prompt(source_text, PromptOptions(
-                source_lang=opt.source_lang,
-                target_lang=opt.target_lang,
-                preset=PromptPreset.AUTO,
-            ))
         return (
             "参考下面的翻译：\n"
             f"{opt.terminology.source_term} 翻译成 {opt.terminology.target_term}\n\n"
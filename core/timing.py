@@ -0,0 +1,111 @@
+# hy_translator/core/timing.py
+
+from __future__ import annotations
+import math
+import time
+from typing import Dict, List, Optional
+
+
+# split -> prompt -> ttft / generate -> extract -> render -> emit
+STAGES = ("split", "prompt", "ttft", "generate", "extract", "render", "emit")
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class StageTimer:
+    """
+    Per-document stage timings.
+
+        t0 = timer.clock()
+        ...
+        timer.add("prompt", t0)
+
+    Inside begin_segment()/end_segment() the time of each stage is summed per
+    segment (extract runs once per chunk); outside, every add() is one sample.
+    With enabled=False every call is a no-op and clock() does not read the clock.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._samples: Dict[str, List[float]] = {}
+        self._segment: Optional[Dict[str, float]] = None
+
+    def clock(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def add(self, stage: str, started: float) -> None:
+        if not self.enabled:
+            return
+        elapsed = time.perf_counter() - started
+        if self._segment is not None:
+            self._segment[stage] = self._segment.get(stage, 0.0) + elapsed
+        else:
+            self._samples.setdefault(stage, []).append(elapsed)
+
+    def sample(self, stage: str, started: float) -> None:
+        """Always one sample, even inside a segment (render / emit run per event)."""
+        if self.enabled:
+            self._samples.setdefault(stage, []).append(time.perf_counter() - started)
+
+    def begin_segment(self) -> None:
+        if self.enabled:
+            self.end_segment()
+            self._segment = {}
+
+    def end_segment(self) -> Dict[str, float]:
+        """Close the current segment; returns its stage times in ms."""
+        segment, self._segment = self._segment, None
+        if not segment:
+            return {}
+        for stage, elapsed in segment.items():
+            self._samples.setdefault(stage, []).append(elapsed)
+        return {stage: round(elapsed * 1000, 3) for stage, elapsed in segment.items()}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """stage -> count / total / mean / p50 / p90 / p99 / max (ms)."""
+        out: Dict[str, Dict[str, float]] = {}
+        order = list(STAGES) + sorted(set(self._samples) - set(STAGES))
+        for stage in order:
+            values = self._samples.get(stage)
+            if not values:
+                continue
+            ms = sorted(v * 1000 for v in values)
+            total = sum(ms)
+            out[stage] = {
+                "count": len(ms),
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / len(ms), 3),
+                "p50_ms": round(percentile(ms, 50), 3),
+                "p90_ms": round(percentile(ms, 90), 3),
+                "p99_ms": round(percentile(ms, 99), 3),
+                "max_ms": round(ms[-1], 3),
+            }
+        return out
+
+
+# 关闭计时时共用的实例，不会记录任何东西
+NULL_TIMER = StageTimer(enabled=False)
+
+
+class Deadline:
+    """
+    Time budget for one job, started at construction. A falsy budget never expires.
+    """
+
+    def __init__(self, budget_sec: Optional[float] = None):
+        self.budget_sec = budget_sec or None
+        self._end = time.perf_counter() + budget_sec if budget_sec else None
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (may be negative); None without a budget."""
+        return None if self._end is None else self._end - time.perf_counter()
+
+    @property
+    def expired(self) -> bool:
+        return self._end is not None and time.perf_counter() >= self._end
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import os
 import sys
+import threading
+import time
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
@@ -11,34 +14,119 @@ ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+from backend import HealthProbe, get_health_probe
+from core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, REQUEST_BUCKETS
+
 try:
     from .config import ConfigStore
     from .models import AppConfig, TranslationRequest
+    from .services.model_residency import ModelResidency
+    from .services.scheduler import ModelScheduler
     from .services.translation_service import TranslationService
 except ImportError:
     from python_backend.config import ConfigStore
     from python_backend.models import AppConfig, TranslationRequest
+    from python_backend.services.model_residency import ModelResidency
+    from python_backend.services.scheduler import ModelScheduler
     from python_backend.services.translation_service import TranslationService
 
 
+class OllamaProbe:
+    """
+    The health probe for the configured (host, model). A background thread keeps
+    it fresh so /health only reads the cache; when the config moves to another
+    host or model the old refresher is stopped instead of polling forever.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._probe: HealthProbe | None = None
+
+    def apply(self, config: AppConfig) -> HealthProbe:
+        probe = get_health_probe(config.host, config.model)
+        with self._lock:
+            previous, self._probe = self._probe, probe
+        if previous is not None and previous is not probe:
+            # 只发停止信号，不在请求线程里等旧线程跑完手上的探测（最多好几秒）
+            previous.stop_refresher(wait=False)
+        probe.start_refresher()
+        return probe
+
+    def stop(self) -> None:
+        with self._lock:
+            previous, self._probe = self._probe, None
+        if previous is not None:
+            previous.stop_refresher()
+
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "translator_http_requests_total",
+    "HTTP requests handled by the API server.",
+    ("method", "path", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.gauge(
+    "translator_http_requests_in_progress",
+    "HTTP requests currently being handled.",
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "translator_http_request_seconds",
+    "HTTP request latency.",
+    REQUEST_BUCKETS,
+    ("path",),
+)
+# 未知路径统一记成 other，避免标签基数失控
+KNOWN_PATHS = frozenset({"/health", "/config", "/translate", "/ocr", "/metrics"})
+
+
+def instrumented(handler):
+    @functools.wraps(handler)
+    def wrapper(self: "TranslatorAPIHandler") -> None:
+        self._started = time.perf_counter()
+        self._status = 0
+        self._recorded = False
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            handler(self)
+        finally:
+            self._record_request()  # 没走到 end_headers（处理时抛异常）时在这里补记
+
+    return wrapper
+
+
 class TranslatorAPIHandler(BaseHTTPRequestHandler):
     config_store = ConfigStore()
-    translation_service = TranslationService()
+    # 所有请求线程共用：不同模型的任务按模型分批，避免 Ollama 来回换模型
+    translation_service = TranslationService(scheduler=ModelScheduler())
+    model_residency = ModelResidency()
+    ollama_probe = OllamaProbe()
 
+    @instrumented
     def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/metrics":
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
         if self.path == "/health":
-            self._write_json(HTTPStatus.OK, {"status": "ok"})
+            ollama = self.ollama_probe.apply(self.config_store.load()).get()
+            self._write_json(HTTPStatus.OK, {"status": "ok", "ollama": ollama.to_dict()})
             return
         if self.path == "/config":
             self._write_json(HTTPStatus.OK, self.config_store.load().to_dict())
             return
         self._write_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
 
+    @instrumented
     def do_POST(self) -> None:  # noqa: N802
         if self.path == "/translate":
             try:
                 payload = self._read_json()
                 request = TranslationRequest(**payload)
+                # 输出目录只认本机配置：HTTP 调用方不能让服务往任意路径写文件
+                request.profile_dir = self.config_store.load().profile_dir
                 response = self.translation_service.translate(request)
             except ValueError as exc:
                 self._write_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
@@ -53,6 +141,7 @@ class TranslatorAPIHandler(BaseHTTPRequestHandler):
             return
         self._write_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
 
+    @instrumented
     def do_PUT(self) -> None:  # noqa: N802
         if self.path == "/config":
             try:
@@ -63,6 +152,8 @@ class TranslatorAPIHandler(BaseHTTPRequestHandler):
                 self._write_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
                 return
             self.config_store.save(config)
+            self.ollama_probe.apply(config)
+            self.model_residency.apply(config)
             self._write_json(HTTPStatus.OK, config.to_dict())
             return
         self._write_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
@@ -86,6 +177,25 @@ class TranslatorAPIHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(body)
 
+    def send_response(self, code, message=None) -> None:
+        self._status = int(code)
+        super().send_response(code, message)
+
+    def end_headers(self) -> None:
+        # 响应发出去之前就记账：客户端收到响应后立刻抓 /metrics，也能看到这次请求已结束
+        self._record_request()
+        super().end_headers()
+
+    def _record_request(self) -> None:
+        if getattr(self, "_recorded", True):
+            return
+        self._recorded = True
+        HTTP_REQUESTS_IN_PROGRESS.dec()
+        path = self.path.split("?", 1)[0]
+        path = path if path in KNOWN_PATHS else "other"
+        HTTP_REQUEST_SECONDS.labels(path).observe(time.perf_counter() - self._started)
+        HTTP_REQUESTS.labels(self.command, path, str(self._status)).inc()
+
     def log_message(self, format: str, *args) -> None:  # noqa: A003
         return
 
@@ -101,12 +211,17 @@ def main() -> None:
     args = parser.parse_args()
 
     server = build_server(host=args.host, port=args.port)
+    config = TranslatorAPIHandler.config_store.load()
+    TranslatorAPIHandler.ollama_probe.apply(config)
+    TranslatorAPIHandler.model_residency.apply(config)
     print(f"Translator API listening on http://{args.host}:{args.port}")
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
+        TranslatorAPIHandler.model_residency.stop()
+        TranslatorAPIHandler.ollama_probe.stop()
         server.server_close()
 
 
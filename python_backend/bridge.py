@@ -4,14 +4,19 @@ import argparse
 import json
 import os
 import shutil
+import struct
 import sys
+from dataclasses import replace
+from typing import BinaryIO, Callable, Iterator
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
 
+from backend import OllamaBackend
 from python_backend.config import ConfigStore
 from python_backend.models import AppConfig, TranslationRequest
+from python_backend.services.model_residency import ModelResidency, backend_options_from_config
 from python_backend.services.translation_service import TranslationService
 
 
@@ -37,8 +42,49 @@ def write_json_line(payload: dict) -> None:
     sys.stdout.flush()
 
 
+# Streaming protocols understood by `translate-stream --protocol ...`.
+#   jsonl:  one ASCII-escaped JSON object per line (default, legacy hosts)
+#   frames: 4-byte big-endian length + UTF-8 JSON, written to the binary stdout.
+#           Bypasses the text layer (and its code page) without \uXXXX blow-up.
+PROTOCOL_JSONL = "jsonl"
+PROTOCOL_FRAMES = "frames"
+STREAM_PROTOCOLS = (PROTOCOL_JSONL, PROTOCOL_FRAMES)
+
+_FRAME_HEADER = struct.Struct(">I")
+
+
+def encode_frame(payload: dict) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8", errors="replace")
+    return _FRAME_HEADER.pack(len(body)) + body
+
+
+def write_frame(payload: dict) -> None:
+    out = sys.stdout.buffer
+    out.write(encode_frame(payload))
+    out.flush()
+
+
+def iter_frames(stream: BinaryIO) -> Iterator[dict]:
+    """Decode events written with write_frame (used by hosts, tests and load tools)."""
+    while True:
+        header = stream.read(_FRAME_HEADER.size)
+        if len(header) < _FRAME_HEADER.size:
+            return
+        (length,) = _FRAME_HEADER.unpack(header)
+        body = stream.read(length)
+        if len(body) < length:
+            raise ValueError("Truncated bridge frame")
+        yield json.loads(body)
+
+
+def stream_writer(protocol: str) -> Callable[[dict], None]:
+    if protocol == PROTOCOL_FRAMES:
+        return write_frame
+    return write_json_line
+
+
 def cmd_health() -> int:
-    write_json({"status": "ok", "python": sys.executable})
+    write_json({"status": "ok", "python": sys.executable, "protocols": list(STREAM_PROTOCOLS)})
     return 0
 
 
@@ -55,19 +101,54 @@ def cmd_save_config() -> int:
     return 0
 
 
-def cmd_translate() -> int:
-    payload = read_stdin_json()
-    request = TranslationRequest(**payload)
+def load_translation_request(profile: bool = False, job_id: str = "") -> TranslationRequest:
+    request = TranslationRequest(**read_stdin_json())
+    if profile:
+        request.profile = True
+    if job_id:
+        request.job_id = job_id
+    if request.profile and not request.profile_dir:
+        request.profile_dir = ConfigStore().load().profile_dir
+    return request
+
+
+def cmd_translate(profile: bool = False, job_id: str = "") -> int:
+    request = load_translation_request(profile, job_id)
     response = TranslationService().translate(request)
     write_json(response.to_dict())
     return 0
 
 
-def cmd_translate_stream() -> int:
-    payload = read_stdin_json()
-    request = TranslationRequest(**payload)
+def cmd_translate_stream(
+    write_event: Callable[[dict], None] = write_json_line,
+    profile: bool = False,
+    job_id: str = "",
+) -> int:
+    request = load_translation_request(profile, job_id)
     for event in TranslationService().stream_translate(request):
-        write_json_line(event)
+        write_event(event)
+    return 0
+
+
+def cmd_warm_up() -> int:
+    options = backend_options_from_config(ConfigStore().load())
+    load_sec = OllamaBackend(options).warm_up()
+    write_json({"status": "ok", "model": options.model, "load_duration_ms": round(load_sec * 1000)})
+    return 0
+
+
+def cmd_model_heartbeat() -> int:
+    """
+    Keep the configured model resident while the desktop app runs: preloads it,
+    then re-sends keep_alive periodically until the host closes our stdin.
+    """
+    residency = ModelResidency()
+    residency.apply(replace(ConfigStore().load(), model_heartbeat=True))
+    try:
+        # 宿主退出或换配置时关掉 stdin（或直接结束进程），这里读到 EOF 就停
+        sys.stdin.read()
+    finally:
+        residency.stop()
     return 0
 
 
@@ -137,11 +218,26 @@ def main() -> int:
             "save-config",
             "translate",
             "translate-stream",
+            "warm-up",
+            "model-heartbeat",
             "ocr-clipboard",
             "hotkey-listener",
         ],
     )
+    parser.add_argument(
+        "--protocol",
+        choices=STREAM_PROTOCOLS,
+        default=PROTOCOL_JSONL,
+        help="Event framing for translate-stream",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run the translation under cProfile and report the pstats path (profile_path)",
+    )
+    parser.add_argument("--job-id", default="", help="Names the profile dump (default: timestamp)")
     args = parser.parse_args()
+    write_event = stream_writer(args.protocol)
 
     try:
         if args.command == "health":
@@ -151,9 +247,13 @@ def main() -> int:
         if args.command == "save-config":
             return cmd_save_config()
         if args.command == "translate":
-            return cmd_translate()
+            return cmd_translate(profile=args.profile, job_id=args.job_id)
         if args.command == "translate-stream":
-            return cmd_translate_stream()
+            return cmd_translate_stream(write_event, profile=args.profile, job_id=args.job_id)
+        if args.command == "warm-up":
+            return cmd_warm_up()
+        if args.command == "model-heartbeat":
+            return cmd_model_heartbeat()
         if args.command == "ocr-clipboard":
             return cmd_ocr_clipboard()
         if args.command == "hotkey-listener":
@@ -165,7 +265,15 @@ def main() -> int:
             "python": sys.executable,
             "python3_in_path": shutil.which("python3"),
         }
-        if args.command in {"translate-stream", "hotkey-listener"}:
+        if args.command == "translate-stream":
+            write_event(
+                {
+                    "event": "error",
+                    "message": str(exc),
+                    **error_payload,
+                }
+            )
+        elif args.command == "hotkey-listener":
             write_json_line(
                 {
                     "event": "error",
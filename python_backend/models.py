@@ -16,11 +16,18 @@ class AppConfig:
     mode: str = "local"
     host: str = "http://127.0.0.1:11434"
     model: str = "demonbyron/HY-MT1.5-1.8B"
+    # 按段路由：短段落 / 热键请求用 fast_model，长段落 / markdown 用 quality_model；留空表示不路由
+    fast_model: str = ""
+    quality_model: str = ""
     font_size: int = 14
     hotkey_enabled: bool = True
     minimize_to_tray: bool = True
     theme: str = "system"
     ui_lang: str = "en"
+    keep_alive: str = "30m"
+    model_heartbeat: bool = False
+    # profile=True 的任务把 pstats 写到这里（空字符串表示配置目录下的 profiles/）
+    profile_dir: str = ""
 
     def to_dict(self) -> dict[str, Any]:
         return asdict(self)
@@ -38,12 +45,35 @@ class TranslationRequest:
     model: str = "demonbyron/HY-MT1.5-1.8B"
     mode: str = "local"
     host: str = "http://127.0.0.1:11434"
+    # 可选的多个 Ollama 地址；服务带调度器时按模型亲和性从中挑一个，否则用 host
+    hosts: list[str] = field(default_factory=list)
+    # 把 hosts 里其余已加载该模型的地址作为对冲备份（见 OllamaBackendOptions.hedge_hosts）。
+    # 默认关闭：对冲请求绕过调度器，会在别的 host 上多占一份生成
+    hedge: bool = False
+    keep_alive: str = "30m"
+    fast_model: str = ""
+    quality_model: str = ""
+    # 热键触发的交互式请求：要的是低延迟，路由到 fast_model
+    interactive: bool = False
+    # 整个任务的时间预算（秒）；用完后剩下要调用模型的段落原样输出，completed 标记为 partial。None 表示不限
+    deadline_sec: float | None = None
+    # 在 completed 事件里附带各阶段耗时；关掉后计时调用都是空操作
+    collect_timings: bool = True
+    # 用 cProfile 跑这个任务，completed 事件里返回 profile_path
+    profile: bool = False
+    # 只有进程内调用方（bridge、测试）能指定；HTTP 接口一律改成 AppConfig.profile_dir
+    profile_dir: str = ""
+    job_id: str = ""
 
 
 @dataclass
 class SegmentResult:
     source: str
     target: str
+    lang: str | None = None
+    model: str | None = None
+    # Ollama 的生成统计（prompt_eval_count、eval_duration、tokens_per_sec ...）
+    stats: dict[str, Any] | None = None
 
 
 @dataclass
@@ -51,7 +81,15 @@ class TranslationResponse:
     output_text: str
     segments: list[SegmentResult] = field(default_factory=list)
     detected_source_lang: str | None = None
+    profile_path: str | None = None
+    # 时间预算用完时为 True；untranslated_segments 是原样输出的段落在 segments 里的下标
+    partial: bool = False
+    untranslated_segments: list[int] = field(default_factory=list)
+    # 生成被 num_predict 上限截断（done_reason == "length"）的段落下标，译文可能不完整
+    truncated_segments: list[int] = field(default_factory=list)
 
     def to_dict(self) -> dict[str, Any]:
         data = asdict(self)
+        if data["profile_path"] is None:
+            data.pop("profile_path")
         return data
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import threading
+
+from backend import KeepAliveHeartbeat, OllamaBackend, OllamaBackendOptions, OllamaMode
+
+from ..models import AppConfig
+
+
+def backend_options_from_config(config: AppConfig) -> OllamaBackendOptions:
+    defaults = OllamaBackendOptions()
+    return OllamaBackendOptions(
+        mode=OllamaMode(config.mode),
+        model=config.model.strip() or defaults.model,
+        host=config.host.strip() or defaults.host,
+        keep_alive=config.keep_alive.strip() or None,
+    )
+
+
+class ModelResidency:
+    """
+    Keeps the configured model loaded for long-lived processes (api_server):
+    warms it up when the model/host changes and optionally runs a keep_alive heartbeat.
+    """
+
+    def __init__(self, heartbeat_interval_sec: float = 240.0):
+        self.heartbeat_interval_sec = heartbeat_interval_sec
+        self._lock = threading.Lock()
+        self._key: tuple | None = None
+        self._heartbeat: KeepAliveHeartbeat | None = None
+        self.last_error: str | None = None
+
+    def apply(self, config: AppConfig) -> None:
+        opt = backend_options_from_config(config)
+        key = (opt.mode, opt.host, opt.model, opt.keep_alive)
+        with self._lock:
+            changed = key != self._key
+            self._key = key
+            if changed and self._heartbeat is not None:
+                self._heartbeat.stop()
+                self._heartbeat = None
+            if config.model_heartbeat and self._heartbeat is None:
+                # heartbeat 第一次循环就会预加载
+                self._heartbeat = KeepAliveHeartbeat(OllamaBackend(opt), self.heartbeat_interval_sec)
+                self._heartbeat.start()
+                return
+            if not config.model_heartbeat and self._heartbeat is not None:
+                self._heartbeat.stop()
+                self._heartbeat = None
+        if changed:
+            threading.Thread(target=self._warm_up, args=(opt,), name="ollama-warmup", daemon=True).start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._heartbeat is not None:
+                self._heartbeat.stop()
+                self._heartbeat = None
+
+    def _warm_up(self, opt: OllamaBackendOptions) -> None:
+        try:
+            OllamaBackend(opt).warm_up()
+            self.last_error = None
+        except Exception as exc:
+            self.last_error = str(exc)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import cProfile
+import itertools
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from ..config import get_config_path
+
+_job_counter = itertools.count(1)
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9_.\-]+")
+# Python 3.12 起 cProfile 走全局的 sys.monitoring，同时启用第二个 profiler 会抛 ValueError
+_profile_lock = threading.Lock()
+
+
+def default_profile_dir() -> Path:
+    return get_config_path().parent / "profiles"
+
+
+def new_job_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_job_counter)}"
+
+
+def profile_path(job_id: str, directory: str | os.PathLike | None = None) -> Path:
+    base = Path(directory) if directory else default_profile_dir()
+    name = _UNSAFE_CHARS_RE.sub("_", job_id).strip("._") or new_job_id()
+    return base / f"{name}.pstats"
+
+
+def profile_events(
+    events: Iterator[dict[str, Any]],
+    job_id: str,
+    directory: str | os.PathLike | None = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Run a translation event stream under cProfile and attach the dump path to
+    the completed event (`profile_path`).
+
+    The profiler is only enabled while the job itself runs; time the consumer
+    spends handling each event is not included. Open the dump with
+    `python -m pstats <file>` or snakeviz.
+
+    Profiled jobs in one process run one at a time (only one profiler can be
+    active); a second one waits for the first to finish before it starts.
+    """
+    path = profile_path(job_id, directory)
+    profiler = cProfile.Profile()
+    with _profile_lock:
+        while True:
+            profiler.enable()
+            try:
+                event = next(events)
+            except StopIteration:
+                return
+            finally:
+                profiler.disable()
+            if event.get("event") == "completed":
+                path.parent.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(str(path))
+                event["profile_path"] = str(path)
+            yield event
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+from core.metrics import REGISTRY
+
+ROUTED_SEGMENTS = REGISTRY.counter(
+    "translator_routed_segments_total",
+    "Segments routed to a model, by rule.",
+    ("tier", "reason"),  # tier: fast / quality / default
+)
+
+
+@dataclass
+class RoutingOptions:
+    # 不超过这个长度的段落走快模型
+    short_chars: int = 80
+    # 超过这个长度（或 markdown 模式）走大模型
+    long_chars: int = 400
+    # 进行中的任务数或最近的首 token 延迟超过阈值时，一律降级到快模型
+    max_jobs: int = 4
+    max_ttft_sec: float = 3.0
+    smoothing: float = 0.3  # 首 token 延迟的 EWMA 系数
+
+
+@dataclass
+class Route:
+    model: str
+    tier: str    # fast / quality / default
+    reason: str  # disabled / overloaded / interactive / markdown / long / short / medium
+
+
+class ModelRouter:
+    """
+    Picks the model for each segment: short segments and interactive (hotkey)
+    requests go to the fast model, long or markdown segments to the quality
+    model, anything in between to the request's own model. While the service is
+    overloaded (too many jobs in progress, or recent time to first token too
+    high) everything goes to the fast model.
+
+    Routing is off unless the request names a fast or a quality model.
+    """
+
+    def __init__(self, opt: RoutingOptions | None = None):
+        self.opt = opt or RoutingOptions()
+        self._lock = threading.Lock()
+        self._jobs = 0
+        self._ttft_avg: float | None = None
+
+    def job_started(self) -> None:
+        with self._lock:
+            self._jobs += 1
+
+    def job_finished(self) -> None:
+        with self._lock:
+            self._jobs -= 1
+
+    def observe_ttft(self, sec: float) -> None:
+        with self._lock:
+            a = self.opt.smoothing
+            self._ttft_avg = sec if self._ttft_avg is None else a * sec + (1 - a) * self._ttft_avg
+
+    @property
+    def overloaded(self) -> bool:
+        with self._lock:
+            if self._jobs > self.opt.max_jobs:
+                return True
+            return self._ttft_avg is not None and self._ttft_avg > self.opt.max_ttft_sec
+
+    def route(
+        self,
+        text: str,
+        *,
+        model: str,
+        fast_model: str = "",
+        quality_model: str = "",
+        markdown: bool = False,
+        interactive: bool = False,
+        record: bool = True,
+    ) -> Route:
+        """`record=False` only predicts the route (no metrics), e.g. for stats before the job runs."""
+        if not fast_model and not quality_model:
+            return Route(model, "default", "disabled")
+        if self.overloaded:
+            route = Route(fast_model or model, "fast", "overloaded")
+        elif interactive:
+            route = Route(fast_model or model, "fast", "interactive")
+        elif markdown:
+            route = Route(quality_model or model, "quality", "markdown")
+        elif len(text) > self.opt.long_chars:
+            route = Route(quality_model or model, "quality", "long")
+        elif len(text) <= self.opt.short_chars:
+            route = Route(fast_model or model, "fast", "short")
+        else:
+            route = Route(model, "default", "medium")
+        if record:
+            ROUTED_SEGMENTS.labels(route.tier, route.reason).inc()
+        return route
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from backend import OllamaBackend, OllamaBackendOptions, OllamaMode
+from core.metrics import REGISTRY, REQUEST_BUCKETS
+
+SCHEDULER_WAITING = REGISTRY.gauge(
+    "translator_scheduler_waiting",
+    "Jobs waiting for their model's turn on an Ollama host.",
+    ("host",),
+)
+SCHEDULER_SWITCHES = REGISTRY.counter(
+    "translator_scheduler_model_switches_total",
+    "Times a host's active model changed (each one may cost an unload/load).",
+    ("host",),
+)
+SCHEDULER_WAIT_SECONDS = REGISTRY.histogram(
+    "translator_scheduler_wait_seconds",
+    "Time a job waited before being admitted.",
+    REQUEST_BUCKETS,
+)
+
+
+@dataclass
+class SchedulerOptions:
+    # 别的模型在排队时，当前模型最多再连续放行多少个任务
+    max_batch: int = 8
+    # 别的模型的任务等了这么久之后，当前模型不再放行新任务，跑完就切换
+    max_wait_sec: float = 30.0
+    # /api/ps 结果缓存时间
+    ps_ttl_sec: float = 5.0
+
+
+@dataclass(eq=False)
+class Ticket:
+    model: str
+    host: str
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    granted_at: Optional[float] = None
+    released: bool = False
+    _event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def granted(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    @property
+    def waited_sec(self) -> float:
+        end = self.granted_at if self.granted_at is not None else time.perf_counter()
+        return end - self.enqueued_at
+
+
+@dataclass
+class _Lane:
+    host: str
+    active_model: Optional[str] = None
+    running: int = 0
+    streak: int = 0  # 有别的模型在等时，当前模型已连续放行的任务数
+    waiting: list[Ticket] = field(default_factory=list)
+
+    @property
+    def load(self) -> int:
+        return self.running + len(self.waiting)
+
+
+def _is_loaded(host: str, model: str) -> Optional[bool]:
+    options = OllamaBackendOptions(mode=OllamaMode.HTTP, host=host, model=model, concurrency=None)
+    return OllamaBackend(options).is_model_loaded()
+
+
+class ModelScheduler:
+    """
+    Admits translation jobs per Ollama host so that jobs for the same model run
+    together instead of interleaving and forcing the host to swap models.
+
+    A host keeps one active model. Jobs for it are admitted immediately (the
+    host's adaptive concurrency limit still caps generations); jobs for other
+    models wait until the active model drains. Unfairness is bounded: once
+    another model is waiting, the active model gets at most `max_batch` more
+    admissions, or until the other job has waited `max_wait_sec`.
+
+    With several hosts a job goes, in order of preference, to a host already
+    running its model, one that has it loaded (/api/ps), an idle one, or the
+    least loaded one.
+    """
+
+    def __init__(
+        self,
+        opt: Optional[SchedulerOptions] = None,
+        is_loaded: Callable[[str, str], Optional[bool]] = _is_loaded,
+    ):
+        self.opt = opt or SchedulerOptions()
+        self._is_loaded = is_loaded
+        self._lock = threading.Lock()
+        self._lanes: dict[str, _Lane] = {}
+        self._ps_cache: dict[tuple[str, str], tuple[float, Optional[bool]]] = {}
+
+    def _lane(self, host: str) -> _Lane:
+        lane = self._lanes.get(host)
+        if lane is None:
+            lane = self._lanes[host] = _Lane(host)
+        return lane
+
+    def model_loaded(self, host: str, model: str) -> Optional[bool]:
+        """Whether `host` has `model` in memory, per a cached /api/ps; None if unknown."""
+        key = (host, model)
+        now = time.monotonic()
+        cached = self._ps_cache.get(key)
+        if cached is not None and now - cached[0] < self.opt.ps_ttl_sec:
+            return cached[1]
+        try:
+            loaded = self._is_loaded(host, model)
+        except Exception:
+            loaded = None
+        self._ps_cache[key] = (now, loaded)
+        return loaded
+
+    def pick_host(self, model: str, hosts: list[str]) -> str:
+        hosts = list(dict.fromkeys(h.rstrip("/") for h in hosts if h))
+        if len(hosts) == 1:
+            return hosts[0]
+        # /api/ps 在锁外查询，避免网络请求挡住 release()
+        loaded = {h: self.model_loaded(h, model) for h in hosts}
+        with self._lock:
+            def rank(item: tuple[int, str]) -> tuple[int, int, int]:
+                index, host = item
+                lane = self._lane(host)
+                if lane.active_model == model and lane.load:
+                    tier = 0
+                elif loaded[host]:
+                    tier = 1
+                elif not lane.load:
+                    tier = 2
+                else:
+                    tier = 3
+                return tier, lane.load, index
+
+            return min(enumerate(hosts), key=rank)[1]
+
+    def submit(self, model: str, hosts: list[str]) -> Ticket:
+        """Queue a job; wait on the returned ticket, then release() it when the job ends."""
+        if not hosts:
+            raise ValueError("No Ollama host to schedule on.")
+        ticket = Ticket(model=model, host=self.pick_host(model, hosts))
+        with self._lock:
+            lane = self._lane(ticket.host)
+            lane.waiting.append(ticket)
+            self._dispatch(lane)
+        return ticket
+
+    def release(self, ticket: Ticket) -> None:
+        """End a job (or cancel it while still queued)."""
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            lane = self._lane(ticket.host)
+            if ticket.granted:
+                lane.running -= 1
+            elif ticket in lane.waiting:
+                lane.waiting.remove(ticket)
+            self._dispatch(lane)
+
+    def position(self, ticket: Ticket) -> int:
+        with self._lock:
+            lane = self._lane(ticket.host)
+            return lane.waiting.index(ticket) + 1 if ticket in lane.waiting else 0
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {
+                    "host": lane.host,
+                    "active_model": lane.active_model,
+                    "running": lane.running,
+                    "waiting": [t.model for t in lane.waiting],
+                }
+                for lane in self._lanes.values()
+            ]
+
+    def _switch(self, lane: _Lane, model: str) -> None:
+        if lane.active_model is not None and lane.active_model != model:
+            SCHEDULER_SWITCHES.labels(lane.host).inc()
+        lane.active_model = model
+        lane.streak = 0
+
+    def _dispatch(self, lane: _Lane) -> None:
+        # 调用方持有 self._lock
+        now = time.perf_counter()
+        while lane.waiting:
+            same = [t for t in lane.waiting if t.model == lane.active_model]
+            others = [t for t in lane.waiting if t.model != lane.active_model]
+            starved = bool(others) and (
+                lane.streak >= self.opt.max_batch or now - others[0].enqueued_at >= self.opt.max_wait_sec
+            )
+            if same and not starved:
+                ticket = same[0]
+            elif lane.running:
+                break  # 没有同模型的任务，或公平性上限到了：不再放行当前模型，等它排空
+            else:
+                # host 空闲了，切到等得最久的其他模型；切换后至少放行一个，不会来回切
+                ticket = others[0]
+                self._switch(lane, ticket.model)
+            lane.waiting.remove(ticket)
+            lane.running += 1
+            if any(t.model != lane.active_model for t in lane.waiting):
+                lane.streak += 1
+            ticket.granted_at = now
+            SCHEDULER_WAIT_SECONDS.observe(ticket.waited_sec)
+            ticket._event.set()
+        SCHEDULER_WAITING.labels(lane.host).set(len(lane.waiting))
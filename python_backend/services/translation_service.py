@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import contextlib
 import re
-from typing import Any, Iterator
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Callable, Generator, Iterator
 
-from backend import OllamaBackend, OllamaBackendOptions, OllamaMode
+from backend import GenerationTimeoutError, OllamaBackend, OllamaBackendOptions, OllamaMode, sum_stats
 from core import (
     AlignedPair,
     OutputMode,
@@ -14,15 +18,75 @@ from core import (
     SplitOptions,
     render_output,
 )
-from core.postprocess import extract_translation
+from core.lang import detect_lang_distribution, detect_source_lang
+from core.guard import LengthGuardOptions, RepetitionGuard, generation_limits
+from core.mask import unmask_partial, unmask_spans
+from core.pipeline import (
+    SegmentKey,
+    dedup_ratio,
+    dedup_stats,
+    mask_segment,
+    segment_key,
+    segment_prompt_options,
+    triage_segment,
+)
+from core.postprocess import StreamingExtractor, extract_translation
+from core.metrics import (
+    ABORTED_GENERATIONS,
+    MASK_FALLBACKS,
+    REGISTRY,
+    REQUEST_BUCKETS,
+    SEGMENT_SECONDS,
+    SEGMENTS,
+    TRUNCATED_GENERATIONS,
+)
+from core.timing import NULL_TIMER, Deadline, StageTimer
 from core.prompt import build_prompt
 from core.splitter import Segment
 from core.splitter import split_plain, split_with_limited_context
 
 from ..models import SegmentResult, TranslationRequest, TranslationResponse
+from .profiling import new_job_id, profile_events
+from .routing import ModelRouter, Route
+from .scheduler import ModelScheduler, Ticket
+
+
+# model_loading 进度事件的间隔
+MODEL_LOADING_PROGRESS_SEC = 0.5
+
+TRANSLATION_JOBS = REGISTRY.counter(
+    "translator_jobs_total",
+    "Translation jobs (documents), by outcome.",
+    ("outcome",),  # completed / error / cancelled
+)
+TRANSLATION_JOBS_IN_PROGRESS = REGISTRY.gauge(
+    "translator_jobs_in_progress",
+    "Translation jobs currently being processed.",
+)
+TRANSLATION_JOB_SECONDS = REGISTRY.histogram(
+    "translator_job_seconds",
+    "Wall time of a whole translation job.",
+    REQUEST_BUCKETS,
+)
 
 
 class TranslationService:
+    # 每段的 num_predict 上限和停止词；None 表示不限制
+    length_guard: LengthGuardOptions | None = LengthGuardOptions()
+
+    def __init__(
+        self,
+        backend_factory: Callable[[OllamaBackendOptions], Any] | None = None,
+        scheduler: ModelScheduler | None = None,
+        router: ModelRouter | None = None,
+    ):
+        # 按 OllamaBackendOptions 构造后端；None 表示 OllamaBackend（可换成 backend.replay 的录制/回放）
+        self.backend_factory = backend_factory
+        # 多个任务共用一个服务实例时（api_server），按模型排队、选 host；None 表示直接用 request.host
+        self.scheduler = scheduler
+        # 按段落长度 / 负载在快模型和大模型之间选择；请求没指定 fast_model / quality_model 时不生效
+        self.router = router or ModelRouter()
+
     def translate(self, request: TranslationRequest) -> TranslationResponse:
         response: TranslationResponse | None = None
         for event in self.stream_translate(request):
@@ -32,6 +96,10 @@ class TranslationService:
                     output_text=payload["output_text"],
                     segments=[SegmentResult(**segment) for segment in payload.get("segments", [])],
                     detected_source_lang=payload.get("detected_source_lang"),
+                    profile_path=event.get("profile_path"),
+                    partial=payload.get("partial", False),
+                    untranslated_segments=payload.get("untranslated_segments", []),
+                    truncated_segments=payload.get("truncated_segments", []),
                 )
 
         if response is None:
@@ -39,6 +107,40 @@ class TranslationService:
         return response
 
     def stream_translate(self, request: TranslationRequest) -> Iterator[dict[str, Any]]:
+        events = self._instrumented_stream(request)
+        if request.profile:
+            return profile_events(events, request.job_id or new_job_id(), request.profile_dir or None)
+        return events
+
+    def _instrumented_stream(self, request: TranslationRequest) -> Iterator[dict[str, Any]]:
+        timer = StageTimer() if request.collect_timings else NULL_TIMER
+        started = time.perf_counter()
+        outcome = "error"
+        TRANSLATION_JOBS_IN_PROGRESS.inc()
+        try:
+            # cleanup 里登记的回调（如释放调度名额）在任务结束、出错或被取消时都会执行
+            with contextlib.ExitStack() as cleanup:
+                for event in self._stream_translate(request, timer, cleanup):
+                    if event.get("event") == "completed":
+                        outcome = "completed"
+                        if timer.enabled:
+                            event["timings"] = timer.summary()
+                    t0 = timer.clock()
+                    yield event
+                    # 消费方处理事件（写 stdout / 入队）花的时间
+                    timer.sample("emit", t0)
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        finally:
+            TRANSLATION_JOBS_IN_PROGRESS.dec()
+            TRANSLATION_JOB_SECONDS.observe(time.perf_counter() - started)
+            TRANSLATION_JOBS.labels(outcome).inc()
+
+    def _stream_translate(
+        self, request: TranslationRequest, timer: StageTimer, cleanup: contextlib.ExitStack
+    ) -> Iterator[dict[str, Any]]:
+        deadline = Deadline(request.deadline_sec)
         text = self._normalize_text(request.text).strip()
         if not text:
             raise ValueError("Nothing to translate.")
@@ -62,28 +164,97 @@ class TranslationService:
             mode=OllamaMode(request.mode),
             model=request.model.strip() or OllamaBackendOptions().model,
             host=request.host.strip() or OllamaBackendOptions().host,
+            keep_alive=request.keep_alive.strip() or None,
         )
-        backend = OllamaBackend(backend_opt)
+        hosts = [host.strip() for host in request.hosts if host.strip()] or [backend_opt.host]
+        fast_model = request.fast_model.strip()
+        quality_model = request.quality_model.strip()
+        # 模型 -> 后端；按段路由时一个任务可能用到多个模型
+        backends: dict[str, Any] = {}
+        # 当前占着的调度名额（只对应一个模型）
+        ticket: Ticket | None = None
+        self.router.job_started()
+        cleanup.callback(self.router.job_finished)
         output_mode = OutputMode(request.output_mode)
 
+        t0 = timer.clock()
         if is_markdown_mode:
             segments = [Segment(text=text, context="")]
         elif split_mode == SplitMode.CONTEXT:
             segments = split_with_limited_context(text, split_opt=opt.split_opt, ctx_opt=opt.ctx_opt)
         else:
             segments = split_plain(text, opt=opt.split_opt)
+        timer.add("split", t0)
 
         detected_source_lang = (
             self._detect_source_lang(text) if request.source_lang == "auto" else request.source_lang
         )
         total_segments = len(segments)
         pairs: list[AlignedPair] = []
+        passthrough_counts: dict[str, int] = {}
+        triages = [triage_segment(seg, opt) for seg in segments]
+
+        def route_segment(seg: Segment, record: bool = True) -> Route:
+            return self.router.route(
+                seg.text,
+                model=backend_opt.model,
+                fast_model=fast_model,
+                quality_model=quality_model,
+                markdown=is_markdown_mode,
+                interactive=request.interactive,
+                record=record,
+            )
+
+        # 和 done 的键一致：只算要调用模型的段落，带上（按当前负载预估的）模型
+        dedup_total, dedup_unique = dedup_stats(
+            (segment_key(seg), route_segment(seg, record=False).model)
+            for seg, triage in zip(segments, triages)
+            if not triage.passthrough
+        )
+        # ((text, context), 模型) -> 已完成的译文，重复段落直接复用
+        done: dict[tuple[SegmentKey, str], str] = {}
+        dedup_hits = 0
+        mask_tokens_saved = 0
+        mask_fallbacks = 0
+        aborted_generations = 0
+        # 时间预算用完没翻译的段落（response.segments 的下标）
+        untranslated: list[int] = []
+        # 被 num_predict 上限截断、译文可能不完整的段落（同上）
+        truncated: list[int] = []
+        # 译文被截断的 done 键：去重复用时同样算截断
+        truncated_keys: set[tuple[SegmentKey, str]] = set()
+
+        def untranslated_event(index: int, seg: Segment, segment_lang: str) -> dict[str, Any]:
+            # 原样输出；直通 / 去重这类不花时间的段落在预算用完后照常处理
+            SEGMENTS.labels("untranslated").inc()
+            untranslated.append(index)
+            pairs.append(AlignedPair(source=seg.text, target=seg.text, lang=segment_lang, untranslated=True))
+            return self._update_event(
+                timer=timer,
+                pairs=pairs,
+                output_mode=output_mode,
+                collapse_newlines=request.collapse_newlines,
+                detected_source_lang=detected_source_lang,
+                completed_segments=index + 1,
+                total_segments=total_segments,
+                partial=False,
+                active_segment_index=index + 1,
+                active_segment_source=seg.text,
+                active_segment_target=seg.text,
+                active_segment_lang=segment_lang,
+                segment_status="untranslated",
+            )
 
         yield {
             "event": "started",
             "total_segments": total_segments,
             "completed_segments": 0,
             "detected_source_lang": detected_source_lang,
+            "detected_lang_distribution": [
+                {"lang": lang, "share": share} for lang, share in detect_lang_distribution(text)
+            ],
+            "unique_segments": dedup_unique,
+            "dedup_ratio": round(dedup_ratio(dedup_total, dedup_unique), 4),
             "output_text": "",
             "active_segment_index": None,
             "active_segment_source": None,
@@ -92,9 +263,16 @@ class TranslationService:
         }
 
         for index, seg in enumerate(segments):
-            if not seg.text.strip():
-                pairs.append(AlignedPair(source=seg.text, target=seg.text))
+            timer.begin_segment()
+            triage = triages[index]
+            segment_lang = triage.lang.lang
+            if triage.passthrough:
+                SEGMENTS.labels("passthrough").inc()
+                reason = triage.skip_reason
+                passthrough_counts[reason] = passthrough_counts.get(reason, 0) + 1
+                pairs.append(AlignedPair(source=seg.text, target=seg.text, lang=segment_lang))
                 yield self._update_event(
+                    timer=timer,
                     pairs=pairs,
                     output_mode=output_mode,
                     collapse_newlines=request.collapse_newlines,
@@ -105,40 +283,175 @@ class TranslationService:
                     active_segment_index=index + 1,
                     active_segment_source=seg.text,
                     active_segment_target=seg.text,
+                    active_segment_lang=segment_lang,
                     segment_status="passthrough",
                 )
                 continue
 
-            seg_opt = PromptOptions(
-                source_lang=opt.prompt_opt.source_lang,
-                target_lang=opt.prompt_opt.target_lang,
-                preset=opt.prompt_opt.preset,
-                terminology=opt.prompt_opt.terminology,
-                context=seg.context,
-                src_text_with_format=opt.prompt_opt.src_text_with_format,
-            )
-            prompt = build_prompt(seg.text, seg_opt)
-
-            raw = ""
-            for chunk in backend.stream_generate(prompt):
-                raw += chunk
+            model = route_segment(seg).model
+            # 同一段落换了模型就是另一份译文，缓存键里要带上模型
+            key = (segment_key(seg), model)
+            if opt.dedup_segments and key in done:
+                SEGMENTS.labels("deduplicated").inc()
+                dedup_hits += 1
+                target = done[key]
+                if key in truncated_keys:
+                    truncated.append(len(pairs))
+                pairs.append(AlignedPair(source=seg.text, target=target, lang=segment_lang, model=model))
                 yield self._update_event(
-                    pairs=pairs + [AlignedPair(source=seg.text, target=raw)],
+                    timer=timer,
+                    pairs=pairs,
                     output_mode=output_mode,
                     collapse_newlines=request.collapse_newlines,
                     detected_source_lang=detected_source_lang,
-                    completed_segments=index,
+                    completed_segments=index + 1,
                     total_segments=total_segments,
-                    partial=True,
+                    partial=False,
                     active_segment_index=index + 1,
                     active_segment_source=seg.text,
-                    active_segment_target=raw,
-                    segment_status="streaming",
+                    active_segment_target=target,
+                    active_segment_lang=segment_lang,
+                    active_segment_model=model,
+                    segment_status="deduplicated",
                 )
+                continue
+
+            if deadline.expired:
+                yield untranslated_event(index, seg, segment_lang)
+                continue
+
+            backend = backends.get(model)
+            if self.scheduler is not None and (ticket is None or ticket.model != model):
+                # 真正要生成时才排队（全是直通 / 去重的任务不占模型），路由到的每个模型各排各的。
+                # 换模型前先让出手上的名额：同时占着两个模型会和另一个任务互相等
+                if ticket is not None:
+                    self.scheduler.release(ticket)
+                ticket = yield from self._wait_for_turn(model, hosts, cleanup, deadline)
+                if not ticket.granted:
+                    # 排队时预算用完：这个 host 没轮到我们，不能在上面建后端、加载模型
+                    self.scheduler.release(ticket)
+                    ticket = None
+                    yield untranslated_event(index, seg, segment_lang)
+                    continue
+                if backend is not None and getattr(backend, "cfg", backend_opt).host != ticket.host:
+                    backend = None
+            if backend is None:
+                host = ticket.host if ticket is not None else backend_opt.host
+                model_opt = replace(backend_opt, model=model, host=host)
+                if request.hedge:
+                    model_opt.hedge_hosts = self._hedge_hosts(model_opt, hosts)
+                backend = backends[model] = (self.backend_factory or OllamaBackend)(model_opt)
+                yield from self._ensure_model_loaded(backend, deadline)
+
+            segment_started = time.perf_counter()
+            seg_opt = segment_prompt_options(seg, opt)
+            masked = mask_segment(seg, opt)
+            # 先用占位符版本；占位符没还原完整时再用原文重翻一次
+            attempts = [masked, None] if masked.masked else [None]
+            attempt_stats = []
+            timed_out = False
+            for attempt in attempts:
+                remaining = deadline.remaining()
+                if remaining is not None:
+                    if remaining <= 0:
+                        timed_out = True
+                        break
+                    # 剩余预算也交给后端，卡在一次生成里时能按时断开
+                    cfg = getattr(backend, "cfg", None)
+                    if isinstance(cfg, OllamaBackendOptions):
+                        cfg.deadline_sec = remaining
+                t0 = timer.clock()
+                source_text = attempt.text if attempt is not None else seg.text
+                prompt = build_prompt(source_text, seg_opt)
+                gen_options = None
+                if self.length_guard is not None:
+                    limits = generation_limits(source_text, seg_opt, segment_lang, self.length_guard)
+                    gen_options = limits.to_options()
+                timer.add("prompt", t0)
+                extractor = StreamingExtractor(opt.post_opt)
+                repetition = RepetitionGuard()
+                gen_started = timer.clock()
+                wall_started = time.perf_counter()
+                first_chunk = True
+                stream = backend.stream_generate(prompt, options=gen_options)
+                budgeted = _BudgetedStream(stream, deadline)
+                for chunk in budgeted:
+                    if first_chunk:
+                        first_chunk = False
+                        timer.add("ttft", gen_started)
+                        self.router.observe_ttft(time.perf_counter() - wall_started)
+                    if repetition.feed(chunk):
+                        # 关闭流即断开连接，Ollama 随即停止生成
+                        close = getattr(stream, "close", None)
+                        if close is not None:
+                            close()
+                        break
+                    t0 = timer.clock()
+                    partial_target = extractor.feed(chunk)
+                    if attempt is not None:
+                        partial_target = unmask_partial(partial_target, attempt)
+                    timer.add("extract", t0)
+                    yield self._update_event(
+                        timer=timer,
+                        pairs=pairs
+                        + [AlignedPair(source=seg.text, target=partial_target, lang=segment_lang, model=model)],
+                        output_mode=output_mode,
+                        collapse_newlines=request.collapse_newlines,
+                        detected_source_lang=detected_source_lang,
+                        completed_segments=index,
+                        total_segments=total_segments,
+                        partial=True,
+                        active_segment_index=index + 1,
+                        active_segment_source=seg.text,
+                        active_segment_target=partial_target,
+                        active_segment_lang=segment_lang,
+                        active_segment_model=model,
+                        segment_status="streaming",
+                    )
 
-            target = extract_translation(raw, opt.post_opt)
-            pairs.append(AlignedPair(source=seg.text, target=target))
+                # generate 包含流式期间的 extract / render / emit，ttft 单独看
+                timer.add("generate", gen_started)
+                if budgeted.cut:
+                    timed_out = True
+                    break
+                attempt_stats.append(getattr(stream, "stats", None))
+                t0 = timer.clock()
+                if repetition.tripped:
+                    ABORTED_GENERATIONS.inc()
+                    aborted_generations += 1
+                    target = extract_translation(repetition.prefix, opt.post_opt)
+                else:
+                    target = extractor.finish()
+                if attempt is None:
+                    timer.add("extract", t0)
+                    break
+                restored = unmask_spans(target, attempt)
+                timer.add("extract", t0)
+                if restored is not None:
+                    target = restored
+                    mask_tokens_saved += attempt.tokens_saved
+                    break
+                MASK_FALLBACKS.inc()
+                mask_fallbacks += 1
+
+            if timed_out:
+                # 半截译文不可靠，整段按没翻译处理
+                yield untranslated_event(index, seg, segment_lang)
+                continue
+            SEGMENT_SECONDS.observe(time.perf_counter() - segment_started)
+            SEGMENTS.labels("translated").inc()
+            seg_stats = sum_stats(attempt_stats)
+            if getattr(seg_stats, "done_reason", None) == "length":
+                TRUNCATED_GENERATIONS.inc()
+                truncated.append(len(pairs))
+                truncated_keys.add(key)
+            if opt.dedup_segments:
+                done[key] = target
+            pairs.append(
+                AlignedPair(source=seg.text, target=target, lang=segment_lang, stats=seg_stats, model=model)
+            )
             yield self._update_event(
+                timer=timer,
                 pairs=pairs,
                 output_mode=output_mode,
                 collapse_newlines=request.collapse_newlines,
@@ -149,13 +462,30 @@ class TranslationService:
                 active_segment_index=index + 1,
                 active_segment_source=seg.text,
                 active_segment_target=target,
+                active_segment_lang=segment_lang,
+                active_segment_model=model,
+                active_segment_stats=seg_stats.to_dict() if seg_stats is not None else None,
                 segment_status="completed",
             )
 
+        timer.end_segment()
+        total_stats = sum_stats(pair.stats for pair in pairs)
         response = TranslationResponse(
-            output_text=self._render_output(pairs, output_mode, request.collapse_newlines),
-            segments=[SegmentResult(source=pair.source, target=pair.target) for pair in pairs],
+            output_text=self._render_output(pairs, output_mode, request.collapse_newlines, timer),
+            segments=[
+                SegmentResult(
+                    source=pair.source,
+                    target=pair.target,
+                    lang=pair.lang or None,
+                    model=pair.model or None,
+                    stats=pair.stats.to_dict() if pair.stats is not None else None,
+                )
+                for pair in pairs
+            ],
             detected_source_lang=detected_source_lang,
+            partial=bool(untranslated),
+            untranslated_segments=untranslated,
+            truncated_segments=truncated,
         )
         yield {
             "event": "completed",
@@ -164,12 +494,116 @@ class TranslationService:
             "completed_segments": total_segments,
             "total_segments": total_segments,
             "detected_source_lang": detected_source_lang,
+            "passthrough_counts": passthrough_counts,
+            "dedup_hits": dedup_hits,
+            "mask_tokens_saved": mask_tokens_saved,
+            "mask_fallbacks": mask_fallbacks,
+            "aborted_generations": aborted_generations,
+            # 时间预算用完时为 True，untranslated_segments 列出原样输出的段落
+            "partial": response.partial,
+            "untranslated_segments": untranslated,
+            "truncated_segments": truncated,
+            "generation_stats": total_stats.to_dict() if total_stats is not None else None,
             "active_segment_index": None,
             "active_segment_source": None,
             "active_segment_target": "",
             "segment_status": "completed",
         }
 
+    def _wait_for_turn(
+        self,
+        model: str,
+        hosts: list[str],
+        cleanup: contextlib.ExitStack,
+        deadline: Deadline,
+    ) -> Generator[dict[str, Any], None, Ticket]:
+        """Queue `model` on the scheduler, yielding progress until admitted; gives up at the deadline."""
+        ticket = self.scheduler.submit(model, hosts)
+        cleanup.callback(self.scheduler.release, ticket)
+        while not ticket.granted and not deadline.expired:
+            yield {
+                "event": "queued",
+                "model": ticket.model,
+                "host": ticket.host,
+                "position": self.scheduler.position(ticket),
+                "waited_ms": round(ticket.waited_sec * 1000),
+            }
+            wait_sec = MODEL_LOADING_PROGRESS_SEC
+            remaining = deadline.remaining()
+            if remaining is not None:
+                wait_sec = max(0.0, min(wait_sec, remaining))
+            ticket.wait(wait_sec)
+        return ticket
+
+    def _hedge_hosts(self, backend_opt: OllamaBackendOptions, hosts: list[str]) -> list[str]:
+        """
+        The other hosts that already have the model loaded. A cold host would load
+        the model just for one hedge, evicting whatever the scheduler put there.
+        """
+        primary = backend_opt.host.rstrip("/")
+        backups = []
+        for host in dict.fromkeys(host.rstrip("/") for host in hosts):
+            if host == primary:
+                continue
+            if self.scheduler is not None:
+                loaded = self.scheduler.model_loaded(host, backend_opt.model)
+            else:
+                probe_opt = replace(backend_opt, mode=OllamaMode.HTTP, host=host, concurrency=None)
+                loaded = OllamaBackend(probe_opt).is_model_loaded()
+            if loaded is True:
+                backups.append(host)
+        return backups
+
+    def _ensure_model_loaded(self, backend: OllamaBackend, deadline: Deadline) -> Iterator[dict[str, Any]]:
+        """
+        Preload a cold model before the first prompt and report progress, so the
+        first segment's time to first token does not silently include the load.
+        """
+        if backend.is_model_loaded() is not False:
+            return
+
+        model = backend.cfg.model
+        outcome: dict[str, Any] = {}
+
+        def load() -> None:
+            try:
+                outcome["load_sec"] = backend.warm_up()
+            except Exception as exc:
+                outcome["error"] = str(exc)
+
+        started = time.perf_counter()
+        thread = threading.Thread(target=load, name="ollama-warmup", daemon=True)
+        thread.start()
+        yield {"event": "model_loading", "model": model, "status": "loading", "elapsed_ms": 0}
+        while True:
+            thread.join(MODEL_LOADING_PROGRESS_SEC)
+            elapsed_ms = round((time.perf_counter() - started) * 1000)
+            if not thread.is_alive():
+                break
+            if deadline.expired:
+                # 不再等了：加载在后台继续，这次任务剩下的段落原样输出
+                yield {"event": "model_loading", "model": model, "status": "timeout", "elapsed_ms": elapsed_ms}
+                return
+            yield {"event": "model_loading", "model": model, "status": "loading", "elapsed_ms": elapsed_ms}
+
+        if "error" in outcome:
+            # 真正的错误交给后面的生成请求抛出
+            yield {
+                "event": "model_loading",
+                "model": model,
+                "status": "failed",
+                "elapsed_ms": elapsed_ms,
+                "message": outcome["error"],
+            }
+            return
+        yield {
+            "event": "model_loading",
+            "model": model,
+            "status": "loaded",
+            "elapsed_ms": elapsed_ms,
+            "load_duration_ms": round(outcome["load_sec"] * 1000),
+        }
+
     def _update_event(
         self,
         *,
@@ -184,10 +618,14 @@ class TranslationService:
         active_segment_source: str | None,
         active_segment_target: str,
         segment_status: str,
+        active_segment_lang: str | None = None,
+        active_segment_model: str | None = None,
+        active_segment_stats: dict[str, Any] | None = None,
+        timer: StageTimer = NULL_TIMER,
     ) -> dict[str, Any]:
-        return {
+        event = {
             "event": "update",
-            "output_text": self._render_output(pairs, output_mode, collapse_newlines),
+            "output_text": self._render_output(pairs, output_mode, collapse_newlines, timer),
             "completed_segments": completed_segments,
             "total_segments": total_segments,
             "detected_source_lang": detected_source_lang,
@@ -195,14 +633,30 @@ class TranslationService:
             "active_segment_index": active_segment_index,
             "active_segment_source": active_segment_source,
             "active_segment_target": active_segment_target,
+            "active_segment_lang": active_segment_lang,
+            "active_segment_model": active_segment_model,
             "segment_status": segment_status,
-            "segments": [{"source": pair.source, "target": pair.target} for pair in pairs],
+            "segments": [
+                {"source": pair.source, "target": pair.target, "lang": pair.lang or None, "model": pair.model or None}
+                for pair in pairs
+            ],
         }
+        if active_segment_stats is not None:
+            event["active_segment_stats"] = active_segment_stats
+        return event
 
-    def _render_output(self, pairs: list[AlignedPair], mode: OutputMode, collapse_newlines: bool) -> str:
+    def _render_output(
+        self,
+        pairs: list[AlignedPair],
+        mode: OutputMode,
+        collapse_newlines: bool,
+        timer: StageTimer = NULL_TIMER,
+    ) -> str:
+        t0 = timer.clock()
         output_text = render_output(pairs, mode=mode)
         if collapse_newlines:
             output_text = re.sub(r"\n{3,}", "\n\n", self._normalize_text(output_text))
+        timer.sample("render", t0)
         return output_text
 
     def _normalize_text(self, text: str) -> str:
@@ -216,14 +670,30 @@ class TranslationService:
         )
 
     def _detect_source_lang(self, text: str) -> str | None:
-        if not text.strip():
-            return None
-        for ch in text:
-            code = ord(ch)
-            if 0x3040 <= code <= 0x30FF:
-                return "ja"
-            if 0xAC00 <= code <= 0xD7AF:
-                return "ko"
-            if 0x4E00 <= code <= 0x9FFF:
-                return "zh"
-        return "en"
+        return detect_source_lang(text)
+
+
+class _BudgetedStream:
+    """Iterates a generation stream until the job deadline passes; `cut` tells whether it was stopped early."""
+
+    def __init__(self, stream: Any, deadline: Deadline):
+        self.stream = stream
+        self.deadline = deadline
+        self.cut = False
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for chunk in self.stream:
+                yield chunk
+                if self.deadline.expired:
+                    self.cut = True
+                    break
+        except GenerationTimeoutError:
+            # 后端按剩余预算断开的；不是预算到了就照常抛出（卡死）
+            if not self.deadline.expired:
+                raise
+            self.cut = True
+        if self.cut:
+            close = getattr(self.stream, "close", None)
+            if close is not None:
+                close()
@@ -2,11 +2,12 @@
 
 use std::collections::HashMap;
 use std::fs;
-use std::io::{BufRead, BufReader, Write};
+use std::io::{BufReader, ErrorKind, Read, Write};
 use std::path::{Path, PathBuf};
 use std::process::{Child, Command, Stdio};
 use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
 use std::sync::{Arc, Mutex};
+use std::time::{Duration, Instant};
 
 use serde::{Deserialize, Serialize};
 use serde_json::{json, Value};
@@ -26,10 +27,16 @@ const TRAY_ID: &str = "translator-tray";
 const EVENT_TRAY_OPENED: &str = "translator://tray-opened";
 #[cfg(target_os = "macos")]
 const EVENT_HOTKEY_ERROR: &str = "translator://hotkey-error";
+// Length-prefixed UTF-8 frames; see `python_backend/bridge.py`.
+const BRIDGE_STREAM_PROTOCOL: &str = "frames";
+// Progress events are small JSON objects; a larger length prefix means a corrupt stream.
+const MAX_BRIDGE_FRAME_BYTES: usize = 64 * 1024 * 1024;
 #[cfg(target_os = "windows")]
 const BRIDGE_RESOURCE_EXE: &str = "translator-bridge.exe";
 #[cfg(target_os = "windows")]
 const BRIDGE_RESOURCE_DIR: &str = "translator-bridge";
+// A healthy bridge does not go away while the app runs; avoid spawning Python on every poll.
+const BACKEND_STATUS_TTL: Duration = Duration::from_secs(30);
 #[cfg(target_os = "windows")]
 const CREATE_NO_WINDOW: u32 = 0x08000000;
 
@@ -45,8 +52,10 @@ struct AppState {
     translation: Mutex<Option<RunningTranslation>>,
     translation_events: Mutex<HashMap<u64, Vec<Value>>>,
     hotkey_listener: Mutex<Option<HotkeyListener>>,
+    model_heartbeat: Mutex<Option<Child>>,
     frontend_ready: AtomicBool,
     pending_clipboard_triggers: AtomicU64,
+    backend_status_cache: Mutex<Option<(Instant, BackendStatus)>>,
 }
 
 #[cfg(target_os = "macos")]
@@ -56,7 +65,7 @@ type HotkeyListener = hotkey_windows::WindowsHotkeyListener;
 #[cfg(not(any(target_os = "macos", target_os = "windows")))]
 type HotkeyListener = ();
 
-#[derive(Serialize)]
+#[derive(Clone, Serialize)]
 struct BackendStatus {
     state: String,
     python: Option<String>,
@@ -162,11 +171,16 @@ fn default_config() -> Value {
         "mode": "local",
         "host": "http://127.0.0.1:11434",
         "model": "demonbyron/HY-MT1.5-1.8B",
+        "fast_model": "",
+        "quality_model": "",
         "font_size": 14,
         "hotkey_enabled": true,
         "minimize_to_tray": true,
         "theme": "system",
-        "ui_lang": "en"
+        "ui_lang": "en",
+        "keep_alive": "30m",
+        "model_heartbeat": false,
+        "profile_dir": ""
     })
 }
 
@@ -744,6 +758,25 @@ fn spawn_hotkey_listener(app: &AppHandle, state: &AppState) -> Result<(), String
     }
 }
 
+fn read_bridge_frame<R: Read>(reader: &mut R) -> std::io::Result<Option<Vec<u8>>> {
+    let mut header = [0u8; 4];
+    match reader.read_exact(&mut header) {
+        Ok(()) => {}
+        Err(error) if error.kind() == ErrorKind::UnexpectedEof => return Ok(None),
+        Err(error) => return Err(error),
+    }
+    let length = u32::from_be_bytes(header) as usize;
+    if length > MAX_BRIDGE_FRAME_BYTES {
+        return Err(std::io::Error::new(
+            ErrorKind::InvalidData,
+            format!("Bridge frame of {length} bytes exceeds the {MAX_BRIDGE_FRAME_BYTES} byte limit"),
+        ));
+    }
+    let mut body = vec![0u8; length];
+    reader.read_exact(&mut body)?;
+    Ok(Some(body))
+}
+
 fn spawn_translation_stream(app: &AppHandle, payload: &str, state: &AppState) -> Result<u64, String> {
     let _ = cancel_running_translation(app, state, None, false)?;
 
@@ -751,6 +784,8 @@ fn spawn_translation_stream(app: &AppHandle, payload: &str, state: &AppState) ->
 
     let mut process = bridge_process(app, "translate-stream")?;
     process
+        .arg("--protocol")
+        .arg(BRIDGE_STREAM_PROTOCOL)
         .stdin(Stdio::piped())
         .stdout(Stdio::piped())
         .stderr(Stdio::null());
@@ -785,26 +820,26 @@ fn spawn_translation_stream(app: &AppHandle, payload: &str, state: &AppState) ->
 
     let app_handle = app.clone();
     std::thread::spawn(move || {
-        let reader = BufReader::new(stdout);
-        for line in reader.lines() {
-            let Ok(line) = line else {
-                enqueue_translation_event(
-                    &app_handle.state::<AppState>(),
-                    job_id,
-                    json!({
-                        "job_id": job_id,
-                        "event": "error",
-                        "message": "Failed to read translation progress output.",
-                    }),
-                );
-                break;
+        let mut reader = BufReader::new(stdout);
+        loop {
+            let frame = match read_bridge_frame(&mut reader) {
+                Ok(Some(frame)) => frame,
+                Ok(None) => break,
+                Err(_) => {
+                    enqueue_translation_event(
+                        &app_handle.state::<AppState>(),
+                        job_id,
+                        json!({
+                            "job_id": job_id,
+                            "event": "error",
+                            "message": "Failed to read translation progress output.",
+                        }),
+                    );
+                    break;
+                }
             };
 
-            if line.trim().is_empty() {
-                continue;
-            }
-
-            match serde_json::from_str::<Value>(&line) {
+            match serde_json::from_slice::<Value>(&frame) {
                 Ok(mut payload) => {
                     if let Some(object) = payload.as_object_mut() {
                         if !object.contains_key("event") {
@@ -861,8 +896,27 @@ fn spawn_translation_stream(app: &AppHandle, payload: &str, state: &AppState) ->
 }
 
 #[tauri::command]
-fn backend_status(app: AppHandle) -> BackendStatus {
-    match run_bridge(&app, "health", None) {
+fn backend_status(app: AppHandle, state: State<AppState>) -> BackendStatus {
+    {
+        let guard = state.backend_status_cache.lock().unwrap();
+        if let Some((checked_at, status)) = guard.as_ref() {
+            if checked_at.elapsed() < BACKEND_STATUS_TTL {
+                return status.clone();
+            }
+        }
+    }
+
+    let status = probe_backend_status(&app);
+    // Only cache success so a fixed environment is picked up on the next poll.
+    if status.state == "running" {
+        let mut guard = state.backend_status_cache.lock().unwrap();
+        *guard = Some((Instant::now(), status.clone()));
+    }
+    status
+}
+
+fn probe_backend_status(app: &AppHandle) -> BackendStatus {
+    match run_bridge(app, "health", None) {
         Ok(raw) => match serde_json::from_str::<PythonHealth>(&raw) {
             Ok(result) if result.status == "ok" => BackendStatus {
                 state: "running".to_string(),
@@ -896,11 +950,79 @@ fn get_config() -> Result<String, String> {
 
 #[tauri::command]
 fn save_config(app: AppHandle, payload: String, state: State<AppState>) -> Result<String, String> {
+    let previous_residency = model_residency_config();
     let result = save_config_value(&payload)?;
+    if model_residency_config() != previous_residency {
+        sync_model_residency(&app, &state);
+    }
     spawn_hotkey_listener(&app, &state)?;
     Ok(result)
 }
 
+/// Settings that decide which model is kept loaded and how.
+fn model_residency_config() -> Vec<Option<Value>> {
+    let config = load_config_value();
+    ["mode", "host", "model", "keep_alive", "model_heartbeat"]
+        .iter()
+        .map(|key| config.get(*key).cloned())
+        .collect()
+}
+
+fn stop_model_heartbeat(state: &AppState) {
+    let running = {
+        let mut guard = state.model_heartbeat.lock().unwrap();
+        guard.take()
+    };
+
+    if let Some(mut child) = running {
+        let _ = child.kill();
+        let _ = child.wait();
+    }
+}
+
+/// With `model_heartbeat` on, a long-lived bridge process preloads the model and
+/// keeps refreshing keep_alive while the app is open (it exits when its stdin
+/// closes, so it cannot outlive the app). Otherwise the model is warmed up once.
+fn sync_model_residency(app: &AppHandle, state: &AppState) {
+    stop_model_heartbeat(state);
+
+    let heartbeat = load_config_value()
+        .get("model_heartbeat")
+        .and_then(Value::as_bool)
+        .unwrap_or(false);
+    if !heartbeat {
+        spawn_model_warm_up(app);
+        return;
+    }
+
+    let spawned = bridge_process(app, "model-heartbeat").and_then(|mut process| {
+        process
+            .stdin(Stdio::piped())
+            .stdout(Stdio::null())
+            .stderr(Stdio::null())
+            .spawn()
+            .map_err(|error| format!("Failed to spawn model heartbeat: {error}"))
+    });
+    match spawned {
+        Ok(child) => {
+            let mut guard = state.model_heartbeat.lock().unwrap();
+            *guard = Some(child);
+        }
+        Err(error) => eprintln!("main: {error}"),
+    }
+}
+
+/// Preload the configured model in the background so the first translation
+/// does not pay Ollama's load time.
+fn spawn_model_warm_up(app: &AppHandle) {
+    let app_handle = app.clone();
+    std::thread::spawn(move || {
+        if let Err(error) = run_bridge(&app_handle, "warm-up", None) {
+            eprintln!("main: model warm-up failed: {error}");
+        }
+    });
+}
+
 #[tauri::command]
 fn sync_hotkey_listener(app: AppHandle, state: State<AppState>) -> Result<(), String> {
     spawn_hotkey_listener(&app, &state)
@@ -1063,13 +1185,16 @@ fn main() {
             translation: Mutex::new(None),
             translation_events: Mutex::new(HashMap::new()),
             hotkey_listener: Mutex::new(None),
+            model_heartbeat: Mutex::new(None),
             frontend_ready: AtomicBool::new(false),
             pending_clipboard_triggers: AtomicU64::new(0),
+            backend_status_cache: Mutex::new(None),
         })
         .setup(|app| {
             build_tray(&app.handle())?;
             #[cfg(not(target_os = "macos"))]
             let _ = spawn_hotkey_listener(&app.handle(), &app.state::<AppState>());
+            sync_model_residency(&app.handle(), &app.state::<AppState>());
             Ok(())
         })
         .on_menu_event(|app, event| match event.id().as_ref() {
@@ -1085,6 +1210,7 @@ fn main() {
                     .quitting
                     .store(true, Ordering::Relaxed);
                 stop_hotkey_listener(&app.state::<AppState>());
+                stop_model_heartbeat(&app.state::<AppState>());
                 let _ = cancel_running_translation(app, &app.state::<AppState>(), None, false);
                 app.exit(0);
             }
@@ -197,7 +197,7 @@ export default function App() {
   const historyListRef = useRef<HTMLDivElement>(null);
   const historyScrollRef = useRef(0);
   const permissionPollRef = useRef<number | null>(null);
-  const runTranslationRef = useRef<(text: string) => Promise<void>>(async () => {});
+  const runTranslationRef = useRef<(text: string, interactive?: boolean) => Promise<void>>(async () => {});
   const captureClipboardIntoInputRef = useRef<(prefilledText?: string, autoTranslate?: boolean) => Promise<void>>(async () => {});
   const t = (key: keyof typeof I18N.en) => I18N[config.ui_lang || "en"][key];
   const langName = (code: string) => LANG_MAP[config.ui_lang || "en"][code] || code.toUpperCase();
@@ -372,7 +372,7 @@ export default function App() {
     setHistory(prev => [newItem, ...prev.filter(i => i.source !== source.trim()).slice(0, 99)]);
   };
 
-  const runTranslation = async (text: string) => {
+  const runTranslation = async (text: string, interactive = false) => {
     if (!text.trim() || isSubmitting) return;
     setInput(text); setOutput(""); setSegments([]); setIsSubmitting(true); setProgressRatio(0);
     const request: TranslationRequest = {
@@ -386,6 +386,10 @@ export default function App() {
       mode: config.mode,
       host: config.host,
       model: config.model,
+      fast_model: config.fast_model,
+      quality_model: config.quality_model,
+      keep_alive: config.keep_alive,
+      interactive,
     };
     if (isTauriRuntime()) {
       try {
@@ -420,7 +424,7 @@ export default function App() {
     setStatus(t("ready"));
 
     if (autoTranslate && clipboardText) {
-      await runTranslationRef.current(clipboardText);
+      await runTranslationRef.current(clipboardText, true);
     }
   };
   const pollProgress = async (jobId: number, sourceText: string) => {
@@ -435,7 +439,7 @@ export default function App() {
           // Real-time bilingual segment tracking
           if (ev.active_segment_source) {
             const status = ev.segment_status;
-            if (status === "completed" || status === "passthrough") {
+            if (status === "completed" || status === "passthrough" || status === "deduplicated") {
               doneSegs = [...doneSegs, { source: ev.active_segment_source, target: ev.active_segment_target }];
               setSegments(doneSegs);
             } else if (status === "streaming") {
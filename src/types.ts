@@ -11,11 +11,16 @@ export type AppConfig = {
   mode: "local" | "http";
   host: string;
   model: string;
+  fast_model?: string;
+  quality_model?: string;
   font_size: number;
   hotkey_enabled: boolean;
   minimize_to_tray: boolean;
   theme: "light" | "dark" | "system";
   ui_lang: "en" | "zh";
+  keep_alive?: string;
+  model_heartbeat?: boolean;
+  profile_dir?: string;
 };
 
 export type TranslationRequest = {
@@ -28,11 +33,37 @@ export type TranslationRequest = {
   translation_mode: "normal" | "markdown";
   mode: "local" | "http";
   host: string;
+  hosts?: string[];
+  hedge?: boolean;
   model: string;
+  fast_model?: string;
+  quality_model?: string;
+  interactive?: boolean;
+  deadline_sec?: number | null;
+  keep_alive?: string;
+  collect_timings?: boolean;
+  profile?: boolean;
+  job_id?: string;
+};
+
+export type GenerationStats = {
+  prompt_eval_count: number;
+  prompt_eval_duration: number;
+  eval_count: number;
+  eval_duration: number;
+  load_duration: number;
+  total_duration: number;
+  done_reason: string | null;
+  host?: string | null;
+  tokens_per_sec: number;
+  prompt_tokens_per_sec: number;
 };
 
 export type TranslationResponse = {
   output_text: string;
   detected_source_lang: string | null;
-  segments: Array<{ source: string; target: string }>;
+  segments: Array<{ source: string; target: string; lang?: string | null; model?: string | null; stats?: GenerationStats | null }>;
+  partial?: boolean;
+  untranslated_segments?: number[];
+  truncated_segments?: number[];
 };
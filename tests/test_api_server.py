@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from backend import get_health_probe
+from python_backend.api_server import OllamaProbe, TranslatorAPIHandler, build_server
+from python_backend.config import ConfigStore
+from python_backend.models import AppConfig, TranslationResponse
+
+
+class TranslateEndpointTests(unittest.TestCase):
+    def test_profile_dir_comes_from_config_not_request(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ConfigStore(Path(tmp) / "config.json")
+            store.save(AppConfig(profile_dir=str(Path(tmp) / "profiles")))
+            service = MagicMock()
+            service.translate.return_value = TranslationResponse(output_text="Hello")
+            server = build_server(port=0)
+            threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+            payload = {"text": "你好", "profile": True, "profile_dir": str(Path(tmp) / "elsewhere")}
+            http_request = urllib.request.Request(
+                f"http://127.0.0.1:{server.server_address[1]}/translate",
+                data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            try:
+                with patch.object(TranslatorAPIHandler, "config_store", store), patch.object(
+                    TranslatorAPIHandler, "translation_service", service
+                ):
+                    with urllib.request.urlopen(http_request, timeout=5) as resp:
+                        self.assertEqual(json.loads(resp.read())["output_text"], "Hello")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        request = service.translate.call_args[0][0]
+        self.assertEqual(request.profile_dir, str(Path(tmp) / "profiles"))
+
+
+class OllamaProbeTests(unittest.TestCase):
+    def test_config_change_stops_the_old_refresher(self):
+        holder = OllamaProbe()
+        # 没人监听的端口：探测立即失败，不用真的 Ollama
+        first = holder.apply(AppConfig(host="http://127.0.0.1:9", model="a"))
+        self.assertIs(holder.apply(AppConfig(host="http://127.0.0.1:9", model="a")), first)
+        second = holder.apply(AppConfig(host="http://127.0.0.1:9", model="b"))
+        try:
+            self.assertIsNot(second, first)
+            self.assertIsNone(first._refresher)
+            self.assertTrue(second._refresher.is_alive())
+        finally:
+            holder.stop()
+        self.assertIsNone(second._refresher)
+
+    def test_config_change_does_not_wait_for_a_probe_in_flight(self):
+        holder = OllamaProbe()
+        slow = get_health_probe("http://127.0.0.1:9", "slow")
+        in_check, release = threading.Event(), threading.Event()
+
+        def check():
+            in_check.set()
+            release.wait(5)
+
+        slow.check = check
+        holder.apply(AppConfig(host="http://127.0.0.1:9", model="slow"))
+        thread = slow._refresher
+        self.assertTrue(in_check.wait(1))
+        started = time.perf_counter()
+        try:
+            holder.apply(AppConfig(host="http://127.0.0.1:9", model="fast"))
+            self.assertLess(time.perf_counter() - started, 0.5)
+        finally:
+            release.set()
+            holder.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())  # 旧线程探测完自己退出
+
+
+if __name__ == "__main__":
+    unittest.main()
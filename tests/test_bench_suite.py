@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from benchmarks.corpora import CORPORA, build_corpora
+from benchmarks.suite import compare, confirm_regressions, fake_generate, run_suite
+from core.pipeline import join_translations, run_pipeline
+
+
+class BenchSuiteTests(unittest.TestCase):
+    def test_corpora_are_reproducible(self):
+        first, second = build_corpora(), build_corpora()
+        self.assertEqual(first, second)
+        self.assertEqual(set(first), set(CORPORA))
+        self.assertNotEqual(build_corpora(seed=1)["clipboard"], first["clipboard"])
+
+    def test_fake_generate_round_trips_through_pipeline(self):
+        text = build_corpora()["paragraphs"]
+        out = join_translations(run_pipeline(text, fake_generate))
+        self.assertEqual(out, "\n".join(line for line in text.splitlines() if line))
+
+    def test_report_shape(self):
+        report = run_suite(only=["clipboard/split_plain"], quick=True)
+        self.assertEqual(list(report["results"]), ["clipboard/split_plain"])
+        metrics = report["results"]["clipboard/split_plain"]
+        self.assertGreater(metrics["us_per_op"], 0)
+        self.assertGreater(metrics["peak_kib"], 0)
+
+    def test_compare_flags_regressions_past_threshold(self):
+        baseline = {"results": {"a": {"us_per_op": 10.0, "peak_kib": 4.0}, "gone": {"us_per_op": 1.0}}}
+        current = {"results": {"a": {"us_per_op": 12.0, "peak_kib": 8.0}, "new": {"us_per_op": 1.0}}}
+        rows = {r["metric"]: r for r in compare(current, baseline, threshold=0.25)}
+        self.assertEqual(set(rows), {"us_per_op", "peak_kib"})
+        self.assertFalse(rows["us_per_op"]["regressed"])
+        self.assertTrue(rows["peak_kib"]["regressed"])
+
+    def test_flagged_cases_are_remeasured_before_failing(self):
+        baseline = {"results": {"noisy": {"us_per_op": 10.0}, "slow": {"us_per_op": 10.0}, "ok": {"us_per_op": 10.0}}}
+        report = {"results": {"noisy": {"us_per_op": 16.0}, "slow": {"us_per_op": 20.0}, "ok": {"us_per_op": 10.0}}}
+        rerun = {"results": {"noisy": {"us_per_op": 10.5}, "slow": {"us_per_op": 21.0}}}
+        with patch("benchmarks.suite.run_suite", return_value=rerun) as run:
+            rows = confirm_regressions(report, baseline, threshold=0.25, rounds=2)
+        self.assertEqual([r["case"] for r in rows if r["regressed"]], ["slow"])
+        self.assertEqual(run.call_args_list[0].kwargs["only"], ["noisy", "slow"])
+        self.assertEqual(run.call_args_list[1].kwargs["only"], ["slow"])
+        self.assertEqual(report["results"]["slow"]["us_per_op"], 20.0)  # 保留较快的一次
+
+
+if __name__ == "__main__":
+    unittest.main()
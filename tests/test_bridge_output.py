@@ -6,8 +6,9 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 
-from python_backend.bridge import write_json_line
+from python_backend.bridge import cmd_model_heartbeat, encode_frame, iter_frames, write_frame, write_json_line
 from python_backend.config import ConfigStore
+from python_backend.models import AppConfig
 
 
 class BridgeOutputTests(unittest.TestCase):
@@ -21,6 +22,25 @@ class BridgeOutputTests(unittest.TestCase):
         stdout.flush()
         self.assertEqual(buffer.getvalue(), b'{"text": "\\u6d4b\\u8bd5"}\n')
 
+    def test_frames_are_utf8_and_bypass_text_codepage(self) -> None:
+        buffer = io.BytesIO()
+        stdout = io.TextIOWrapper(buffer, encoding="cp1252", errors="strict", newline="")
+
+        with patch.object(sys, "stdout", stdout):
+            write_frame({"text": "测试"})
+            write_frame({"event": "completed", "output_text": "こんにちは"})
+
+        raw = buffer.getvalue()
+        self.assertEqual(raw[:4], len('{"text":"测试"}'.encode("utf-8")).to_bytes(4, "big"))
+        self.assertIn("测试".encode("utf-8"), raw)
+        events = list(iter_frames(io.BytesIO(raw)))
+        self.assertEqual(events, [{"text": "测试"}, {"event": "completed", "output_text": "こんにちは"}])
+
+    def test_truncated_frame_is_rejected(self) -> None:
+        frame = encode_frame({"text": "测试"})
+        with self.assertRaises(ValueError):
+            list(iter_frames(io.BytesIO(frame[:-2])))
+
     def test_config_load_ignores_unknown_legacy_fields(self) -> None:
         workspace_temp = Path.cwd() / "tmp"
         workspace_temp.mkdir(exist_ok=True)
@@ -38,5 +58,18 @@ class BridgeOutputTests(unittest.TestCase):
         self.assertEqual(config.source_lang, "en")
 
 
+    def test_model_heartbeat_runs_until_stdin_closes(self) -> None:
+        config = AppConfig(model="hy-mt", keep_alive="2h", model_heartbeat=False)
+        with patch("python_backend.bridge.ConfigStore") as store_cls, patch(
+            "python_backend.bridge.ModelResidency"
+        ) as residency_cls, patch.object(sys, "stdin", io.StringIO("")):
+            store_cls.return_value.load.return_value = config
+            self.assertEqual(cmd_model_heartbeat(), 0)
+
+        applied = residency_cls.return_value.apply.call_args.args[0]
+        self.assertEqual((applied.model, applied.keep_alive, applied.model_heartbeat), ("hy-mt", "2h", True))
+        residency_cls.return_value.stop.assert_called_once()
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import threading
+import unittest
+
+from backend.coalesce import SingleFlight
+
+
+class _GatedUpstream:
+    """Upstream that only emits a chunk when the test releases it."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.gate = threading.Semaphore(0)
+        self.calls = 0
+        self.closed = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        return self._iter()
+
+    def _iter(self):
+        try:
+            for chunk in self.chunks:
+                self.gate.acquire()
+                yield chunk
+        finally:
+            self.closed.set()
+
+    def release_all(self):
+        for _ in self.chunks:
+            self.gate.release()
+
+
+class SingleFlightStreamTests(unittest.TestCase):
+    def test_identical_streams_share_one_upstream(self):
+        flight = SingleFlight()
+        upstream = _GatedUpstream(["译", "文：", "Hello"])
+
+        first = flight.stream("k", upstream)
+        second = flight.stream("k", upstream)
+        results = {}
+
+        def consume(name, it):
+            results[name] = list(it)
+
+        threads = [threading.Thread(target=consume, args=(n, it)) for n, it in (("a", first), ("b", second))]
+        for t in threads:
+            t.start()
+        upstream.release_all()
+        for t in threads:
+            t.join(2)
+
+        self.assertEqual(upstream.calls, 1)
+        self.assertEqual(results, {"a": ["译", "文：", "Hello"], "b": ["译", "文：", "Hello"]})
+        self.assertEqual((flight.upstream_count, flight.coalesced_count), (1, 1))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_cancelled_subscriber_detaches_without_stopping_others(self):
+        flight = SingleFlight()
+        upstream = _GatedUpstream(["a", "b", "c"])
+
+        quitter = flight.stream("k", upstream)
+        stayer = flight.stream("k", upstream)
+
+        upstream.gate.release()
+        self.assertEqual(next(quitter), "a")
+        quitter.close()
+
+        upstream.gate.release()
+        upstream.gate.release()
+        self.assertEqual(list(stayer), ["a", "b", "c"])
+        self.assertEqual(upstream.calls, 1)
+
+    def test_upstream_closed_when_everyone_leaves(self):
+        flight = SingleFlight()
+        upstream = _GatedUpstream(["a", "b", "c"])
+
+        only = flight.stream("k", upstream)
+        upstream.gate.release()
+        self.assertEqual(next(only), "a")
+        only.close()
+        self.assertEqual(flight.in_flight(), 0)
+
+        upstream.gate.release()
+        self.assertTrue(upstream.closed.wait(2))
+
+        # 之后的同 key 请求会重新发起，而不是拿到被截断的旧流
+        again = _GatedUpstream(["x"])
+        it = flight.stream("k", again)
+        again.release_all()
+        self.assertEqual(list(it), ["x"])
+
+    def test_errors_are_raised_after_buffered_chunks(self):
+        flight = SingleFlight()
+
+        def failing():
+            yield "partial"
+            raise RuntimeError("boom")
+
+        received = []
+        with self.assertRaises(RuntimeError):
+            for chunk in flight.stream("k", failing):
+                received.append(chunk)
+        self.assertEqual(received, ["partial"])
+
+
+class SingleFlightCallTests(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return "译文：OK"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.call("k", slow)))
+        leader.start()
+        started.wait(2)
+        follower = threading.Thread(target=lambda: results.append(flight.call("k", slow)))
+        follower.start()
+        while flight.coalesced_count == 0:
+            threading.Event().wait(0.005)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+
+        self.assertEqual(results, ["译文：OK", "译文：OK"])
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
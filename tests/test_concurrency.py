@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from backend import (
+    AdaptiveConcurrency,
+    ConcurrencyOptions,
+    OllamaBackend,
+    OllamaBackendOptions,
+    OllamaMode,
+)
+from backend.concurrency import seed_limit
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
+from core.metrics import REGISTRY
+from core.pipeline import PipelineOptions, join_translations, run_pipeline
+from core.prompt import PromptOptions
+
+
+def _sample(controller: AdaptiveConcurrency, **kwargs) -> str:
+    controller.release(controller.acquire(), **kwargs)
+    return controller.last_decision
+
+
+class AdaptiveConcurrencyTests(unittest.TestCase):
+    def test_seed_from_ps_entry(self):
+        opt = ConcurrencyOptions()
+        self.assertEqual(seed_limit({"size": 100, "size_vram": 100}, opt), opt.gpu_seed_limit)
+        self.assertEqual(seed_limit({"size": 100, "size_vram": 40}, opt), opt.min_limit)
+        self.assertIsNone(seed_limit({"name": "x"}, opt))
+        self.assertIsNone(seed_limit(None, opt))
+
+    def test_additive_increase_only_when_limit_binds(self):
+        c = AdaptiveConcurrency("test://aimd-increase", ConcurrencyOptions(initial_limit=1, max_limit=3))
+        # limit=1：每次拿到的都是最后一个槽位
+        self.assertEqual(_sample(c, ttft_sec=0.1, tokens_per_sec=50), "increase")
+        self.assertEqual(c.limit, 2)
+        self.assertEqual(_sample(c, ttft_sec=0.1, tokens_per_sec=50), "hold")  # 1/2 在用，没顶到上限
+        for _ in range(20):
+            tickets = [c.acquire() for _ in range(c.limit)]
+            for t in tickets:
+                c.release(t, ttft_sec=0.1, tokens_per_sec=50)
+        self.assertEqual(c.limit, 3)
+
+    def test_backs_off_on_latency_and_errors(self):
+        c = AdaptiveConcurrency("test://aimd-backoff", ConcurrencyOptions(initial_limit=8, max_limit=8))
+        _sample(c, ttft_sec=0.1, tokens_per_sec=50)
+        for _ in range(5):
+            _sample(c, ttft_sec=2.0, tokens_per_sec=50)
+        self.assertEqual(c.last_decision, "decrease_latency")
+        self.assertLess(c.limit, 8)
+        before = c.limit
+        self.assertEqual(_sample(c, error=True), "decrease_error")
+        self.assertEqual(c.limit, max(1, int(before * 0.5)))
+
+    def test_acquire_blocks_at_limit(self):
+        c = AdaptiveConcurrency("test://aimd-block", ConcurrencyOptions(initial_limit=1))
+        first = c.acquire()
+        got = threading.Event()
+
+        def waiter():
+            c.release(c.acquire())
+            got.set()
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        self.assertFalse(got.wait(0.05))
+        c.release(first)
+        self.assertTrue(got.wait(1.0))
+        t.join()
+
+    def test_backend_seeds_from_ps_and_reports_metrics(self):
+        for ratio, expected in ((1.0, 4), (0.5, 1)):
+            with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0, vram_ratio=ratio)) as mock:
+                backend = OllamaBackend(OllamaBackendOptions(mode=OllamaMode.HTTP, host=mock.url, coalesce=False))
+                self.assertEqual(backend.concurrency_controller().limit, expected)
+                "".join(backend.stream_generate("Translate.\n\nhello"))
+                self.assertEqual(backend.concurrency_controller().in_flight, 0)
+        rendered = REGISTRY.render()
+        # 种子是 1，跑满唯一的槽位后加性增长到 2
+        self.assertIn(f'ollama_concurrency_limit{{host="{mock.url}"}} 2', rendered)
+        self.assertIn(f'ollama_concurrency_decisions_total{{host="{mock.url}",decision="seed"}} 1', rendered)
+
+    def test_disabled_controller(self):
+        backend = OllamaBackend(OllamaBackendOptions(concurrency=None))
+        self.assertIsNone(backend.concurrency_controller())
+
+
+class ParallelPipelineTests(unittest.TestCase):
+    def test_workers_keep_order_and_overlap_generations(self):
+        lock = threading.Lock()
+        active = [0, 0]  # 当前并发 / 最大并发
+
+        def generate(prompt):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "译文：" + prompt.rstrip("\n").rsplit("\n", 1)[-1].upper()
+
+        text = "\n".join(f"line number {i}" for i in range(8)) + "\nline number 0"
+        prompt_opt = PromptOptions(source_lang="en", target_lang="zh")
+        sequential = run_pipeline(text, generate, PipelineOptions(prompt_opt=prompt_opt))
+        self.assertEqual(active[1], 1)
+        parallel, report = run_pipeline(
+            text, generate, PipelineOptions(prompt_opt=prompt_opt, max_workers=4), return_report=True
+        )
+        self.assertEqual(join_translations(parallel), join_translations(sequential))
+        self.assertEqual(active[1], 4)
+        self.assertEqual(report.dedup_hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import unittest
+
+from backend import GenerationStats
+from core import PipelineOptions, PromptOptions, PromptPreset, run_pipeline
+from core.guard import LengthGuardOptions, RepetitionGuard, generation_limits, trim_repetition
+
+
+class GenerationLimitsTests(unittest.TestCase):
+    def test_num_predict_scales_with_source_and_language_pair(self):
+        text = "这是一个比较长的句子，用来估算译文长度。" * 10
+        zh_en = generation_limits(text, PromptOptions(source_lang="zh", target_lang="en"))
+        en_zh = generation_limits(text, PromptOptions(source_lang="en", target_lang="zh"))
+        short = generation_limits("你好", PromptOptions(source_lang="zh", target_lang="en"))
+
+        self.assertGreater(zh_en.num_predict, en_zh.num_predict)
+        self.assertEqual(short.num_predict, LengthGuardOptions().min_tokens)
+        capped = generation_limits(text, PromptOptions(), guard=LengthGuardOptions(max_tokens=100))
+        self.assertEqual(capped.num_predict, 100)
+
+    def test_stop_sequences_follow_preset(self):
+        plain = generation_limits("你好", PromptOptions(source_lang="zh", target_lang="en"))
+        markdown = generation_limits("# Title", PromptOptions(preset=PromptPreset.MARKDOWN))
+        self.assertIn("\n\nNote:", plain.stop)
+        self.assertEqual(markdown.stop, [])
+        self.assertNotIn("stop", markdown.to_options())
+
+
+class RepetitionGuardTests(unittest.TestCase):
+    def test_loop_is_cut_after_first_copy(self):
+        self.assertEqual(
+            trim_repetition("Hello world. " + "This is a loop. " * 10),
+            ("Hello world. This is a loop.", True),
+        )
+        self.assertEqual(trim_repetition("好的" + "。" * 60), ("好的。", True))
+
+    def test_normal_text_is_untouched(self):
+        for text in [
+            "A normal sentence without any loop in it, even if it is fairly long.",
+            "| --- | --- | --- |",
+            "哈哈哈哈",
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(trim_repetition(text), (text, False))
+
+    def test_markdown_rules_are_not_loops(self):
+        for text in [
+            "Title\n" + "=" * 60 + "\nBody",
+            "Title\n" + "=" * 60,
+            "# 标题\n\n" + "-" * 60,
+            "* * * " * 20,
+            "| Name | Age |\n" + "| --- | --- |\n" * 10,
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(trim_repetition(text), (text, False))
+                guard = RepetitionGuard()
+                for ch in text:
+                    guard.feed(ch)
+                self.assertFalse(guard.tripped)
+
+    def test_streaming_guard_trips_early(self):
+        guard = RepetitionGuard()
+        chunks = ["The answer is 42. "] + ["again and "] * 100
+        consumed = 0
+        for chunk in chunks:
+            consumed += 1
+            if guard.feed(chunk):
+                break
+        self.assertTrue(guard.tripped)
+        self.assertLess(consumed, 15)
+        self.assertTrue(guard.prefix.startswith("The answer is 42."))
+
+    def test_pipeline_trims_looping_output(self):
+        pairs, report = run_pipeline(
+            "早上好",
+            generate=lambda prompt: "译文：Good morning! " + "morning! " * 30,
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+        self.assertEqual(pairs[0].target, "Good morning!")
+        self.assertEqual(report.aborted_generations, 1)
+
+    def test_pipeline_reports_num_predict_truncation(self):
+        class Capped(str):
+            stats = GenerationStats(eval_count=48, done_reason="length")
+
+        _, report = run_pipeline(
+            "早上好", generate=lambda prompt: Capped("译文：Good mor"), opt=PipelineOptions(), return_report=True
+        )
+        self.assertEqual(report.truncated_generations, 1)
+        self.assertTrue(report.reports[0].truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
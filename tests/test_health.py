@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.health import HealthProbe
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    models = {"demo:latest"}
+    hits: list[str] = []
+
+    def do_GET(self):  # noqa: N802
+        self.hits.append(self.path)
+        self._reply(200, {"version": "0.9.0"})
+
+    def do_POST(self):  # noqa: N802
+        self.hits.append(self.path)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body.get("model") in self.models:
+            self._reply(200, {"details": {}})
+        else:
+            self._reply(404, {"error": "model not found"})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+
+class HealthProbeTests(unittest.TestCase):
+    def setUp(self):
+        _FakeOllama.hits = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.host = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_reachable_with_model(self):
+        state = HealthProbe(self.host, "demo:latest").check()
+        self.assertTrue(state.ok)
+        self.assertEqual(state.version, "0.9.0")
+        self.assertEqual(_FakeOllama.hits, ["/api/version", "/api/show"])
+
+    def test_missing_model(self):
+        state = HealthProbe(self.host, "other:7b").check()
+        self.assertTrue(state.reachable)
+        self.assertFalse(state.model_present)
+        self.assertFalse(state.ok)
+
+    def test_unreachable_host(self):
+        state = HealthProbe("http://127.0.0.1:9", "demo:latest", timeout_sec=0.5).check()
+        self.assertFalse(state.reachable)
+        self.assertIsNone(state.model_present)
+        self.assertIn("not reachable", state.error)
+
+    def test_get_is_cached_within_ttl(self):
+        probe = HealthProbe(self.host, "demo:latest", ttl_sec=60)
+        probe.get()
+        probe.get()
+        self.assertEqual(len(_FakeOllama.hits), 2)
+        probe.invalidate()
+        probe.get()
+        self.assertEqual(len(_FakeOllama.hits), 4)
+
+    def test_refresher_serves_cached_state(self):
+        probe = HealthProbe(self.host, "demo:latest", ttl_sec=0.01)
+        probe.check()
+        probe.start_refresher(interval_sec=60)
+        try:
+            self.assertTrue(probe.get().ok)
+        finally:
+            probe.stop_refresher()
+
+    def test_restart_before_the_old_refresher_exits(self):
+        probe = HealthProbe(self.host, "demo:latest")
+        probe.start_refresher(interval_sec=60)
+        old = probe._refresher
+        probe.stop_refresher(wait=False)
+        probe.start_refresher(interval_sec=60)  # 不能把旧线程的停止信号清掉
+        try:
+            old.join(2)
+            self.assertFalse(old.is_alive())
+            self.assertTrue(probe._refresher.is_alive())
+        finally:
+            probe.stop_refresher()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from backend import (
+    BackendUnavailableError,
+    GenerationStats,
+    GenerationTimeoutError,
+    OllamaBackend,
+    OllamaBackendOptions,
+    OllamaMode,
+    guarded_stream,
+)
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
+from core.metrics import REGISTRY
+
+
+def _source(chunks, delays, closed=None):
+    """Yields chunks[i] after sleeping delays[i], then a stats item."""
+
+    def factory(scope):
+        try:
+            for chunk, delay in zip(chunks, delays):
+                time.sleep(delay)
+                yield chunk
+            yield GenerationStats(eval_count=len(chunks))
+        finally:
+            if closed is not None:
+                closed.set()
+
+    return factory
+
+
+def _failing(scope):
+    raise BackendUnavailableError("down")
+    yield  # pragma: no cover
+
+
+class GuardedStreamTests(unittest.TestCase):
+    def test_idle_timeout_after_first_chunk(self):
+        closed = threading.Event()
+        stream = guarded_stream(
+            [("http://a", _source(["A", "B", "C"], [0.2, 0.0, 0.5], closed))], idle_timeout_sec=0.1
+        )
+        received = []
+        # 首个分片之前的 0.2s 不算空闲
+        with self.assertRaises(GenerationTimeoutError):
+            for item in stream:
+                received.append(item)
+        self.assertEqual(received, ["A", "B"])
+        self.assertTrue(closed.wait(1.0))  # 卡住的上游在下一个分片到达时被关掉
+
+    def test_deadline(self):
+        started = time.perf_counter()
+        with self.assertRaises(GenerationTimeoutError):
+            list(guarded_stream([("http://a", _source(["A"] * 10, [0.05] * 10))], deadline_sec=0.15))
+        self.assertLess(time.perf_counter() - started, 0.4)
+
+    def test_hedge_wins_and_loser_is_cancelled(self):
+        loser_closed = threading.Event()
+        items = list(guarded_stream(
+            [
+                ("http://slow", _source(["slow"], [0.3, 0.0], loser_closed)),
+                ("http://fast", _source(["fast"], [0.0])),
+            ],
+            hedge_after_sec=0.05,
+        ))
+        self.assertEqual(items[0], "fast")
+        self.assertEqual(items[-1].host, "http://fast")
+        self.assertTrue(loser_closed.wait(1.0))
+        self.assertIn('ollama_hedge_wins_total{winner="hedge"}', REGISTRY.render())
+
+    def test_primary_failure_fails_over_immediately(self):
+        started = time.perf_counter()
+        items = list(guarded_stream(
+            [("http://down", _failing), ("http://up", _source(["ok"], [0.0]))], hedge_after_sec=5.0
+        ))
+        self.assertEqual(items[0], "ok")
+        self.assertLess(time.perf_counter() - started, 1.0)
+        with self.assertRaises(BackendUnavailableError):
+            list(guarded_stream([("http://down", _failing)]))
+
+
+class BackendHedgeTests(unittest.TestCase):
+    def test_backend_hedges_to_faster_host(self):
+        slow_cfg = MockOllamaConfig(ttft_sec=1.0, tokens_per_sec=0)
+        with MockOllama(slow_cfg) as slow, MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0)) as fast:
+            backend = OllamaBackend(OllamaBackendOptions(
+                mode=OllamaMode.HTTP, host=slow.url, hedge_hosts=[fast.url], hedge_after_sec=0.1, coalesce=False,
+            ))
+            started = time.perf_counter()
+            stream = backend.stream_generate("Translate.\n\nhello")
+            self.assertTrue("".join(stream).endswith("hello"))
+            self.assertLess(time.perf_counter() - started, 0.8)
+            self.assertEqual(stream.stats.host, fast.url)
+
+    def test_timeout_drops_the_connection_and_releases_the_slot_as_error(self):
+        cfg = MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0, stall_rate=1.0, stall_sec=5.0)
+        with MockOllama(cfg) as mock:
+            backend = OllamaBackend(OllamaBackendOptions(
+                mode=OllamaMode.HTTP, host=mock.url, deadline_sec=0.3, coalesce=False,
+            ))
+            earlier = set(threading.enumerate())
+            controller = backend.concurrency_controller()
+            limit = controller.limit
+            started = time.perf_counter()
+            with self.assertRaises(GenerationTimeoutError):
+                "".join(backend.stream_generate("Translate.\n\none two three four five six"))
+            self.assertLess(time.perf_counter() - started, 1.0)
+            self.assertEqual(controller.in_flight, 0)
+            self.assertLess(controller.limit, limit)
+            # 连接被断开，读线程不用等 stall_sec / socket 超时就退出
+            deadline = time.perf_counter() + 1.0
+            pumps = [t for t in threading.enumerate() if t.name == "ollama-hedge" and t not in earlier]
+            for pump in pumps:
+                pump.join(max(0.0, deadline - time.perf_counter()))
+            self.assertFalse(any(pump.is_alive() for pump in pumps))
+
+
+if __name__ == "__main__":
+    unittest.main()
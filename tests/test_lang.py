@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import unittest
+import unittest.mock
+
+from core import lang as lang_module
+from core.lang import detect_lang_distribution, detect_source_lang, identify_lang
+
+
+class IdentifyLangTests(unittest.TestCase):
+    def test_scripts(self):
+        cases = {
+            "这是一个测试句子。": "zh",
+            "これはテストです。": "ja",
+            "이것은 테스트입니다.": "ko",
+            "Это тестовое предложение.": "ru",
+        }
+        for text, lang in cases.items():
+            with self.subTest(text=text):
+                guess = identify_lang(text)
+                self.assertEqual(guess.lang, lang)
+                self.assertGreaterEqual(guess.confidence, 0.9)
+
+    def test_latin_languages(self):
+        cases = {
+            "This is one of the best tools for the job.": "en",
+            "Le chat est sur la table avec les enfants.": "fr",
+            "Der Hund ist nicht in dem Haus.": "de",
+            "El perro está en la casa con los niños.": "es",
+        }
+        for text, lang in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(identify_lang(text).lang, lang)
+
+    def test_close_romance_languages_are_not_confident(self):
+        # 目标语言是 es / fr 时，这些行不能被当作“已是目标语言”原样跳过
+        for text in (
+            "O gato está na mesa",
+            "Não é uma coisa que se faz",
+            "Il gatto è sul tavolo",
+            "Questo è un problema per la squadra",
+        ):
+            with self.subTest(text=text):
+                self.assertLess(identify_lang(text).confidence, 0.8)
+        for text, lang in {"El gato está en la mesa": "es", "Le chat est sur la table": "fr"}.items():
+            with self.subTest(text=text):
+                guess = identify_lang(text)
+                self.assertEqual(guess.lang, lang)
+                self.assertGreaterEqual(guess.confidence, 0.8)
+
+    def test_weak_evidence_has_low_confidence(self):
+        self.assertLess(identify_lang("Hello").confidence, 0.5)
+        self.assertLess(identify_lang("使用 Python 和 JavaScript 编程").confidence, 0.8)
+        self.assertEqual(identify_lang("12345").lang, "und")
+
+
+class DetectLangDistributionTests(unittest.TestCase):
+    def test_ranked_distribution(self):
+        ranked = detect_lang_distribution("这是中文内容，还有一点点。\nA short English line.")
+        self.assertEqual(ranked[0][0], "zh")
+        self.assertEqual({lang for lang, _ in ranked}, {"zh", "en"})
+        self.assertAlmostEqual(sum(share for _, share in ranked), 1.0, places=3)
+
+    def test_large_document_is_sampled_across_strata(self):
+        text = "日本語の文章です。" * 50_000 + "这是中文的段落。" * 10_000
+        ranked = detect_lang_distribution(text)
+        self.assertEqual(ranked[0][0], "ja")
+        self.assertEqual(detect_source_lang(text), "ja")
+
+    def test_result_is_cached_by_content(self):
+        text = "Cached document about the weather and the sea." * 10
+        first = detect_lang_distribution(text)
+        with unittest.mock.patch.object(lang_module, "script_histogram", side_effect=AssertionError):
+            self.assertEqual(detect_lang_distribution(text), first)
+
+    def test_numpy_histogram_matches_fallback(self):
+        try:
+            import numpy as np  # type: ignore
+        except Exception:
+            self.skipTest("numpy not installed")
+        sample = "混合 text ありがとう 한국어 Привет ÄÖü 123 \ud83d"
+        self.assertEqual(
+            lang_module._script_histogram_numpy(np, sample),
+            lang_module._script_histogram_counter(sample),
+        )
+
+    def test_lone_surrogate(self):
+        # 截断的 emoji 只剩半个代理对
+        self.assertEqual(detect_source_lang("这是一段中文文本\ud83d"), "zh")
+
+    def test_blank_input(self):
+        self.assertEqual(detect_lang_distribution("   "), [])
+        self.assertIsNone(detect_source_lang(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
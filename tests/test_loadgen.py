@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import unittest
+
+from benchmarks.loadgen import (
+    LoadOptions,
+    RequestResult,
+    parse_mix,
+    run_bridge_request,
+    run_load,
+    start_api_server,
+    summarize,
+)
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
+
+
+class LoadGenTests(unittest.TestCase):
+    def setUp(self):
+        self.mock = MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0, parallel=4)).start()
+        self.addCleanup(self.mock.stop)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("clipboard=3, mixed"), {"clipboard": 3.0, "mixed": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("novel=1")
+
+    def test_api_target_open_loop(self):
+        server, url = start_api_server()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        opt = LoadOptions(target="api", requests=3, rate=50.0, mix={"clipboard": 1.0})
+        results, wall = run_load(opt, self.mock.url, url)
+        summary = summarize(results, wall)
+        self.assertEqual(summary["ok"], 3, summary["error_messages"])
+        self.assertEqual(summary["ttft"], {})
+        self.assertIn("p99_ms", summary["latency"])
+
+    def test_bridge_target_reports_ttft(self):
+        opt = LoadOptions(target="bridge", requests=1, mix={"clipboard": 1.0})
+        results, wall = run_load(opt, self.mock.url)
+        summary = summarize(results, wall)
+        self.assertEqual(summary["ok"], 1, summary["error_messages"])
+        self.assertLessEqual(results[0].ttft_sec, results[0].latency_sec)
+
+    def test_ttft_ignores_segments_that_skip_the_model(self):
+        with MockOllama(MockOllamaConfig(ttft_sec=0.5, tokens_per_sec=0)) as slow:
+            payload = {
+                "text": "12345\n\nHello there.",  # 纯数字段直通，不调用模型
+                "source_lang": "en",
+                "target_lang": "zh",
+                "mode": "http",
+                "host": slow.url,
+            }
+            result = RequestResult(target="bridge", doc="custom", chars=len(payload["text"]), started_at=0.0)
+            run_bridge_request(payload, result, timeout_sec=30.0)
+        self.assertTrue(result.ok, result.error)
+        self.assertGreaterEqual(result.ttft_sec, 0.5)
+
+    def test_errors_are_counted(self):
+        opt = LoadOptions(target="bridge", requests=1, mix={"clipboard": 1.0})
+        results, wall = run_load(opt, "http://127.0.0.1:9")
+        summary = summarize(results, wall)
+        self.assertEqual(summary["error_rate"], 1.0)
+        self.assertTrue(results[0].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import unittest
+
+import re
+
+from benchmarks.mock_ollama import echo_source
+from core import (
+    MaskOptions, PipelineOptions, PromptOptions, PromptPreset, TerminologyHint, mask_spans, run_pipeline, unmask_spans,
+)
+from core.mask import approx_tokens, unmask_partial
+from core.prompt import build_prompt
+
+# 够长，遮挡省下的 token 抵得过占位符说明
+_LONG_URL = (
+    "https://example.com/docs/getting-started/installation/linux/package-managers"
+    "?version=2.4.1&arch=x86_64&channel=stable&mirror=primary&ref=sidebar-navigation"
+    "#configure-the-package-index-and-verify-the-signing-keys"
+)
+
+
+def _literal_model(prompt: str) -> str:
+    """Echoes the source, but like the real model drops {n} unless the prompt says to keep them."""
+    out = echo_source(prompt)
+    if "{1}、{2}" not in prompt and "{1} and {2}" not in prompt:
+        out = re.sub(r"\{\d+\}", "", out)
+    return out
+
+
+class MaskSpansTests(unittest.TestCase):
+    def test_verbatim_spans_become_placeholders(self):
+        text = "请访问 https://example.com/docs。运行 `pip install -e .`，共 12,345 个文件在 /usr/local/bin 下"
+        masked = mask_spans(text)
+
+        self.assertEqual(masked.text, "请访问 {1}。运行 {2}，共 {3} 个文件在 {4} 下")
+        self.assertEqual(
+            masked.spans,
+            ["https://example.com/docs", "`pip install -e .`", "12,345", "/usr/local/bin"],
+        )
+        self.assertGreater(masked.tokens_saved, 0)
+        self.assertEqual(unmask_spans(masked.text, masked), text)
+
+    def test_short_spans_and_existing_placeholders_are_left_alone(self):
+        self.assertFalse(mask_spans("3 个苹果").masked)
+        self.assertFalse(mask_spans("see {1} at https://example.com").masked)
+        self.assertFalse(mask_spans("https://example.com", MaskOptions(urls=False)).masked)
+
+    def test_unmask_requires_every_placeholder_exactly_once(self):
+        masked = mask_spans("<sn>加粗</sn>文本")
+        self.assertEqual(unmask_spans("{1}Bold{ 2 } text", masked), "<sn>Bold</sn> text")
+        self.assertIsNone(unmask_spans("{1}Bold text", masked))
+        self.assertIsNone(unmask_spans("{1}Bold{2}{2}", masked))
+        self.assertIsNone(unmask_spans("{1}Bold{2}{3}", masked))
+
+    def test_partial_unmask_hides_half_received_placeholder(self):
+        masked = mask_spans("见 https://example.com/a 和 https://example.com/b")
+        self.assertEqual(unmask_partial("See {1} and {", masked), "See https://example.com/a and ")
+
+
+class PipelineMaskTests(unittest.TestCase):
+    def test_lost_placeholder_falls_back_to_unmasked_prompt(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return "译文：See the docs" if len(prompts) == 1 else f"译文：See {_LONG_URL}"
+
+        pairs, report = run_pipeline(
+            f"参见 {_LONG_URL}",
+            generate=generate,
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+
+        self.assertIn("{1}", prompts[0])
+        self.assertIn(_LONG_URL, prompts[1])
+        self.assertEqual(pairs[0].target, f"See {_LONG_URL}")
+        self.assertEqual(report.mask_fallbacks, 1)
+        self.assertTrue(report.reports[0].mask_fallback)
+
+    def test_restored_spans_report_tokens_saved(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return "译文：See {1}"
+
+        pairs, report = run_pipeline(f"参见 {_LONG_URL}", generate=generate, opt=PipelineOptions(), return_report=True)
+        self.assertEqual(pairs[0].target, f"See {_LONG_URL}")
+        self.assertEqual(report.reports[0].masked_spans, 1)
+        # 省下的是净值：扣掉了占位符说明
+        unmasked = build_prompt(f"参见 {_LONG_URL}", PromptOptions(target_lang="en"))
+        self.assertEqual(report.mask_tokens_saved, approx_tokens(unmasked) - approx_tokens(prompts[0]))
+
+    def test_short_spans_are_not_worth_the_placeholder_note(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return "译文：See https://example.com/docs"
+
+        _, report = run_pipeline(
+            "参见 https://example.com/docs", generate=generate, opt=PipelineOptions(), return_report=True
+        )
+        self.assertEqual(report.reports[0].masked_spans, 0)
+        self.assertEqual(report.mask_tokens_saved, 0)
+        self.assertNotIn("{1}", prompts[0])
+
+    def test_real_templates_keep_placeholders(self):
+        text = f"参见 {_LONG_URL} 和 /usr/local/share/models"
+        presets = {
+            "zh_xx": PromptOptions(source_lang="zh", target_lang="en"),
+            "xx_xx": PromptOptions(source_lang="ja", target_lang="en"),
+            "terminology": PromptOptions(target_lang="en", terminology=TerminologyHint("参见", "See")),
+            "contextual": PromptOptions(target_lang="en", preset=PromptPreset.CONTEXTUAL),
+            "markdown": PromptOptions(target_lang="en", preset=PromptPreset.MARKDOWN),
+            "formatted_zh": PromptOptions(target_lang="zh", src_text_with_format=f"<s1>{text}</s1>"),
+        }
+        for name, prompt_opt in presets.items():
+            with self.subTest(preset=name):
+                prompts: list[str] = []
+
+                def generate(prompt: str) -> str:
+                    prompts.append(prompt)
+                    return _literal_model(prompt)
+
+                _, report = run_pipeline(
+                    text, generate=generate, opt=PipelineOptions(prompt_opt=prompt_opt), return_report=True
+                )
+                self.assertEqual(report.mask_fallbacks, 0)
+                self.assertEqual(len(prompts), 1)
+                # 格式翻译的 prompt 里是带标签的原文，不做遮挡
+                self.assertEqual(report.reports[0].masked_spans, 0 if name == "formatted_zh" else 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from core import PipelineOptions, run_pipeline
+from core.metrics import SEGMENTS, MetricsRegistry
+from python_backend.api_server import build_server
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    def test_text_exposition_format(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("demo_requests_total", "Requests.", ("path",))
+        requests.labels("/a").inc()
+        requests.labels(path='/"b"').inc(2)
+        latency = registry.histogram("demo_seconds", "Latency.", (0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+        registry.gauge("demo_depth", "Depth.", fn=lambda: 4)
+
+        text = registry.render()
+
+        self.assertIn("# TYPE demo_requests_total counter", text)
+        self.assertIn('demo_requests_total{path="/a"} 1', text)
+        self.assertIn('demo_requests_total{path="/\\"b\\""} 2', text)
+        self.assertIn('demo_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('demo_seconds_bucket{le="1"} 3', text)
+        self.assertIn('demo_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn("demo_seconds_sum 3.65", text)
+        self.assertIn("demo_seconds_count 4", text)
+        self.assertIn("demo_depth 4", text)
+
+    def test_registering_twice_returns_same_metric(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("x_total", "x"), registry.counter("x_total", "x"))
+
+    def test_pipeline_updates_segment_counters(self):
+        before = SEGMENTS.value("passthrough"), SEGMENTS.value("translated"), SEGMENTS.value("deduplicated")
+        run_pipeline("你好\n42\n你好", generate=lambda prompt: "译文：Hi", opt=PipelineOptions())
+        after = SEGMENTS.value("passthrough"), SEGMENTS.value("translated"), SEGMENTS.value("deduplicated")
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1, 1])
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    def test_metrics_endpoint_serves_text_format(self):
+        server = build_server(port=0)
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            try:
+                urllib.request.urlopen(f"{base}/nope", timeout=5)
+            except urllib.error.HTTPError:
+                pass
+            with urllib.request.urlopen(f"{base}/metrics", timeout=5) as resp:
+                content_type = resp.headers["Content-Type"]
+                body = resp.read().decode("utf-8")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn('translator_http_requests_total{method="GET",path="other",status="404"}', body)
+        # 前一个请求在响应发出前就已记账，只剩这次抓取本身在处理中
+        self.assertIn("\ntranslator_http_requests_in_progress 1\n", body)
+        self.assertIn("# TYPE translator_segment_seconds histogram", body)
+        self.assertIn("ollama_generations_in_flight", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
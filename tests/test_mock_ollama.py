@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from backend import BackendRequestError, ModelNotFoundError, OllamaBackend, OllamaBackendOptions, OllamaMode
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig, echo_source, tokenize
+from core.prompt import PromptOptions, build_prompt
+from python_backend.models import TranslationRequest
+from python_backend.services.translation_service import TranslationService
+
+
+def _backend(mock: MockOllama, **kwargs) -> OllamaBackend:
+    return OllamaBackend(OllamaBackendOptions(mode=OllamaMode.HTTP, host=mock.url, coalesce=False, **kwargs))
+
+
+class MockOllamaTests(unittest.TestCase):
+    def test_echo_source_extracts_segment_from_prompt(self):
+        prompt = build_prompt("Hello there", PromptOptions(target_lang="zh"))
+        self.assertEqual(echo_source(prompt), "Hello there")
+
+    def test_stream_reports_stats_on_done_frame(self):
+        with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0)) as mock:
+            stream = _backend(mock).stream_generate(build_prompt("Good morning everyone", PromptOptions(target_lang="zh")))
+            text = "".join(stream)
+        self.assertEqual(text, "Good morning everyone")
+        self.assertIsNotNone(stream.stats)
+        self.assertEqual(stream.stats.eval_count, len(tokenize(text)))
+        self.assertEqual(stream.stats.done_reason, "stop")
+
+    def test_num_predict_truncates_with_length_reason(self):
+        with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0)) as mock:
+            result = _backend(mock).generate("Translate.\n\n" + "word " * 50, {"num_predict": 3})
+        self.assertEqual(result.stats.eval_count, 3)
+        self.assertEqual(result.stats.done_reason, "length")
+
+    def test_parallel_slots_bound_concurrency(self):
+        cfg = MockOllamaConfig(ttft_sec=0.05, tokens_per_sec=0, parallel=2)
+        with MockOllama(cfg) as mock:
+            backend = _backend(mock)
+            threads = [threading.Thread(target=backend.generate, args=(f"Translate.\n\nline {i}",)) for i in range(5)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(mock.state.requests, 5)
+            self.assertEqual(mock.state.max_active, 2)
+
+    def test_cold_model_pays_load_delay_once(self):
+        cfg = MockOllamaConfig(load_delay_sec=0.2, preloaded=False)
+        with MockOllama(cfg) as mock:
+            backend = _backend(mock)
+            self.assertFalse(backend.is_model_loaded())
+            self.assertAlmostEqual(backend.warm_up(), 0.2, places=2)
+            self.assertTrue(backend.is_model_loaded())
+            self.assertEqual(backend.warm_up(), 0.0)
+
+    def test_fault_injection(self):
+        with MockOllama(MockOllamaConfig(error_rate=1.0)) as mock:
+            with self.assertRaises(BackendRequestError):
+                _backend(mock).generate("Translate.\n\nhello")
+        with MockOllama(MockOllamaConfig(models=["other"])) as mock:
+            with self.assertRaises(ModelNotFoundError):
+                _backend(mock).generate("Translate.\n\nhello")
+        with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0, drop_rate=1.0)) as mock:
+            stream = _backend(mock).stream_generate("Translate.\n\n" + "word " * 20)
+            text = "".join(stream)
+        # 连接中途断开：只拿到部分输出，也没有统计帧
+        self.assertLess(len(text), len("word " * 20))
+        self.assertIsNone(stream.stats)
+
+    def test_service_translates_against_mock(self):
+        with MockOllama(MockOllamaConfig(ttft_sec=0.01, tokens_per_sec=2000)) as mock:
+            started = time.perf_counter()
+            response = TranslationService().translate(
+                TranslationRequest(text="Hello world\nSee you soon", source_lang="en", target_lang="zh",
+                                   mode="http", host=mock.url)
+            )
+            elapsed = time.perf_counter() - started
+        self.assertEqual(response.output_text, "Hello world\nSee you soon")
+        self.assertGreater(elapsed, 0.02)
+        self.assertIsNotNone(response.segments[0].stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
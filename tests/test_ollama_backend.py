@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend import KeepAliveHeartbeat, OllamaBackend, OllamaBackendOptions, OllamaMode
+
+
+class _FakeOllama(BaseHTTPRequestHandler):
+    loaded: list[str] = []
+    requests: list[tuple[str, dict]] = []
+
+    def do_GET(self):  # noqa: N802
+        if self.path == "/api/ps":
+            self._reply({"models": [{"name": m, "model": m} for m in self.loaded]})
+            return
+        self._reply({"version": "0.9.0"})
+
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.path, body))
+        if self.path == "/api/generate":
+            already = body["model"] in self.loaded
+            if not already:
+                self.loaded.append(body["model"])
+            self._reply({"done": True, "load_duration": 0 if already else 1_500_000_000})
+            return
+        done = {"done": True, "done_reason": "stop", "prompt_eval_count": 12, "prompt_eval_duration": 40_000_000,
+                "eval_count": 8, "eval_duration": 200_000_000, "load_duration": 1_000_000, "total_duration": 250_000_000}
+        if body.get("stream"):
+            lines = [
+                {"message": {"role": "assistant", "content": "译文："}, "done": False},
+                {"message": {"role": "assistant", "content": "OK"}, "done": False},
+                {"message": {"role": "assistant", "content": ""}, **done},
+            ]
+            data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._reply({"message": {"role": "assistant", "content": "译文：OK"}, **done})
+
+    def _reply(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+
+class OllamaBackendHTTPTests(unittest.TestCase):
+    def setUp(self):
+        _FakeOllama.loaded = []
+        _FakeOllama.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeOllama)
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        host = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.backend = OllamaBackend(OllamaBackendOptions(mode=OllamaMode.HTTP, model="demo", host=host))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_carry_keep_alive(self):
+        self.assertEqual(self.backend.generate("hi"), "译文：OK")
+        path, body = _FakeOllama.requests[-1]
+        self.assertEqual(path, "/api/chat")
+        self.assertEqual(body["keep_alive"], "30m")
+
+    def test_generate_returns_timing_stats(self):
+        result = self.backend.generate("hi")
+        self.assertEqual(result, "译文：OK")
+        self.assertEqual(result.stats.prompt_eval_count, 12)
+        self.assertEqual(result.stats.eval_count, 8)
+        self.assertAlmostEqual(result.stats.tokens_per_sec, 40.0)
+        self.assertEqual(result.stats.done_reason, "stop")
+
+    def test_stream_exposes_stats_after_done_frame(self):
+        stream = self.backend.stream_generate("hi")
+        self.assertIsNone(stream.stats)
+        self.assertEqual("".join(stream), "译文：OK")
+        self.assertEqual(stream.stats.eval_duration, 200_000_000)
+        self.assertEqual(stream.stats.to_dict()["prompt_tokens_per_sec"], 300.0)
+
+    def test_per_request_options_are_merged_over_config(self):
+        self.backend.generate("hi", options={"num_predict": 64, "stop": ["\n\nNote:"]})
+        _, body = _FakeOllama.requests[-1]
+        self.assertEqual(body["options"], {"temperature": 0.0, "num_predict": 64, "stop": ["\n\nNote:"]})
+        self.assertEqual(self.backend.cfg.options, {"temperature": 0.0})
+
+    def test_warm_up_preloads_with_empty_prompt(self):
+        self.assertFalse(self.backend.is_model_loaded())
+        self.assertAlmostEqual(self.backend.warm_up(), 1.5)
+        path, body = _FakeOllama.requests[-1]
+        self.assertEqual((path, body["prompt"], body["keep_alive"]), ("/api/generate", "", "30m"))
+        # 不带 tag 的模型名按 :latest 处理
+        _FakeOllama.loaded = ["demo:latest"]
+        self.assertTrue(self.backend.is_model_loaded())
+
+    def test_heartbeat_refreshes_model(self):
+        heartbeat = KeepAliveHeartbeat(self.backend, interval_sec=60)
+        heartbeat.start()
+        try:
+            for _ in range(100):
+                if _FakeOllama.requests:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            heartbeat.stop()
+        self.assertEqual(_FakeOllama.requests[0][0], "/api/generate")
+
+    def test_is_model_loaded_unknown_when_unreachable(self):
+        backend = OllamaBackend(OllamaBackendOptions(mode=OllamaMode.HTTP, host="http://127.0.0.1:9"))
+        self.assertIsNone(backend.is_model_loaded())
+
+
+if __name__ == "__main__":
+    unittest.main()
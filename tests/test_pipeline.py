@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import time
+import unittest
+
+from backend import GenerationResult, GenerationStats
+from core import PipelineOptions, SegmentKind, classify_segment, run_pipeline
+
+
+class SegmentClassifierTests(unittest.TestCase):
+    def test_non_linguistic_lines_are_classified(self):
+        cases = {
+            "12,345.67": SegmentKind.NUMBER,
+            "https://example.com/a?b=1": SegmentKind.URL,
+            "someone@example.com": SegmentKind.EMAIL,
+            "/usr/local/bin/ollama": SegmentKind.PATH,
+            "C:\\Users\\demo\\a.txt": SegmentKind.PATH,
+            "3f786850e387550fdab836ed7e6dc881de23001b": SegmentKind.HASH,
+            "2024-05-01T10:20:30Z": SegmentKind.TIMESTAMP,
+            "00:01:02,500 --> 00:01:04,000": SegmentKind.TIMESTAMP,
+            "const x = foo(1);": SegmentKind.CODE,
+            "---": SegmentKind.SYMBOLS,
+            "   ": SegmentKind.EMPTY,
+        }
+        for text, kind in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(classify_segment(text), kind)
+
+    def test_prose_is_text(self):
+        for text in ["你好，世界", "Hello world;", "The value is 42.", "TCP/IP", "1. Introduction"]:
+            with self.subTest(text=text):
+                self.assertEqual(classify_segment(text), SegmentKind.TEXT)
+
+    def test_prose_with_code_like_punctuation_is_text(self):
+        for text in [
+            "Requirements (see below):",
+            "See the manual (chapter 3);",
+            "Note: use the (new) API;",
+            "Call reset() to clear the cache;",
+            "| Name | Age |",
+            "<b>Hello</b>",
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(classify_segment(text), SegmentKind.TEXT)
+        for text in ["def foo(x):", "if (a > b) {", "public static void main(String[] args) {", "<br/>"]:
+            with self.subTest(text=text):
+                self.assertEqual(classify_segment(text), SegmentKind.CODE)
+
+
+class PipelinePassthroughTests(unittest.TestCase):
+    def test_passthrough_segments_skip_generate(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return "译文：Hello"
+
+        pairs, report = run_pipeline(
+            "你好\nhttps://example.com\n2024-05-01",
+            generate=generate,
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+
+        self.assertEqual(len(prompts), 1)
+        self.assertEqual([p.target for p in pairs], ["Hello", "https://example.com", "2024-05-01"])
+        self.assertEqual(report.passthrough_counts, {"url": 1, "timestamp": 1})
+        self.assertEqual(report.passthrough_total, 2)
+        self.assertEqual(report.translated_count, 1)
+        self.assertTrue(report.reports[1].passthrough)
+
+    def test_passthrough_can_be_disabled(self):
+        pairs = run_pipeline(
+            "12345",
+            generate=lambda prompt: "译文：12345",
+            opt=PipelineOptions(passthrough_non_linguistic=False),
+        )
+        self.assertEqual(pairs[0].target, "12345")
+
+
+class PipelineDedupTests(unittest.TestCase):
+    def test_repeated_segments_are_generated_once(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return f"译文：T{len(prompts)}"
+
+        pairs, report = run_pipeline(
+            "错误\n警告\n错误\n错误",
+            generate=generate,
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+
+        self.assertEqual(len(prompts), 2)
+        self.assertEqual([p.target for p in pairs], ["T1", "T2", "T1", "T1"])
+        self.assertEqual((report.dedup_total, report.dedup_unique, report.dedup_hits), (4, 2, 2))
+        self.assertAlmostEqual(report.dedup_ratio, 0.5)
+        self.assertEqual(report.translated_count, 2)
+        self.assertTrue(report.reports[2].deduplicated)
+
+    def test_dedup_can_be_disabled(self):
+        prompts: list[str] = []
+
+        def generate(prompt: str) -> str:
+            prompts.append(prompt)
+            return "译文：T"
+
+        run_pipeline("错误\n错误", generate=generate, opt=PipelineOptions(dedup_segments=False))
+        self.assertEqual(len(prompts), 2)
+
+    def test_dedup_stats_count_only_model_bound_segments(self):
+        _, report = run_pipeline(
+            "错误\n12345\n12345\n---\n---\n错误\n警告",
+            generate=lambda prompt: "译文：T",
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+        self.assertEqual((report.dedup_total, report.dedup_unique, report.dedup_hits), (3, 2, 1))
+
+
+class PipelineStatsTests(unittest.TestCase):
+    def test_backend_stats_are_attached_to_pairs_and_reports(self):
+        stats = GenerationStats(prompt_eval_count=5, eval_count=3, eval_duration=100_000_000)
+        pairs, report = run_pipeline(
+            "你好\n你好",
+            generate=lambda prompt: GenerationResult("译文：Hello", stats),
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+        self.assertIs(pairs[0].stats, stats)
+        self.assertIs(report.reports[0].stats, stats)
+        # 复用的段落没有自己的生成开销
+        self.assertIsNone(pairs[1].stats)
+
+
+class PipelineDeadlineTests(unittest.TestCase):
+    def test_segments_past_the_deadline_are_left_untranslated(self):
+        def generate(prompt):
+            time.sleep(0.1)
+            return "译文：done"
+
+        text = "first line\nsecond line\nthird line\n12345"
+        pairs, report = run_pipeline(text, generate, PipelineOptions(deadline_sec=0.15), return_report=True)
+        self.assertEqual([p.target for p in pairs], ["done", "done", "third line", "12345"])
+        self.assertEqual([p.untranslated for p in pairs], [False, False, True, False])
+        self.assertEqual(report.untranslated_segments, [2])
+        self.assertTrue(report.reports[2].untranslated)
+
+    def test_prefetched_results_are_used_until_the_deadline(self):
+        def generate(prompt):
+            time.sleep(0.3 if "slow" in prompt else 0.0)
+            return "译文：ok"
+
+        started = time.perf_counter()
+        opt = PipelineOptions(deadline_sec=0.1, max_workers=3)
+        pairs = run_pipeline("fast one\nslow one\nfast two", generate, opt)
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual([p.target for p in pairs], ["ok", "slow one", "ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+import unittest
+from pathlib import Path
+
+from core.postprocess import (
+    _MARKER_PREFIXES, _TAIL_WINDOW, PostProcessOptions, StreamingExtractor, extract_translation,
+)
+
+CORPUS_PATH = Path(__file__).parent / "data" / "postprocess_corpus.json"
+
+
+def _options_from_key(key: str) -> PostProcessOptions:
+    flags = dict(item.split("=") for item in key.split(","))
+    return PostProcessOptions(**{name: value == "1" for name, value in flags.items()})
+
+
+class ExtractTranslationCorpusTests(unittest.TestCase):
+    """Outputs were recorded from the original rfind/re.sub implementation."""
+
+    def test_output_identical_on_recorded_corpus(self):
+        cases = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+        self.assertGreater(len(cases), 40)
+        for case in cases:
+            for key, expected in case["expected"].items():
+                with self.subTest(raw=case["raw"][:40], options=key):
+                    self.assertEqual(extract_translation(case["raw"], _options_from_key(key)), expected)
+
+    def test_none_input(self):
+        self.assertEqual(extract_translation(None), "")
+
+
+class StreamingExtractorTests(unittest.TestCase):
+    def test_converges_to_extract_translation(self):
+        cases = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+        for case in cases:
+            raw = case["raw"]
+            for size in (1, 2, 5, 64):
+                with self.subTest(raw=raw[:40], chunk_size=size):
+                    extractor = StreamingExtractor()
+                    for i in range(0, len(raw), size):
+                        extractor.feed(raw[i:i + size])
+                    self.assertEqual(extractor.raw, raw)
+                    self.assertEqual(extractor.finish(), extract_translation(raw))
+
+    def test_partials_hide_markers_labels_and_quotes(self):
+        extractor = StreamingExtractor()
+        partials = [extractor.feed(chunk) for chunk in ["译", "文：", "“Hel", "lo wor", "ld”"]]
+        self.assertEqual(partials, ["", "", "Hel", "Hello wor", "Hello world"])
+
+    def test_marker_after_echoed_prompt_resets_partial(self):
+        extractor = StreamingExtractor()
+        self.assertEqual(extractor.feed("将以下文本翻译为English：\n今天"), "将以下文本翻译为English：\n今天")
+        self.assertEqual(extractor.feed("\nTransla"), "将以下文本翻译为English：\n今天")
+        self.assertEqual(extractor.feed("tion: Today"), "Today")
+        self.assertEqual(extractor.finish(), "Today")
+
+    def test_long_stream_keeps_a_bounded_tail(self):
+        paragraph = "assistant: “The quick brown fox jumps over the lazy dog.  \n\n\n\nSecond line \t\nend"
+        raw = "说明文字\n译文：" + "\n\n".join([paragraph] * 40) + "”"
+        for size in (1, 3, 17):
+            extractor = StreamingExtractor()
+            for i in range(0, len(raw), size):
+                sofar = raw[:i + size]
+                partial = extractor.feed(raw[i:i + size])
+                self.assertLessEqual(len(extractor._tail), _TAIL_WINDOW + size)
+                # 开头还没写完的标签、末尾半个 marker 本来就不显示
+                if i > 40 and not any(sofar.endswith(prefix) for prefix in _MARKER_PREFIXES):
+                    self.assertEqual(partial, extract_translation(sofar), (size, i))
+            self.assertEqual(extractor.partial, extract_translation(raw))
+
+    def test_partials_honour_prefer_first_marker(self):
+        opt = PostProcessOptions(prefer_last_marker=False)
+        raw = "译文：Hello 译文：world Output: done"
+        extractor = StreamingExtractor(opt)
+        for ch in raw:
+            extractor.feed(ch)
+        self.assertEqual(extractor.partial, extract_translation(raw, opt))
+        self.assertEqual(extractor.partial, "done")
+        extractor = StreamingExtractor(opt)
+        for ch in "译文：Hello 译文：world":
+            extractor.feed(ch)
+        self.assertEqual(extractor.partial, "Hello 译文：world")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from backend import (
+    Cassette,
+    CassetteMissError,
+    GenerationStats,
+    GenerationStream,
+    OllamaBackend,
+    RecordingBackend,
+    ReplayBackend,
+    recording_factory,
+    replay_factory,
+)
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
+from core.pipeline import PipelineOptions, join_translations, run_pipeline
+from core.prompt import PromptOptions
+from python_backend.models import TranslationRequest
+from python_backend.services.translation_service import TranslationService
+
+
+class _SlowBackend:
+    """Streams 'Hello world' in three chunks, 20 ms apart."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def stream_generate(self, prompt, options=None):
+        self.calls += 1
+
+        def source():
+            for chunk in ("Hel", "lo ", "world"):
+                time.sleep(0.02)
+                yield chunk
+            yield GenerationStats(eval_count=3, eval_duration=60_000_000)
+
+        return GenerationStream(source())
+
+    def generate(self, prompt, options=None):
+        self.calls += 1
+        return "Hello world"
+
+    def is_model_loaded(self):
+        return True
+
+
+class ReplayTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "cassette.jsonl"
+
+    def _record(self, options=None):
+        recorder = RecordingBackend(_SlowBackend(), Cassette(self.path))
+        stream = recorder.stream_generate("p1", options)
+        self.assertEqual("".join(stream), "Hello world")
+        self.assertEqual(stream.stats.eval_count, 3)
+        self.assertTrue(recorder.is_model_loaded())  # 其余接口透传给被包装的后端
+
+    def test_recorded_stream_replays_chunks_and_stats(self):
+        self._record({"num_predict": 64})
+        line = json.loads(self.path.read_text(encoding="utf-8"))
+        self.assertEqual([text for _, text in line["chunks"]], ["Hel", "lo ", "world"])
+        self.assertTrue(line["complete"])
+
+        replay = ReplayBackend(Cassette(self.path))
+        stream = replay.stream_generate("p1", {"num_predict": 64})
+        self.assertEqual(list(stream), ["Hel", "lo ", "world"])
+        self.assertEqual(stream.stats.eval_count, 3)
+        self.assertEqual(replay.generate("p1", {"num_predict": 64}), "Hello world")
+
+    def test_replay_speed(self):
+        self._record()
+        started = time.perf_counter()
+        list(ReplayBackend(Cassette(self.path), speed=1.0).stream_generate("p1"))
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        started = time.perf_counter()
+        list(ReplayBackend(Cassette(self.path), speed=0).stream_generate("p1"))
+        self.assertLess(time.perf_counter() - started, 0.02)
+
+    def test_option_matching_and_misses(self):
+        self._record({"num_predict": 64})
+        strict = ReplayBackend(Cassette(self.path))
+        with self.assertRaises(CassetteMissError):
+            strict.generate("p1")
+        with self.assertRaises(CassetteMissError):
+            strict.stream_generate("unknown", {"num_predict": 64})
+        loose = ReplayBackend(Cassette(self.path), match_options=False)
+        self.assertEqual(loose.generate("p1"), "Hello world")
+
+    def test_closed_stream_records_partial_output(self):
+        recorder = RecordingBackend(_SlowBackend(), Cassette(self.path))
+        stream = recorder.stream_generate("p1")
+        it = iter(stream)
+        self.assertEqual(next(it), "Hel")
+        stream.close()
+        item = Cassette(self.path).lookup("p1")
+        self.assertEqual(item.output, "Hel")
+        self.assertFalse(item.complete)
+
+    def test_service_and_pipeline_replay_without_ollama(self):
+        request = dict(text="Good morning\nSee you at https://example.com soon", source_lang="en",
+                       target_lang="zh", mode="http")
+        with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=0)) as mock:
+            recorded = TranslationService(backend_factory=recording_factory(self.path, OllamaBackend)).translate(
+                TranslationRequest(host=mock.url, **request)
+            )
+
+        # 回放时指向一个不存在的地址：不会发出任何请求
+        replayed = TranslationService(backend_factory=replay_factory(self.path)).translate(
+            TranslationRequest(host="http://127.0.0.1:9", **request)
+        )
+        self.assertEqual(replayed.output_text, recorded.output_text)
+        self.assertEqual([s.stats for s in replayed.segments], [s.stats for s in recorded.segments])
+
+        # run_pipeline 不带生成参数，用 match_options=False 复用服务录下的输出
+        replay = ReplayBackend(Cassette(self.path), match_options=False)
+        opt = PipelineOptions(prompt_opt=PromptOptions(source_lang="en", target_lang="zh"))
+        self.assertEqual(join_translations(run_pipeline(request["text"], replay.generate, opt)), recorded.output_text)
+
+
+if __name__ == "__main__":
+    unittest.main()
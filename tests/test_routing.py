@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+import unittest
+
+from python_backend.models import TranslationRequest
+from python_backend.services.routing import ModelRouter, RoutingOptions
+from python_backend.services.scheduler import ModelScheduler
+from python_backend.services.translation_service import TranslationService
+
+
+class _ModelEchoBackend:
+    """Answers every prompt with the name of the model it was built for."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+
+    def is_model_loaded(self):
+        return True
+
+    def stream_generate(self, prompt, options=None):
+        return iter([f"译文：{self.cfg.model}"])
+
+
+class ModelRouterTests(unittest.TestCase):
+    def setUp(self):
+        self.router = ModelRouter(RoutingOptions(short_chars=10, long_chars=50, max_jobs=1, max_ttft_sec=1.0))
+        self.models = dict(model="mid", fast_model="small", quality_model="large")
+
+    def test_length_and_mode_rules(self):
+        route = self.router.route
+        self.assertEqual(route("short", **self.models).model, "small")
+        self.assertEqual(route("x" * 30, **self.models).model, "mid")
+        self.assertEqual(route("x" * 60, **self.models).model, "large")
+        self.assertEqual(route("short", markdown=True, **self.models).model, "large")
+        self.assertEqual(route("x" * 60, interactive=True, **self.models).reason, "interactive")
+        # 只配了一个模型时，缺的那一档回落到请求的模型
+        self.assertEqual(route("x" * 60, model="mid", fast_model="small").model, "mid")
+        self.assertEqual(route("x" * 60, model="mid").reason, "disabled")
+
+    def test_downgrades_when_overloaded(self):
+        long_text = "x" * 60
+        self.router.job_started()
+        self.router.job_started()
+        self.assertEqual(self.router.route(long_text, **self.models).reason, "overloaded")
+        self.router.job_finished()
+        self.assertEqual(self.router.route(long_text, **self.models).model, "large")
+
+        for _ in range(5):
+            self.router.observe_ttft(3.0)
+        self.assertEqual(self.router.route(long_text, **self.models).model, "small")
+        for _ in range(10):
+            self.router.observe_ttft(0.1)
+        self.assertEqual(self.router.route(long_text, **self.models).model, "large")
+
+
+class ServiceRoutingTests(unittest.TestCase):
+    def test_segments_record_their_model(self):
+        router = ModelRouter(RoutingOptions(short_chars=10, long_chars=50))
+        service = TranslationService(backend_factory=_ModelEchoBackend, router=router)
+        long_line = "This sentence is long enough to be sent to the quality model."
+        request = TranslationRequest(
+            text=f"Hi there\n{long_line}\nHi there",
+            source_lang="en",
+            target_lang="zh",
+            model="mid",
+            fast_model="small",
+            quality_model="large",
+        )
+        events = list(service.stream_translate(request))
+        completed = events[-1]
+        segments = completed["response"]["segments"]
+        self.assertEqual([s["model"] for s in segments], ["small", "large", "small"])
+        self.assertEqual([s["target"] for s in segments], ["small", "large", "small"])
+        self.assertEqual(completed["dedup_hits"], 1)
+        self.assertIn("large", {e.get("active_segment_model") for e in events})
+
+        request.interactive = True
+        response = service.translate(request)
+        self.assertEqual([s.model for s in response.segments], ["small"] * 3)
+
+    def test_routed_models_take_their_own_scheduler_turns(self):
+        scheduler = ModelScheduler(is_loaded=lambda host, model: None)
+        submitted = []
+        submit = scheduler.submit
+        scheduler.submit = lambda model, hosts: submitted.append(model) or submit(model, hosts)
+        service = TranslationService(
+            backend_factory=_ModelEchoBackend,
+            scheduler=scheduler,
+            router=ModelRouter(RoutingOptions(short_chars=10, long_chars=50)),
+        )
+        # 另一个任务正占着 host 跑大模型
+        blocker = submit("large", ["http://127.0.0.1:11434"])
+        long_line = "This sentence is long enough to be sent to the quality model."
+        request = TranslationRequest(
+            text=f"Hi there\n{long_line}\nBye now",
+            source_lang="en",
+            target_lang="zh",
+            model="mid",
+            fast_model="small",
+            quality_model="large",
+        )
+        events = service.stream_translate(request)
+        queued = next(e for e in events if e["event"] != "started")
+        self.assertEqual((queued["event"], queued["model"]), ("queued", "small"))
+        threading.Timer(0.05, scheduler.release, (blocker,)).start()
+        completed = next(e for e in events if e["event"] == "completed")
+        events.close()
+
+        self.assertEqual([s["target"] for s in completed["response"]["segments"]], ["small", "large", "small"])
+        self.assertEqual(submitted, ["small", "large", "small"])
+        self.assertEqual(scheduler.snapshot()[0]["running"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from python_backend.models import TranslationRequest
+from python_backend.services.scheduler import ModelScheduler, SchedulerOptions
+from python_backend.services.translation_service import TranslationService
+
+
+def _never_loaded(host, model):
+    return None
+
+
+class ModelSchedulerTests(unittest.TestCase):
+    def test_groups_by_model_and_switches_when_drained(self):
+        s = ModelScheduler(is_loaded=_never_loaded)
+        a1 = s.submit("a", ["h"])
+        b1 = s.submit("b", ["h"])
+        a2 = s.submit("a", ["h"])  # 排在 b 后面，但和正在跑的模型相同，先放行
+        self.assertTrue(a1.granted)
+        self.assertFalse(b1.granted)
+        self.assertTrue(a2.granted)
+        self.assertEqual(s.position(b1), 1)
+
+        s.release(a1)
+        self.assertFalse(b1.granted)
+        s.release(a2)
+        self.assertTrue(b1.granted)
+        self.assertEqual(s.snapshot()[0]["active_model"], "b")
+
+    def test_bounded_unfairness(self):
+        s = ModelScheduler(SchedulerOptions(max_batch=2), is_loaded=_never_loaded)
+        first = s.submit("a", ["h"])
+        waiting_b = s.submit("b", ["h"])
+        extra = [s.submit("a", ["h"]) for _ in range(3)]
+        self.assertEqual([t.granted for t in extra], [True, True, False])
+        for t in [first] + extra[:2]:
+            s.release(t)
+        self.assertTrue(waiting_b.granted)
+        self.assertFalse(extra[2].granted)
+        s.release(waiting_b)
+        self.assertTrue(extra[2].granted)
+
+    def test_max_wait_stops_admitting_active_model(self):
+        s = ModelScheduler(SchedulerOptions(max_wait_sec=0.0), is_loaded=_never_loaded)
+        first = s.submit("a", ["h"])
+        waiting_b = s.submit("b", ["h"])
+        late_a = s.submit("a", ["h"])
+        self.assertFalse(late_a.granted)
+        s.release(first)
+        self.assertTrue(waiting_b.granted)
+
+    def test_cancel_while_queued(self):
+        s = ModelScheduler(is_loaded=_never_loaded)
+        a = s.submit("a", ["h"])
+        b = s.submit("b", ["h"])
+        s.release(b)
+        s.release(b)  # 重复释放无副作用
+        c = s.submit("c", ["h"])
+        s.release(a)
+        self.assertTrue(c.granted)
+
+    def test_host_affinity(self):
+        loaded = {("http://h2", "a")}
+        s = ModelScheduler(is_loaded=lambda host, model: (host, model) in loaded)
+        hosts = ["http://h1", "http://h2/"]
+        self.assertEqual(s.submit("a", hosts).host, "http://h2")  # /api/ps 显示已加载
+        self.assertEqual(s.submit("b", hosts).host, "http://h1")  # h1 空闲
+        self.assertEqual(s.submit("a", hosts).host, "http://h2")  # h2 正在跑 a
+        self.assertEqual(s.submit("c", hosts).host, "http://h1")  # 都忙，挑负载低的（平手取靠前的）
+
+
+class ServiceSchedulingTests(unittest.TestCase):
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_service_queues_then_uses_scheduled_host(self, backend_cls):
+        backend = MagicMock()
+        backend.stream_generate.return_value = iter(["你好"])
+        backend_cls.return_value = backend
+        scheduler = ModelScheduler(is_loaded=lambda host, model: (host, model) == ("http://h2", "other"))
+        blocker = scheduler.submit("other", ["http://h2"])
+
+        service = TranslationService(scheduler=scheduler)
+        request = TranslationRequest(text="Hello", source_lang="en", target_lang="zh", model="m",
+                                     hosts=["http://h1", "http://h2"])
+        events = service.stream_translate(request)
+        # 两个 host 都没加载 m，h1 空闲
+        self.assertEqual(next(e for e in events if e["event"] == "completed")["output_text"], "你好")
+        self.assertEqual(backend_cls.call_args.args[0].host, "http://h1")
+
+        request.hosts = ["http://h2"]
+        backend.stream_generate.return_value = iter(["你好"])
+        events = service.stream_translate(request)
+        queued = next(e for e in events if e["event"] != "started")
+        self.assertEqual((queued["event"], queued["position"]), ("queued", 1))
+        threading.Timer(0.05, scheduler.release, (blocker,)).start()
+        self.assertEqual(next(e for e in events if e["event"] == "completed")["output_text"], "你好")
+        events.close()
+        lanes = {lane["host"]: lane for lane in scheduler.snapshot()}
+        self.assertEqual((lanes["http://h2"]["running"], lanes["http://h2"]["waiting"]), (0, []))
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_hedging_is_opt_in_and_only_to_loaded_hosts(self, backend_cls):
+        backend_cls.return_value.stream_generate.side_effect = lambda prompt, options=None: iter(["你好"])
+        loaded = {("http://h1", "m"), ("http://h3", "m")}
+        scheduler = ModelScheduler(is_loaded=lambda host, model: (host, model) in loaded)
+        service = TranslationService(scheduler=scheduler)
+        request = TranslationRequest(text="Hello", source_lang="en", target_lang="zh", model="m",
+                                     hosts=["http://h1", "http://h2", "http://h3"])
+
+        service.translate(request)
+        self.assertEqual(backend_cls.call_args.args[0].hedge_hosts, [])
+
+        request.hedge = True
+        service.translate(request)
+        cfg = backend_cls.call_args.args[0]
+        self.assertEqual((cfg.host, cfg.hedge_hosts), ("http://h1", ["http://h3"]))  # h2 没加载 m，不往那边对冲
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_deadline_in_queue_does_not_touch_the_host(self, backend_cls):
+        backend_cls.return_value.is_model_loaded.return_value = False
+        scheduler = ModelScheduler(is_loaded=_never_loaded)
+        blocker = scheduler.submit("other", ["http://h1"])
+        self.addCleanup(scheduler.release, blocker)
+        service = TranslationService(scheduler=scheduler)
+        request = TranslationRequest(text="Hello\nWorld", source_lang="en", target_lang="zh", model="m",
+                                     hosts=["http://h1"], deadline_sec=0.1)
+
+        response = service.translate(request)
+        self.assertEqual(response.untranslated_segments, [0, 1])
+        backend_cls.return_value.warm_up.assert_not_called()
+        backend_cls.return_value.stream_generate.assert_not_called()
+        lane = scheduler.snapshot()[0]
+        self.assertEqual((lane["running"], lane["waiting"]), (1, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import unittest
+
+from core import PipelineOptions, run_pipeline
+from core.timing import NULL_TIMER, StageTimer, percentile
+
+
+class StageTimerTests(unittest.TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_stage_time_is_summed_per_segment(self):
+        timer = StageTimer()
+        for _ in range(2):
+            timer.begin_segment()
+            for _ in range(3):
+                timer.add("extract", timer.clock())
+            timer.sample("render", timer.clock())
+        timer.end_segment()
+
+        summary = timer.summary()
+        self.assertEqual(summary["extract"]["count"], 2)
+        self.assertEqual(summary["render"]["count"], 2)
+        self.assertEqual(list(summary), ["extract", "render"])
+
+    def test_disabled_timer_records_nothing(self):
+        self.assertEqual(NULL_TIMER.clock(), 0.0)
+        NULL_TIMER.begin_segment()
+        NULL_TIMER.add("prompt", 0.0)
+        NULL_TIMER.sample("emit", 0.0)
+        self.assertEqual(NULL_TIMER.end_segment(), {})
+        self.assertEqual(NULL_TIMER.summary(), {})
+
+
+class PipelineTimingTests(unittest.TestCase):
+    def test_report_contains_stage_summary_and_segment_timings(self):
+        _, report = run_pipeline(
+            "第一段\n第二段",
+            generate=lambda prompt: "译文：OK",
+            opt=PipelineOptions(),
+            return_report=True,
+        )
+        self.assertEqual(report.timings["split"]["count"], 1)
+        self.assertEqual(report.timings["generate"]["count"], 2)
+        self.assertIn("p90_ms", report.timings["prompt"])
+        self.assertEqual(set(report.reports[0].timings), {"prompt", "generate", "extract"})
+
+        _, report = run_pipeline(
+            "第一段",
+            generate=lambda prompt: "译文：OK",
+            opt=PipelineOptions(collect_timings=False),
+            return_report=True,
+        )
+        self.assertEqual(report.timings, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
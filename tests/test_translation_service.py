@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import cProfile
+import pstats
+import tempfile
+import threading
+import time
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 
+from backend import GenerationStats, GenerationStream
+from benchmarks.mock_ollama import MockOllama, MockOllamaConfig
 from core.prompt import PromptPreset
 from python_backend.models import TranslationRequest
 from python_backend.services.translation_service import TranslationService
@@ -48,6 +56,321 @@ class TranslationServiceTests(unittest.TestCase):
 
         self.assertEqual(response.output_text, "A")
 
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_non_linguistic_segments_skip_backend(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.return_value = iter(["译文：Hello"])
+
+        service = TranslationService()
+        events = list(
+            service.stream_translate(
+                TranslationRequest(text="你好\nhttps://example.com/docs\n42", source_lang="zh", target_lang="en")
+            )
+        )
+
+        self.assertEqual(backend.stream_generate.call_count, 1)
+        completed = events[-1]
+        self.assertEqual(completed["output_text"], "Hello\nhttps://example.com/docs\n42")
+        self.assertEqual(completed["passthrough_counts"], {"url": 1, "number": 1})
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_segments_already_in_target_language_skip_backend(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.return_value = iter(["译文：This is the first line."])
+
+        service = TranslationService()
+        events = list(
+            service.stream_translate(
+                TranslationRequest(
+                    text="这是第一行。\nThis line is already in the target language.",
+                    source_lang="auto",
+                    target_lang="en",
+                )
+            )
+        )
+
+        self.assertEqual(backend.stream_generate.call_count, 1)
+        completed = events[-1]
+        self.assertEqual(completed["passthrough_counts"], {"target_lang": 1})
+        self.assertEqual([s["lang"] for s in completed["response"]["segments"]], ["zh", "en"])
+        self.assertEqual(events[-2]["active_segment_lang"], "en")
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_repeated_segments_reuse_first_translation(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.side_effect = [iter(["译文：Error"]), iter(["译文：Done"])]
+
+        service = TranslationService()
+        events = list(
+            service.stream_translate(
+                TranslationRequest(text="出错了\n完成\n出错了", source_lang="zh", target_lang="en")
+            )
+        )
+
+        self.assertEqual(backend.stream_generate.call_count, 2)
+        self.assertEqual(events[0]["unique_segments"], 2)
+        self.assertAlmostEqual(events[0]["dedup_ratio"], 0.3333)
+        self.assertEqual(events[-2]["segment_status"], "deduplicated")
+        self.assertEqual(events[-1]["output_text"], "Error\nDone\nError")
+        self.assertEqual(events[-1]["dedup_hits"], 1)
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_dedup_ratio_ignores_passthrough_segments(self, backend_cls):
+        backend_cls.return_value.stream_generate.side_effect = lambda prompt, options=None: iter(["译文：OK"])
+
+        service = TranslationService()
+        request = TranslationRequest(text="出错了\n12345\n12345\n12345\n完成", source_lang="zh", target_lang="en")
+        events = service.stream_translate(request)
+        started = next(events)
+        events.close()
+
+        self.assertEqual(started["unique_segments"], 2)
+        self.assertEqual(started["dedup_ratio"], 0.0)
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_urls_are_masked_in_prompt_and_restored(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.return_value = iter(["译文：See ", "{1}", " for details"])
+        url = "https://example.com/docs/setup/" + "/".join(f"chapter-{i}/section-{i}" for i in range(1, 9))
+
+        service = TranslationService()
+        events = list(
+            service.stream_translate(TranslationRequest(text=f"详情见 {url}", source_lang="zh", target_lang="en"))
+        )
+
+        prompt = backend.stream_generate.call_args[0][0]
+        self.assertNotIn("https://", prompt)
+        self.assertEqual(events[-1]["output_text"], f"See {url} for details")
+        self.assertGreater(events[-1]["mask_tokens_saved"], 0)
+        self.assertEqual(events[-1]["mask_fallbacks"], 0)
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_looping_generation_is_cut_and_limits_are_sent(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.return_value = iter(["译文：Good morning. "] + ["Good night. "] * 50)
+
+        service = TranslationService()
+        events = list(service.stream_translate(TranslationRequest(text="早上好。", source_lang="zh", target_lang="en")))
+
+        options = backend.stream_generate.call_args.kwargs["options"]
+        self.assertGreater(options["num_predict"], 0)
+        self.assertIn("\n\nNote:", options["stop"])
+        self.assertEqual(events[-1]["output_text"], "Good morning. Good night.")
+        self.assertEqual(events[-1]["aborted_generations"], 1)
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_num_predict_truncation_is_reported(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.side_effect = lambda prompt, options=None: GenerationStream(
+            iter(["译文：Hello", GenerationStats(eval_count=48, done_reason="length" if "世界" in prompt else "stop")])
+        )
+
+        service = TranslationService()
+        events = list(service.stream_translate(TranslationRequest(text="你好\n世界", source_lang="zh", target_lang="en")))
+
+        self.assertEqual(events[-1]["truncated_segments"], [1])
+        self.assertEqual(events[-1]["response"]["truncated_segments"], [1])
+        # 非流式调用（HTTP /translate、bridge translate）也要带上；去重复用的截断译文同样算
+        response = service.translate(TranslationRequest(text="世界\n你好\n世界", source_lang="zh", target_lang="en"))
+        self.assertEqual(response.truncated_segments, [0, 2])
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_generation_stats_are_attached_to_segments_and_events(self, backend_cls):
+        stats = GenerationStats(prompt_eval_count=20, eval_count=10, eval_duration=500_000_000)
+        backend = backend_cls.return_value
+        backend.stream_generate.side_effect = lambda prompt, options=None: GenerationStream(
+            iter(["译文：Hello", stats])
+        )
+
+        service = TranslationService()
+        events = list(service.stream_translate(TranslationRequest(text="你好\n世界", source_lang="zh", target_lang="en")))
+
+        self.assertEqual(events[-2]["active_segment_stats"]["tokens_per_sec"], 20.0)
+        segments = events[-1]["response"]["segments"]
+        self.assertEqual(segments[0]["stats"]["prompt_eval_count"], 20)
+        self.assertEqual(events[-1]["generation_stats"]["eval_count"], 20)
+        response = service.translate(TranslationRequest(text="你好", source_lang="zh", target_lang="en"))
+        self.assertEqual(response.segments[0].stats["eval_count"], 10)
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_completed_event_reports_stage_timings(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.side_effect = lambda prompt, options=None: iter(["译文：", "Hello"])
+
+        service = TranslationService()
+        events = list(service.stream_translate(TranslationRequest(text="你好\n世界", source_lang="zh", target_lang="en")))
+
+        timings = events[-1]["timings"]
+        for stage in ("split", "prompt", "ttft", "generate", "extract", "render", "emit"):
+            self.assertIn(stage, timings)
+        self.assertEqual(timings["ttft"]["count"], 2)
+        self.assertGreaterEqual(timings["generate"]["max_ms"], timings["generate"]["p50_ms"])
+
+        events = list(
+            service.stream_translate(
+                TranslationRequest(text="你好", source_lang="zh", target_lang="en", collect_timings=False)
+            )
+        )
+        self.assertNotIn("timings", events[-1])
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_profiled_job_writes_pstats_and_reports_path(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.stream_generate.side_effect = lambda prompt, options=None: iter(["译文：Hello"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            service = TranslationService()
+            events = list(
+                service.stream_translate(
+                    TranslationRequest(
+                        text="你好", source_lang="zh", target_lang="en", profile=True, profile_dir=tmp, job_id="job/42"
+                    )
+                )
+            )
+            path = Path(events[-1]["profile_path"])
+            self.assertEqual(path, Path(tmp) / "job_42.pstats")
+            stats = pstats.Stats(str(path))
+            self.assertTrue(any("_stream_translate" in func[2] for func in stats.stats))
+
+            response = service.translate(
+                TranslationRequest(text="你好", source_lang="zh", target_lang="en", profile=True, profile_dir=tmp)
+            )
+            self.assertTrue(Path(response.profile_path).is_file())
+            self.assertIn("profile_path", response.to_dict())
+
+        events = list(service.stream_translate(TranslationRequest(text="你好", source_lang="zh", target_lang="en")))
+        self.assertNotIn("profile_path", events[-1])
+        self.assertNotIn("profile_path", service.translate(TranslationRequest(text="你好")).to_dict())
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_concurrent_profiled_jobs_do_not_overlap(self, backend_cls):
+        active = []
+
+        class _ExclusiveProfile(cProfile.Profile):
+            # 和 3.12 一样：已有 profiler 启用时再 enable 会失败
+            def enable(self, *args, **kwargs):
+                if active:
+                    raise ValueError("Another profiling tool is already active")
+                active.append(self)
+                super().enable(*args, **kwargs)
+
+            def disable(self):
+                super().disable()
+                if self in active:
+                    active.remove(self)
+
+        def slow_stream(prompt, options=None):
+            time.sleep(0.05)
+            yield "译文：Hello"
+
+        backend_cls.return_value.stream_generate.side_effect = slow_stream
+        service = TranslationService()
+        results: dict[str, object] = {}
+
+        def job(name: str, tmp: str) -> None:
+            request = TranslationRequest(text="你好\n世界", source_lang="zh", target_lang="en", profile=True,
+                                         profile_dir=tmp, job_id=name)
+            try:
+                results[name] = service.translate(request).profile_path
+            except Exception as exc:  # noqa: BLE001
+                results[name] = exc
+
+        with tempfile.TemporaryDirectory() as tmp, patch(
+            "python_backend.services.profiling.cProfile.Profile", _ExclusiveProfile
+        ):
+            threads = [threading.Thread(target=job, args=(name, tmp)) for name in ("a", "b")]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            self.assertEqual(results, {name: str(Path(tmp) / f"{name}.pstats") for name in ("a", "b")})
+
+    @patch("python_backend.services.translation_service.OllamaBackend")
+    def test_cold_model_is_preloaded_with_progress_events(self, backend_cls):
+        backend = backend_cls.return_value
+        backend.cfg.model = "demo"
+        backend.is_model_loaded.return_value = False
+        backend.warm_up.return_value = 1.25
+        backend.stream_generate.return_value = iter(["译文：Hello"])
+
+        service = TranslationService()
+        events = list(service.stream_translate(TranslationRequest(text="你好", source_lang="zh", target_lang="en")))
+
+        loading = [e for e in events if e["event"] == "model_loading"]
+        self.assertEqual(loading[0]["status"], "loading")
+        self.assertEqual(loading[-1]["status"], "loaded")
+        self.assertEqual(loading[-1]["load_duration_ms"], 1250)
+        self.assertEqual(events[-1]["output_text"], "Hello")
+        backend.warm_up.assert_called_once()
+
+    def test_deadline_returns_partial_result(self):
+        class SlowBackend:
+            def __init__(self, cfg):
+                self.cfg = cfg
+
+            def is_model_loaded(self):
+                return True
+
+            def stream_generate(self, prompt, options=None):
+                def chunks():
+                    for chunk in ("译文：", "done"):
+                        time.sleep(0.06)
+                        yield chunk
+
+                return GenerationStream(chunks())
+
+        service = TranslationService(backend_factory=SlowBackend)
+        request = TranslationRequest(
+            text="first line\nsecond line\nthird line\nfirst line\n12345",
+            source_lang="en",
+            target_lang="zh",
+            deadline_sec=0.2,
+        )
+        events = list(service.stream_translate(request))
+        completed = events[-1]
+        # 第二段在生成途中被截断，之后要调模型的段落直接跳过；去重 / 直通照常输出
+        self.assertTrue(completed["partial"])
+        self.assertEqual(completed["untranslated_segments"], [1, 2])
+        self.assertEqual(
+            [s["target"] for s in completed["response"]["segments"]],
+            ["done", "second line", "third line", "done", "12345"],
+        )
+        self.assertIn("untranslated", {e.get("segment_status") for e in events})
+
+        response = service.translate(request)
+        self.assertTrue(response.partial)
+        self.assertFalse(service.translate(TranslationRequest(text="first line", source_lang="en")).partial)
+
+    def test_concurrent_jobs_keep_their_own_deadlines(self):
+        # 同一段落、同一时刻：没有时限的任务不能搭上有时限任务的流
+        with MockOllama(MockOllamaConfig(ttft_sec=0.0, tokens_per_sec=20)) as mock:
+            results = {}
+
+            def run(name, deadline_sec):
+                request = TranslationRequest(
+                    text="The quick brown fox jumps over the lazy dog again and again",
+                    source_lang="en",
+                    target_lang="zh",
+                    mode="http",
+                    host=mock.url,
+                    deadline_sec=deadline_sec,
+                )
+                try:
+                    results[name] = TranslationService().translate(request)
+                except Exception as exc:  # noqa: BLE001 - reported below
+                    results[name] = exc
+
+            threads = [threading.Thread(target=run, args=args) for args in (("short", 0.3), ("open", None))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join(10)
+
+        self.assertTrue(results["short"].partial)
+        self.assertEqual(results["short"].untranslated_segments, [0])
+        self.assertFalse(results["open"].partial)
+        self.assertIn("lazy dog", results["open"].output_text)
+
     def test_translate_rejects_empty_input(self):
         service = TranslationService()
         with self.assertRaises(ValueError):
@@ -33,7 +33,8 @@ from core import (
     split_with_limited_context,
 )
 from core.prompt import PromptOptions, build_prompt
-from core.postprocess import extract_translation
+from core.lang import detect_source_lang
+from core.postprocess import StreamingExtractor
 from ui_mac.hotkey_mac import DoubleCmdCListener, ensure_accessibility
 from ui_mac.ocr import get_paste_image_paths, get_paste_images, run_ocr_async, run_ocr_async_images
 
@@ -401,12 +402,12 @@ class TranslatorApp:
                     )
                     prompt = build_prompt(seg.text, seg_opt)
 
-                    raw = ""
+                    extractor = StreamingExtractor(opt.post_opt)
                     for chunk in backend.stream_generate(prompt):
                         if cancel_event.is_set():
                             break
-                        raw += chunk
-                        temp_pairs = pairs + [AlignedPair(source=seg.text, target=raw)]
+                        partial_target = extractor.feed(chunk)
+                        temp_pairs = pairs + [AlignedPair(source=seg.text, target=partial_target)]
                         output = render_output(temp_pairs, mode=output_mode)
                         self.root.after(
                             0,
@@ -417,7 +418,7 @@ class TranslatorApp:
                     if cancel_event.is_set():
                         break
 
-                    target = extract_translation(raw, opt.post_opt)
+                    target = extractor.finish()
                     pairs.append(AlignedPair(source=seg.text, target=target))
                     output = render_output(pairs, mode=output_mode)
                     self.root.after(
@@ -508,18 +509,7 @@ class TranslatorApp:
         self.target_lang_var.set(src)
 
     def _detect_source_lang(self) -> Optional[str]:
-        text = self.input_text.get("1.0", "end").strip()
-        if not text:
-            return None
-        for ch in text:
-            code = ord(ch)
-            if 0x3040 <= code <= 0x30FF:
-                return "ja"
-            if 0xAC00 <= code <= 0xD7AF:
-                return "ko"
-            if 0x4E00 <= code <= 0x9FFF:
-                return "zh"
-        return "en"
+        return detect_source_lang(self.input_text.get("1.0", "end"))
 
     def increase_font(self):
         size = min(30, self.font_size_var.get() + 1)